@@ -1,144 +1,250 @@
 #!/usr/bin/env python3
 """
 Script to add sample medication and vital signs data to the database
+
+Deterministic for a given --seed and --end-date, and fast enough for load
+testing: rows are generated lazily and inserted with executemany() in
+batches of BATCH_ROWS, committing every COMMIT_ROWS. Each simulated
+patient gets their own adherence, dose delay and vitals baseline, so the
+data has the spread of a real ward rather than uniform noise. generate()
+is what benchmark.py uses to build load-test databases.
+
+Usage:
+    python add_sample_data.py                    # 4 medications, last 7 days (replaces existing data)
+    python add_sample_data.py --patients 500 --medications 4 --days 365 --seed 7 --append load.db
 """
 
-import sqlite3
-import random
+import argparse
+import itertools
 import os
-from datetime import datetime, timedelta
+import random
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+import medhealth_adherence
+import medhealth_migrations
+from medhealth_db import sqlite_timestamp
+from medhealth_scheduler import format_minute_of_day
 
-# Connect to database - find the database file
 script_dir = os.path.dirname(os.path.abspath(__file__))
-db_path = os.path.join(script_dir, 'backend', 'medhealth.db')
-print(f"Connecting to database: {db_path}")
-conn = sqlite3.connect(db_path)
-c = conn.cursor()
-
-# Clear existing data (optional - comment out if you want to keep existing data)
-print("Clearing existing data...")
-c.execute("DELETE FROM medication_logs")
-c.execute("DELETE FROM vitals_logs")
-c.execute("DELETE FROM medications")
-
-# Add sample medications
-medications = [
+DEFAULT_DB = os.path.join(script_dir, 'backend', 'medhealth.db')
+
+BATCH_ROWS = 50_000  # Rows per executemany()
+COMMIT_ROWS = 1_000_000  # Rows per transaction
+
+# One patient's demo regimen (the original sample set)
+DEMO_MEDICATIONS = [
     ("Aspirin", "08:00"),
     ("Vitamin D", "12:00"),
     ("Blood Pressure Med", "18:00"),
     ("Evening Supplement", "20:00"),
 ]
+DRUG_NAMES = ["Aspirin", "Metformin", "Lisinopril", "Atorvastatin", "Levothyroxine", "Amlodipine",
+              "Omeprazole", "Vitamin D", "Metoprolol", "Sertraline", "Warfarin", "Furosemide"]
+DOSE_TIMES = [7 * 60, 8 * 60, 9 * 60, 12 * 60, 13 * 60, 18 * 60, 20 * 60, 22 * 60]  # Minutes of day
+
+# Thresholds used to label standalone vitals (the device's alert limits are looser)
+NORMAL_TEMPERATURE = (36.0, 37.5)  # °C
+NORMAL_HEART_RATE = (60, 100)  # bpm
+MISSED_LOG_DELAY = 60  # seconds; a missed dose is logged when its alarm stops ringing
+
+# Per-patient behaviour, drawn once from the seeded generator
+PatientProfile = namedtuple("PatientProfile", ["adherence", "delay_minutes", "vitals_rate",
+                                               "temperature", "heart_rate"])
+GeneratedRows = namedtuple("GeneratedRows", ["medications", "medication_logs", "vitals_logs"])
+
+
+def patient_profile(rng: random.Random) -> PatientProfile:
+    """Most patients take ~85% of doses a few minutes late; a tail does much worse"""
+    return PatientProfile(adherence=rng.betavariate(9, 1.6),
+                          delay_minutes=rng.uniform(0, 20),
+                          vitals_rate=rng.uniform(0.3, 0.8),
+                          temperature=rng.gauss(36.7, 0.2),
+                          heart_rate=rng.gauss(74, 7))
+
+
+def regimen(rng: random.Random, patients: int, medications: int) -> List[Tuple[str, int]]:
+    """[(name, schedule_minute)] for every patient's medications"""
+    if patients == 1 and medications <= len(DEMO_MEDICATIONS):
+        return [(name, int(t[:2]) * 60 + int(t[3:])) for name, t in DEMO_MEDICATIONS[:medications]]
+    return [(f"P{patient:04d} {rng.choice(DRUG_NAMES)}", rng.choice(DOSE_TIMES) + rng.choice([0, 0, 15, 30]))
+            for patient in range(1, patients + 1) for _ in range(medications)]
+
+
+def vitals_status(temperature: float, heart_rate: int) -> str:
+    low_t, high_t = NORMAL_TEMPERATURE
+    low_hr, high_hr = NORMAL_HEART_RATE
+    return "normal" if low_t <= temperature <= high_t and low_hr <= heart_rate <= high_hr else "abnormal"
+
+
+def local_text(epoch: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(epoch))
+
 
-print("Adding medications...")
-for name, schedule_time in medications:
-    c.execute(
-        "INSERT INTO medications (name, schedule_time, active) VALUES (?, ?, 1)",
-        (name, schedule_time)
-    )
-    print(f"  Added: {name} at {schedule_time}")
-
-# Get medication IDs
-c.execute("SELECT id, name, schedule_time FROM medications")
-meds = c.fetchall()
-med_dict = {name: (id, schedule_time) for id, name, schedule_time in meds}
-
-# Generate medication logs for the past 7 days
-print("\nAdding medication logs (past 7 days)...")
-base_date = datetime.now()
-statuses = ["taken", "taken", "taken", "missed"]  # 75% taken rate
-
-for day_offset in range(7, 0, -1):  # Last 7 days
-    date = base_date - timedelta(days=day_offset)
-    
-    for med_id, med_name, schedule_time in meds:
-        # Determine status (mostly taken)
-        status = random.choice(statuses)
-        
-        # Parse schedule time
-        hour, minute = map(int, schedule_time.split(':'))
-        scheduled_datetime = date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-        
-        if status == "taken":
-            # Taken: actual time is within 30 minutes of scheduled
-            actual_datetime = scheduled_datetime + timedelta(
-                minutes=random.randint(-10, 30)
-            )
-            actual_time = actual_datetime.strftime("%Y-%m-%d %H:%M:%S")
-            
-            # 60% chance of having vitals measured
-            if random.random() < 0.6:
-                temp = round(random.uniform(36.0, 37.5), 1)
-                hr = random.randint(65, 85)
+def medication_log_rows(rng: random.Random, medications: List[Tuple[int, str, int]],
+                        profiles: List[PatientProfile], per_patient: int,
+                        days: List[date], now: float) -> Iterator[tuple]:
+    """medication_logs rows as log_medication() writes them, day by day"""
+    for day in days:
+        midnight = int(time.mktime(day.timetuple()))
+        for index, (med_id, name, schedule_minute) in enumerate(medications):
+            profile = profiles[index // per_patient]
+            scheduled = midnight + schedule_minute * 60
+            # Evening doses are missed more often
+            miss_rate = (1 - profile.adherence) * (1.5 if schedule_minute >= 18 * 60 else 1.0)
+            if rng.random() >= miss_rate:
+                status = "taken"
+                actual = scheduled + int(60 * max(-10.0, rng.gauss(profile.delay_minutes, 8)))
+                if rng.random() < profile.vitals_rate:
+                    temperature = round(rng.gauss(profile.temperature, 0.25), 1)
+                    heart_rate = int(rng.gauss(profile.heart_rate, 6))
+                else:
+                    temperature = heart_rate = None
             else:
-                temp = None
-                hr = None
-        else:
-            # Missed: no actual time, no vitals
-            actual_time = scheduled_datetime.strftime("%Y-%m-%d %H:%M:%S")
-            temp = None
-            hr = None
-        
-        scheduled_time_str = scheduled_datetime.strftime("%Y-%m-%d %H:%M:%S")
-        
-        c.execute("""
-            INSERT INTO medication_logs 
-            (medication_id, medication_name, scheduled_time, actual_time, status, temperature, heart_rate)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (med_id, med_name, scheduled_time_str, actual_time, status, temp, hr))
-    
-    print(f"  Added logs for {date.strftime('%Y-%m-%d')}")
-
-# Generate vital signs logs (standalone measurements, not tied to medications)
-print("\nAdding standalone vital signs logs...")
-for day_offset in range(7, 0, -1):
-    date = base_date - timedelta(days=day_offset)
-    
-    # 2-4 measurements per day
-    num_measurements = random.randint(2, 4)
-    
-    for _ in range(num_measurements):
-        # Random time during the day
-        hour = random.randint(8, 22)
-        minute = random.choice([0, 15, 30, 45])
-        measurement_time = date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-        
-        # Normal vital signs with slight variations
-        temp = round(random.uniform(36.2, 37.3), 1)
-        hr = random.randint(60, 90)
-        
-        # Determine status
-        if temp < 36.0 or temp > 37.5 or hr < 60 or hr > 100:
-            status = "abnormal"
-        else:
-            status = "normal"
-        
-        c.execute("""
-            INSERT INTO vitals_logs (temperature, heart_rate, status, created_at)
-            VALUES (?, ?, ?, ?)
-        """, (temp, hr, status, measurement_time.strftime("%Y-%m-%d %H:%M:%S")))
-
-print(f"  Added {7 * 3} vital signs measurements (average)")
-
-# Commit all changes
-conn.commit()
-print("\n[SUCCESS] Sample data added successfully!")
-print(f"\nSummary:")
-print(f"  - Medications: {len(medications)}")
-print(f"  - Medication logs: ~{len(medications) * 7} entries")
-print(f"  - Vital signs logs: ~{7 * 3} entries")
-
-# Show some stats
-c.execute("SELECT COUNT(*) FROM medication_logs WHERE status = 'taken'")
-taken_count = c.fetchone()[0]
-c.execute("SELECT COUNT(*) FROM medication_logs WHERE status = 'missed'")
-missed_count = c.fetchone()[0]
-c.execute("SELECT COUNT(*) FROM vitals_logs")
-vitals_count = c.fetchone()[0]
-
-print(f"\nDatabase Statistics:")
-print(f"  - Medications taken: {taken_count}")
-print(f"  - Medications missed: {missed_count}")
-print(f"  - Vital signs measurements: {vitals_count}")
-
-conn.close()
+                status = "missed"
+                actual = scheduled + MISSED_LOG_DELAY
+                temperature = heart_rate = None
+            if actual > now:
+                continue
+            yield (med_id, name, local_text(scheduled), local_text(actual), status, temperature, heart_rate,
+                   sqlite_timestamp(actual), scheduled, actual, actual)
+
+
+def vitals_log_rows(rng: random.Random, profiles: List[PatientProfile], days: List[date],
+                    now: float) -> Iterator[tuple]:
+    """Standalone vitals_logs rows: 2-4 measurements per patient per day between 08:00 and 22:45"""
+    for day in days:
+        midnight = int(time.mktime(day.timetuple()))
+        for profile in profiles:
+            for _ in range(rng.randint(2, 4)):
+                measured = midnight + rng.randint(8, 22) * 3600 + rng.choice([0, 15, 30, 45]) * 60
+                temperature = round(rng.gauss(profile.temperature, 0.3), 1)
+                heart_rate = int(rng.gauss(profile.heart_rate, 8))
+                if measured > now:
+                    continue
+                yield (temperature, heart_rate, vitals_status(temperature, heart_rate),
+                       sqlite_timestamp(measured), measured)
+
+
+def insert_batches(conn: sqlite3.Connection, sql: str, rows: Iterator[tuple],
+                   batch_rows: int = BATCH_ROWS, commit_rows: int = COMMIT_ROWS) -> int:
+    """executemany() rows in batches, committing every commit_rows; returns the row count"""
+    total = uncommitted = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_rows))
+        if not batch:
+            break
+        conn.executemany(sql, batch)
+        total += len(batch)
+        uncommitted += len(batch)
+        if uncommitted >= commit_rows:
+            conn.commit()
+            uncommitted = 0
+    conn.commit()
+    return total
+
+
+def generate(conn: sqlite3.Connection, patients: int = 1, medications: int = 4, days: int = 7,
+             seed: int = 42, end_date: Optional[date] = None, append: bool = False,
+             batch_rows: int = BATCH_ROWS) -> GeneratedRows:
+    """Fill a migrated database with `days` days of data ending yesterday (or end_date)
+
+    Without append the medications, log and rollup tables are emptied first
+    and the log indexes are rebuilt after the load.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or date.today() - timedelta(days=1)
+    day_list = [end_date - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+    now = time.time()
+
+    if not append:
+        for table in ("medication_logs", "vitals_logs", "medications", "daily_adherence", "dose_traces"):
+            conn.execute(f"DELETE FROM {table}")
+        conn.commit()
+
+    profiles = [patient_profile(rng) for _ in range(patients)]
+    schedule = regimen(rng, patients, medications)
+    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM medications").fetchone()[0]
+    conn.executemany("INSERT INTO medications (name, schedule_time, schedule_minute, active) VALUES (?, ?, ?, 1)",
+                     [(name, format_minute_of_day(minute), minute) for name, minute in schedule])
+    med_rows = conn.execute("SELECT id, name, schedule_minute FROM medications WHERE id > ? ORDER BY id",
+                            (last_id,)).fetchall()
+
+    # Into empty log tables, building each index once at the end beats
+    # updating it per row; appends keep them (the tables may be large)
+    deferred = [] if append else conn.execute("""SELECT name, sql FROM sqlite_master
+                                                 WHERE type = 'index' AND sql IS NOT NULL
+                                                   AND tbl_name IN ('medication_logs', 'vitals_logs')""").fetchall()
+    for name, _ in deferred:
+        conn.execute(f"DROP INDEX {name}")
+    try:
+        log_count = insert_batches(conn, """INSERT INTO medication_logs
+                                            (medication_id, medication_name, scheduled_time, actual_time, status,
+                                             temperature, heart_rate, created_at,
+                                             scheduled_epoch, actual_epoch, created_epoch)
+                                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                                   medication_log_rows(rng, med_rows, profiles, medications, day_list, now),
+                                   batch_rows)
+        vitals_count = insert_batches(conn, """INSERT INTO vitals_logs
+                                               (temperature, heart_rate, status, created_at, created_epoch)
+                                               VALUES (?, ?, ?, ?, ?)""",
+                                      vitals_log_rows(rng, profiles, day_list, now), batch_rows)
+    finally:
+        conn.rollback()
+        for _, sql in deferred:
+            conn.execute(sql)
+        conn.commit()
+    medhealth_adherence.rebuild(conn, day_list[0].isoformat() if day_list else None)
+    return GeneratedRows(len(med_rows), log_count, vitals_count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add sample or load-test data to a MedHealth database")
+    parser.add_argument("db_file", nargs="?", default=DEFAULT_DB)
+    parser.add_argument("--patients", type=int, default=1)
+    parser.add_argument("--medications", type=int, default=4, help="medications per patient")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None,
+                        help="last day to generate (YYYY-MM-DD, default yesterday); fix it for repeatable data")
+    parser.add_argument("--append", action="store_true", help="keep existing data and add to it")
+    args = parser.parse_intermixed_args()
+
+    print(f"Connecting to database: {args.db_file}")
+    conn = sqlite3.connect(args.db_file)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB: keeps the log indexes hot during the load
+    medhealth_migrations.migrate(conn)
+    if not args.append:
+        print("Clearing existing data...")
+
+    start = time.perf_counter()
+    rows = generate(conn, args.patients, args.medications, args.days, args.seed, args.end_date, args.append)
+    elapsed = time.perf_counter() - start
+    total = rows.medications + rows.medication_logs + rows.vitals_logs
+
+    print("\n[SUCCESS] Sample data added successfully!")
+    print(f"\nSummary:")
+    print(f"  - Medications: {rows.medications} ({args.patients} patient(s))")
+    print(f"  - Medication logs: {rows.medication_logs}")
+    print(f"  - Vital signs logs: {rows.vitals_logs}")
+    print(f"  - {total} rows in {elapsed:.1f} s ({total / elapsed * 60 / 1e6:.2f}M rows/min)")
+
+    # Show some stats
+    taken_count, missed_count = conn.execute("""SELECT SUM(status = 'taken'), SUM(status = 'missed')
+                                                FROM medication_logs""").fetchone()
+    vitals_count = conn.execute("SELECT COUNT(*) FROM vitals_logs").fetchone()[0]
+
+    print(f"\nDatabase Statistics:")
+    print(f"  - Medications taken: {taken_count or 0}")
+    print(f"  - Medications missed: {missed_count or 0}")
+    print(f"  - Vital signs measurements: {vitals_count}")
+
+    conn.close()
+
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+-- Tables as created by the first device and backend releases. IF NOT EXISTS
+-- lets databases that predate versioning (user_version 0) adopt this step.
+CREATE TABLE IF NOT EXISTS medications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    schedule_time TEXT NOT NULL,
+    active INTEGER DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS medication_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    medication_id INTEGER,
+    medication_name TEXT,
+    scheduled_time TEXT,
+    actual_time TEXT,
+    status TEXT,
+    temperature REAL,
+    heart_rate INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (medication_id) REFERENCES medications(id)
+);
+
+CREATE TABLE IF NOT EXISTS vitals_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    temperature REAL,
+    heart_rate INTEGER,
+    status TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,3 @@
+-- "Taken today?" lookups: medication + half-open created_at day range
+CREATE INDEX IF NOT EXISTS idx_medication_logs_med_created
+    ON medication_logs (medication_id, created_at);
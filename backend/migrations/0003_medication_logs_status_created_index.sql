@@ -0,0 +1,3 @@
+-- Status/date reporting (adherence, missed doses)
+CREATE INDEX IF NOT EXISTS idx_medication_logs_status_created
+    ON medication_logs (status, created_at);
@@ -0,0 +1,6 @@
+-- Downsampled vitals: samples is the number of readings averaged into a
+-- rolled-up row, NULL for a raw reading
+ALTER TABLE vitals_logs ADD COLUMN samples INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_vitals_logs_created
+    ON vitals_logs (created_at);
@@ -0,0 +1,31 @@
+-- Schedules as minutes after local midnight (0-1439) so the device compares
+-- and sorts them as integers. schedule_time stays as the 'HH:MM' text the
+-- API returns; the triggers derive schedule_minute for writers that only
+-- set schedule_time (the backend, older device releases). 'H:MM' is padded;
+-- anything that is not a valid time of day is left NULL and never scheduled.
+ALTER TABLE medications ADD COLUMN schedule_minute INTEGER;
+
+UPDATE medications
+SET schedule_minute = CAST(strftime('%H', substr('0' || schedule_time, -5)) AS INTEGER) * 60
+                    + CAST(strftime('%M', substr('0' || schedule_time, -5)) AS INTEGER)
+WHERE schedule_minute IS NULL;
+
+CREATE TRIGGER IF NOT EXISTS medications_schedule_minute_insert
+AFTER INSERT ON medications
+WHEN NEW.schedule_minute IS NULL
+BEGIN
+    UPDATE medications
+    SET schedule_minute = CAST(strftime('%H', substr('0' || NEW.schedule_time, -5)) AS INTEGER) * 60
+                        + CAST(strftime('%M', substr('0' || NEW.schedule_time, -5)) AS INTEGER)
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS medications_schedule_minute_update
+AFTER UPDATE OF schedule_time ON medications
+WHEN NEW.schedule_minute IS OLD.schedule_minute
+BEGIN
+    UPDATE medications
+    SET schedule_minute = CAST(strftime('%H', substr('0' || NEW.schedule_time, -5)) AS INTEGER) * 60
+                        + CAST(strftime('%M', substr('0' || NEW.schedule_time, -5)) AS INTEGER)
+    WHERE id = NEW.id;
+END;
@@ -0,0 +1,38 @@
+-- Integer epoch seconds (UTC) next to the text times. created_at is UTC
+-- text; scheduled_time/actual_time were written as local 'HH:MM[:SS]'
+-- (dated by the local day of created_at) or full local datetimes. The
+-- 'localtime'/'utc' conversions use the time zone of whichever process runs
+-- this step, so upgrade on the device. The trigger fills the columns for
+-- writers that only set the text times (the backend, older device releases).
+ALTER TABLE medication_logs ADD COLUMN scheduled_epoch INTEGER;
+
+ALTER TABLE medication_logs ADD COLUMN actual_epoch INTEGER;
+
+ALTER TABLE medication_logs ADD COLUMN created_epoch INTEGER;
+
+UPDATE medication_logs
+SET created_epoch = CAST(strftime('%s', created_at) AS INTEGER),
+    scheduled_epoch = CAST(strftime('%s', CASE WHEN length(scheduled_time) <= 8
+                                               THEN date(created_at, 'localtime') || ' ' || scheduled_time
+                                               ELSE scheduled_time END, 'utc') AS INTEGER),
+    actual_epoch = CAST(strftime('%s', CASE WHEN length(actual_time) <= 8
+                                            THEN date(created_at, 'localtime') || ' ' || actual_time
+                                            ELSE actual_time END, 'utc') AS INTEGER)
+WHERE created_epoch IS NULL;
+
+CREATE TRIGGER IF NOT EXISTS medication_logs_epoch_insert
+AFTER INSERT ON medication_logs
+WHEN NEW.created_epoch IS NULL
+BEGIN
+    UPDATE medication_logs
+    SET created_epoch = CAST(strftime('%s', NEW.created_at) AS INTEGER),
+        scheduled_epoch = COALESCE(NEW.scheduled_epoch,
+            CAST(strftime('%s', CASE WHEN length(NEW.scheduled_time) <= 8
+                                     THEN date(NEW.created_at, 'localtime') || ' ' || NEW.scheduled_time
+                                     ELSE NEW.scheduled_time END, 'utc') AS INTEGER)),
+        actual_epoch = COALESCE(NEW.actual_epoch,
+            CAST(strftime('%s', CASE WHEN length(NEW.actual_time) <= 8
+                                     THEN date(NEW.created_at, 'localtime') || ' ' || NEW.actual_time
+                                     ELSE NEW.actual_time END, 'utc') AS INTEGER))
+    WHERE id = NEW.id;
+END;
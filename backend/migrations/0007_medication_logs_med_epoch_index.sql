@@ -0,0 +1,5 @@
+-- "Taken today?" lookups on the integer day bounds; replaces the text index
+CREATE INDEX IF NOT EXISTS idx_medication_logs_med_epoch
+    ON medication_logs (medication_id, created_epoch);
+
+DROP INDEX IF EXISTS idx_medication_logs_med_created;
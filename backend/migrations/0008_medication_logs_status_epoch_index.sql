@@ -0,0 +1,5 @@
+-- Status/date reporting on the integer timestamps; replaces the text index
+CREATE INDEX IF NOT EXISTS idx_medication_logs_status_epoch
+    ON medication_logs (status, created_epoch);
+
+DROP INDEX IF EXISTS idx_medication_logs_status_created;
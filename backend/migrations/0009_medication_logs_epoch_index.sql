@@ -0,0 +1,3 @@
+-- Newest-first history without sorting the whole table
+CREATE INDEX IF NOT EXISTS idx_medication_logs_epoch
+    ON medication_logs (created_epoch);
@@ -0,0 +1,23 @@
+-- Integer created_epoch (UTC seconds) for vitals range queries and rollups;
+-- the trigger fills it for writers that only set created_at (the backend).
+-- vitals_logs stays small once readings are rolled up, so the index swap
+-- shares this step.
+ALTER TABLE vitals_logs ADD COLUMN created_epoch INTEGER;
+
+UPDATE vitals_logs
+SET created_epoch = CAST(strftime('%s', created_at) AS INTEGER)
+WHERE created_epoch IS NULL;
+
+CREATE TRIGGER IF NOT EXISTS vitals_logs_epoch_insert
+AFTER INSERT ON vitals_logs
+WHEN NEW.created_epoch IS NULL
+BEGIN
+    UPDATE vitals_logs
+    SET created_epoch = CAST(strftime('%s', NEW.created_at) AS INTEGER)
+    WHERE id = NEW.id;
+END;
+
+CREATE INDEX IF NOT EXISTS idx_vitals_logs_epoch
+    ON vitals_logs (created_epoch);
+
+DROP INDEX IF EXISTS idx_vitals_logs_created;
@@ -0,0 +1,31 @@
+-- Per-medication daily adherence, kept up to date by the device in the same
+-- transaction as each medication_logs insert (medhealth_adherence.py) so
+-- charts read one row per medication per day instead of every log. day is
+-- the local calendar date of the scheduled dose; delay_total sums
+-- actual - scheduled seconds over taken doses (mean = delay_total / taken).
+-- Filled from existing logs here; rebuild with
+-- `python medhealth_adherence.py rebuild`.
+CREATE TABLE IF NOT EXISTS daily_adherence (
+    medication_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    scheduled INTEGER NOT NULL DEFAULT 0,
+    taken INTEGER NOT NULL DEFAULT 0,
+    missed INTEGER NOT NULL DEFAULT 0,
+    delay_total INTEGER NOT NULL DEFAULT 0,
+    with_vitals INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (medication_id, day)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_daily_adherence_day
+    ON daily_adherence (day);
+
+INSERT OR IGNORE INTO daily_adherence
+    (medication_id, day, scheduled, taken, missed, delay_total, with_vitals)
+SELECT medication_id,
+       date(COALESCE(scheduled_epoch, created_epoch), 'unixepoch', 'localtime') AS log_day,
+       COUNT(*), SUM(status = 'taken'), SUM(status = 'missed'),
+       COALESCE(SUM(CASE WHEN status = 'taken' THEN actual_epoch - scheduled_epoch END), 0),
+       SUM(temperature IS NOT NULL OR heart_rate IS NOT NULL)
+FROM medication_logs
+WHERE medication_id IS NOT NULL AND COALESCE(scheduled_epoch, created_epoch) IS NOT NULL
+GROUP BY medication_id, log_day;
@@ -0,0 +1,5 @@
+-- History filtered to doses logged with vitals; partial, so it only holds
+-- those rows and the planner uses it when the query repeats this WHERE
+CREATE INDEX IF NOT EXISTS idx_medication_logs_vitals_epoch
+    ON medication_logs (created_epoch)
+    WHERE temperature IS NOT NULL OR heart_rate IS NOT NULL;
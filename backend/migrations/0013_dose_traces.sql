@@ -0,0 +1,20 @@
+-- Alarm latency trace for each dose the device rang for, written in the
+-- same transaction as its medication_logs row (medhealth_tracing.py).
+-- Times are epoch seconds with sub-second precision; a stage that did not
+-- happen (no button press for a missed dose) is NULL. written_at is
+-- stamped by SQLite as the row is written in the log writer's
+-- transaction, just before that transaction commits.
+CREATE TABLE IF NOT EXISTS dose_traces (
+    log_id INTEGER PRIMARY KEY,
+    medication_id INTEGER NOT NULL,
+    due_at REAL NOT NULL,
+    detected_at REAL,
+    buzzer_on_at REAL,
+    pressed_at REAL,
+    resolved_at REAL,
+    logged_at REAL,
+    written_at REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_dose_traces_due
+    ON dose_traces (due_at);
@@ -1,52 +1,228 @@
-use log::info;
-use rusqlite::{Connection, Result as SqlResult};
+use log::{info, warn};
+use rusqlite::{Connection, Result as SqlResult, TransactionBehavior};
+
+/// Schema migrations shared with the Raspberry Pi device, which applies the
+/// same files with medhealth_migrations.py. Both sides track the applied
+/// version in PRAGMA user_version. Keep in step with backend/migrations/.
+const MIGRATIONS: &[(i64, &str)] = &[
+    (1, include_str!("../../migrations/0001_initial_schema.sql")),
+    (
+        2,
+        include_str!("../../migrations/0002_medication_logs_med_created_index.sql"),
+    ),
+    (
+        3,
+        include_str!("../../migrations/0003_medication_logs_status_created_index.sql"),
+    ),
+    (
+        4,
+        include_str!("../../migrations/0004_vitals_logs_rollups.sql"),
+    ),
+    (
+        5,
+        include_str!("../../migrations/0005_medications_schedule_minute.sql"),
+    ),
+    (
+        6,
+        include_str!("../../migrations/0006_medication_logs_epoch_columns.sql"),
+    ),
+    (
+        7,
+        include_str!("../../migrations/0007_medication_logs_med_epoch_index.sql"),
+    ),
+    (
+        8,
+        include_str!("../../migrations/0008_medication_logs_status_epoch_index.sql"),
+    ),
+    (
+        9,
+        include_str!("../../migrations/0009_medication_logs_epoch_index.sql"),
+    ),
+    (
+        10,
+        include_str!("../../migrations/0010_vitals_logs_epoch_column.sql"),
+    ),
+    (
+        11,
+        include_str!("../../migrations/0011_daily_adherence.sql"),
+    ),
+    (
+        12,
+        include_str!("../../migrations/0012_medication_logs_vitals_index.sql"),
+    ),
+    (13, include_str!("../../migrations/0013_dose_traces.sql")),
+];
+
+pub fn latest_version() -> i64 {
+    MIGRATIONS.last().map(|(version, _)| *version).unwrap_or(0)
+}
+
+fn schema_version(conn: &Connection) -> SqlResult<i64> {
+    conn.query_row("PRAGMA user_version", [], |row| row.get(0))
+}
+
+/// Statements in a migration file: split on ';' at line ends, '--' lines dropped,
+/// CREATE TRIGGER up to its 'END;' line (same rules as split_statements() on the device)
+fn split_statements(sql: &str) -> Vec<String> {
+    let mut statements = Vec::new();
+    let mut current: Vec<&str> = Vec::new();
+    for line in sql.lines() {
+        let trimmed = line.trim();
+        if trimmed.is_empty() || trimmed.starts_with("--") {
+            continue;
+        }
+        current.push(line);
+        let in_trigger = current[0]
+            .trim()
+            .to_uppercase()
+            .starts_with("CREATE TRIGGER");
+        if trimmed.ends_with(';') && (!in_trigger || trimmed.to_uppercase().ends_with("END;")) {
+            statements.push(current.join("\n").trim().trim_end_matches(';').to_string());
+            current.clear();
+        }
+    }
+    if !current.is_empty() {
+        statements.push(current.join("\n").trim().to_string());
+    }
+    statements
+}
+
+/// Apply pending migrations in order, each in its own transaction with its
+/// user_version bump. Returns the resulting schema version.
+pub fn migrate(conn: &mut Connection) -> SqlResult<i64> {
+    let current = schema_version(conn)?;
+    if current > latest_version() {
+        warn!(
+            "Database schema version {} is newer than this backend ({}); running without migrating",
+            current,
+            latest_version()
+        );
+        return Ok(current);
+    }
+
+    for (version, sql) in MIGRATIONS.iter().filter(|(version, _)| *version > current) {
+        let tx = conn.transaction_with_behavior(TransactionBehavior::Immediate)?;
+        // The device may have applied this step while we waited for the lock
+        if schema_version(&tx)? >= *version {
+            continue;
+        }
+        for statement in split_statements(sql) {
+            match tx.execute_batch(&statement) {
+                Ok(()) => {}
+                // Column added by an older release's CREATE TABLE / ALTER
+                Err(e) if e.to_string().contains("duplicate column name") => {}
+                Err(e) => return Err(e),
+            }
+        }
+        tx.pragma_update(None, "user_version", version)?;
+        tx.commit()?;
+        info!("Applied schema migration {}", version);
+    }
+    schema_version(conn)
+}
 
 pub fn init_db(db_path: &str) -> SqlResult<()> {
-    let conn = Connection::open(db_path)?;
-
-    // Create tables if they don't exist (matching Phase 1 schema)
-    conn.execute(
-        "CREATE TABLE IF NOT EXISTS medications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            schedule_time TEXT NOT NULL,
-            active INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )",
-        [],
-    )?;
-
-    conn.execute(
-        "CREATE TABLE IF NOT EXISTS medication_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            medication_id INTEGER,
-            medication_name TEXT,
-            scheduled_time TEXT,
-            actual_time TEXT,
-            status TEXT,
-            temperature REAL,
-            heart_rate INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (medication_id) REFERENCES medications(id)
-        )",
-        [],
-    )?;
-
-    conn.execute(
-        "CREATE TABLE IF NOT EXISTS vitals_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            temperature REAL,
-            heart_rate INTEGER,
-            status TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )",
-        [],
-    )?;
-
-    info!("Database initialized successfully: {}", db_path);
+    let mut conn = Connection::open(db_path)?;
+    let version = migrate(&mut conn)?;
+
+    info!(
+        "Database initialized successfully: {} (schema version {})",
+        db_path, version
+    );
     Ok(())
 }
 
 pub fn get_connection(db_path: &str) -> SqlResult<Connection> {
     Connection::open(db_path)
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::fs;
+    use std::path::Path;
+
+    #[test]
+    fn migrations_match_shared_directory() {
+        let dir = Path::new(env!("CARGO_MANIFEST_DIR")).join("migrations");
+        let mut files: Vec<_> = fs::read_dir(dir)
+            .expect("migrations directory")
+            .map(|entry| entry.expect("directory entry").path())
+            .filter(|path| path.extension().map_or(false, |ext| ext == "sql"))
+            .collect();
+        files.sort();
+
+        assert_eq!(
+            files.len(),
+            MIGRATIONS.len(),
+            "every migration file must be listed in MIGRATIONS"
+        );
+        for ((version, sql), path) in MIGRATIONS.iter().zip(&files) {
+            let name = path.file_name().unwrap().to_string_lossy();
+            assert_eq!(name[..4].parse::<i64>().unwrap(), *version, "{}", name);
+            assert_eq!(fs::read_to_string(path).unwrap(), *sql, "{}", name);
+        }
+    }
+
+    #[test]
+    fn migrate_is_idempotent() {
+        let mut conn = Connection::open_in_memory().unwrap();
+        assert_eq!(migrate(&mut conn).unwrap(), latest_version());
+
+        // Re-running every step (a database upgraded before versioning) must not fail
+        conn.execute_batch("PRAGMA user_version = 0").unwrap();
+        assert_eq!(migrate(&mut conn).unwrap(), latest_version());
+        let samples: i64 = conn
+            .query_row(
+                "SELECT COUNT(*) FROM pragma_table_info('vitals_logs') WHERE name = 'samples'",
+                [],
+                |row| row.get(0),
+            )
+            .unwrap();
+        assert_eq!(samples, 1);
+    }
+
+    #[test]
+    fn split_statements_skips_comments() {
+        let statements =
+            split_statements("-- comment\nCREATE TABLE a (x);\n\nCREATE INDEX i\n    ON a (x);\n");
+        assert_eq!(
+            statements,
+            vec!["CREATE TABLE a (x)", "CREATE INDEX i\n    ON a (x)"]
+        );
+    }
+
+    #[test]
+    fn split_statements_keeps_trigger_bodies() {
+        let statements = split_statements(
+            "CREATE TRIGGER t AFTER INSERT ON a\nBEGIN\n    UPDATE a SET x = 1;\nEND;\nDROP INDEX i;\n",
+        );
+        assert_eq!(statements.len(), 2);
+        assert!(statements[0].ends_with("UPDATE a SET x = 1;\nEND"));
+        assert_eq!(statements[1], "DROP INDEX i");
+    }
+
+    #[test]
+    fn triggers_fill_epoch_columns() {
+        let mut conn = Connection::open_in_memory().unwrap();
+        migrate(&mut conn).unwrap();
+        conn.execute_batch(
+            "INSERT INTO medications (name, schedule_time) VALUES ('a', '8:30');
+             INSERT INTO vitals_logs (temperature, heart_rate, status, created_at)
+             VALUES (36.6, 70, 'normal', '2024-01-13 08:05:00');",
+        )
+        .unwrap();
+        let minute: i64 = conn
+            .query_row("SELECT schedule_minute FROM medications", [], |row| {
+                row.get(0)
+            })
+            .unwrap();
+        assert_eq!(minute, 510);
+        let epoch: i64 = conn
+            .query_row("SELECT created_epoch FROM vitals_logs", [], |row| {
+                row.get(0)
+            })
+            .unwrap();
+        assert_eq!(epoch, 1_705_133_100);
+    }
+}
@@ -1,9 +1,12 @@
 use crate::config::AppConfig;
 use crate::database;
-use crate::models::{Medication, MedicationLog, MedicationStatement, Observation, VitalsLog};
+use crate::models::{
+    DailyAdherence, Medication, MedicationLog, MedicationStatement, Observation, VitalsLog,
+};
 use actix_web::{web, HttpResponse, Result};
 use log::error;
 use rusqlite::params;
+use serde::Deserialize;
 
 mod retry;
 
@@ -194,7 +197,7 @@ pub async fn get_medication_logs(
         .prepare(
             "SELECT id, medication_id, medication_name, scheduled_time, actual_time, 
          status, temperature, heart_rate, created_at 
-         FROM medication_logs WHERE medication_id = ?1 ORDER BY created_at DESC LIMIT 20",
+         FROM medication_logs WHERE medication_id = ?1 ORDER BY created_epoch DESC LIMIT 20",
         )
         .map_err(|e| {
             error!("Prepare error: {}", e);
@@ -242,7 +245,7 @@ pub async fn get_all_medication_logs(config: web::Data<AppConfig>) -> Result<Htt
         .prepare(
             "SELECT id, medication_id, medication_name, scheduled_time, actual_time, 
          status, temperature, heart_rate, created_at 
-         FROM medication_logs ORDER BY created_at DESC LIMIT 100",
+         FROM medication_logs ORDER BY created_epoch DESC LIMIT 100",
         )
         .map_err(|e| {
             error!("Prepare error: {}", e);
@@ -289,7 +292,7 @@ pub async fn get_vitals(config: web::Data<AppConfig>) -> Result<HttpResponse> {
     let mut stmt = conn
         .prepare(
             "SELECT id, temperature, heart_rate, status, created_at 
-         FROM vitals_logs ORDER BY created_at DESC LIMIT 100",
+         FROM vitals_logs ORDER BY created_epoch DESC LIMIT 100",
         )
         .map_err(|e| {
             error!("Prepare error: {}", e);
@@ -394,3 +397,62 @@ pub async fn create_vitals(
 pub async fn get_all_vitals_logs(config: web::Data<AppConfig>) -> Result<HttpResponse> {
     get_vitals(config).await
 }
+
+#[derive(Debug, Deserialize)]
+pub struct AdherenceQuery {
+    pub days: Option<u32>,
+    pub medication_id: Option<i32>,
+}
+
+/// Daily adherence for charts, read from the daily_adherence rollup the
+/// device maintains (one row per medication per day, not every log)
+pub async fn get_adherence(
+    config: web::Data<AppConfig>,
+    query: web::Query<AdherenceQuery>,
+) -> Result<HttpResponse> {
+    let days = query.days.unwrap_or(365).clamp(1, 3660);
+    let conn = database::get_connection(&config.database_url).map_err(|e| {
+        error!("Database error: {}", e);
+        actix_web::error::ErrorInternalServerError("Database error")
+    })?;
+
+    let mut stmt = conn
+        .prepare(
+            "SELECT day, SUM(scheduled), SUM(taken), SUM(missed), SUM(delay_total), SUM(with_vitals)
+         FROM daily_adherence
+         WHERE day >= date('now', 'localtime', ?1) AND (?2 IS NULL OR medication_id = ?2)
+         GROUP BY day ORDER BY day",
+        )
+        .map_err(|e| {
+            error!("Prepare error: {}", e);
+            actix_web::error::ErrorInternalServerError("Database error")
+        })?;
+
+    let days_iter = stmt
+        .query_map(
+            params![format!("-{} days", days - 1), query.medication_id],
+            |row| {
+                let taken: i64 = row.get(2)?;
+                let delay_total: i64 = row.get(4)?;
+                Ok(DailyAdherence {
+                    day: row.get(0)?,
+                    scheduled: row.get(1)?,
+                    taken,
+                    missed: row.get(3)?,
+                    mean_delay_seconds: (taken > 0).then(|| delay_total as f64 / taken as f64),
+                    with_vitals: row.get(5)?,
+                })
+            },
+        )
+        .map_err(|e| {
+            error!("Query error: {}", e);
+            actix_web::error::ErrorInternalServerError("Database error")
+        })?;
+
+    let adherence: Vec<DailyAdherence> = days_iter.collect::<Result<Vec<_>, _>>().map_err(|e| {
+        error!("Collection error: {}", e);
+        actix_web::error::ErrorInternalServerError("Database error")
+    })?;
+
+    Ok(HttpResponse::Ok().json(adherence))
+}
@@ -2,7 +2,7 @@
 mod tests {
     use crate::config::AppConfig;
     use crate::database;
-    use crate::handlers::{create_medication, create_vitals, get_medications};
+    use crate::handlers::{create_medication, create_vitals, get_adherence, get_medications};
     use actix_web::{http::header, test, web, App};
     use std::env;
 
@@ -24,41 +24,9 @@ mod tests {
         // Remove the old database file if it exists
         let _ = std::fs::remove_file(&config.database_url);
 
-        let conn = database::get_connection(&config.database_url)
+        let mut conn = database::get_connection(&config.database_url)
             .expect("Failed to connect to test database");
-
-        let schema = vec![
-            "CREATE TABLE IF NOT EXISTS medications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                schedule_time TEXT NOT NULL,
-                active INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )",
-            "CREATE TABLE IF NOT EXISTS medication_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                medication_id INTEGER,
-                medication_name TEXT,
-                scheduled_time TEXT,
-                actual_time TEXT,
-                status TEXT,
-                temperature REAL,
-                heart_rate INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (medication_id) REFERENCES medications(id)
-            )",
-            "CREATE TABLE IF NOT EXISTS vitals_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                temperature REAL,
-                heart_rate INTEGER,
-                status TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )",
-        ];
-
-        for sql in schema {
-            conn.execute(sql, []).expect("Failed to create test table");
-        }
+        database::migrate(&mut conn).expect("Failed to create test schema");
     }
 
     #[actix_web::test]
@@ -191,4 +159,38 @@ mod tests {
 
         assert!(resp.status().is_client_error()); // Should return 400 Bad Request
     }
+
+    #[actix_web::test]
+    async fn test_get_adherence_sums_medications_per_day() {
+        let mut config = get_test_config();
+        config.database_url = "test_adherence.db".to_string();
+        init_test_db(&config);
+        let conn = database::get_connection(&config.database_url).unwrap();
+        conn.execute_batch(
+            "INSERT INTO daily_adherence
+                 (medication_id, day, scheduled, taken, missed, delay_total, with_vitals)
+             VALUES (1, date('now', 'localtime'), 1, 1, 0, 120, 1),
+                    (2, date('now', 'localtime'), 1, 1, 0, 360, 0),
+                    (1, '2000-01-01', 1, 0, 1, 0, 0);",
+        )
+        .unwrap();
+
+        let app = test::init_service(
+            App::new()
+                .app_data(web::Data::new(config))
+                .route("/adherence", web::get().to(get_adherence)),
+        )
+        .await;
+
+        let req = test::TestRequest::get()
+            .uri("/adherence?days=30")
+            .insert_header((header::AUTHORIZATION, auth_header_value()))
+            .to_request();
+        let days: serde_json::Value = test::call_and_read_body_json(&app, req).await;
+
+        assert_eq!(days.as_array().unwrap().len(), 1);
+        assert_eq!(days[0]["scheduled"], 2);
+        assert_eq!(days[0]["taken"], 2);
+        assert_eq!(days[0]["mean_delay_seconds"], 240.0);
+    }
 }
@@ -61,6 +61,7 @@ async fn main() -> std::io::Result<()> {
                             .route("", web::get().to(handlers::get_vitals))
                             .route("", web::post().to(handlers::create_vitals)),
                     )
+                    .route("/adherence", web::get().to(handlers::get_adherence))
                     .service(
                         web::scope("/logs")
                             .route(
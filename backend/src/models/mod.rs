@@ -146,6 +146,17 @@ pub struct MedicationLog {
     pub created_at: String,
 }
 
+/// One day of the daily_adherence rollup (summed over the selected medications)
+#[derive(Debug, Serialize, Deserialize)]
+pub struct DailyAdherence {
+    pub day: String,
+    pub scheduled: i64,
+    pub taken: i64,
+    pub missed: i64,
+    pub mean_delay_seconds: Option<f64>,
+    pub with_vitals: i64,
+}
+
 #[derive(Debug, Serialize, Deserialize)]
 pub struct VitalsLog {
     pub id: i32,
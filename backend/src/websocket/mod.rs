@@ -66,7 +66,7 @@ impl MedicationWebSocket {
                     let stmt = conn.prepare(
                         "SELECT id, medication_id, medication_name, scheduled_time, actual_time, status, temperature, heart_rate, created_at
                          FROM medication_logs
-                         ORDER BY created_at DESC
+                         ORDER BY created_epoch DESC
                          LIMIT 5"
                     ).ok();
 
@@ -177,7 +177,7 @@ impl VitalsWebSocket {
                         .prepare(
                             "SELECT id, temperature, heart_rate, status, created_at
                          FROM vitals_logs
-                         ORDER BY created_at DESC
+                         ORDER BY created_epoch DESC
                          LIMIT 5",
                         )
                         .ok();
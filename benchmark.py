@@ -0,0 +1,1508 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the MedHealth device runtime
+
+Usage:
+    python benchmark.py                 # run every benchmark
+    python benchmark.py connections     # run selected benchmarks
+"""
+
+import compileall
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import add_sample_data
+import medhealth_adherence
+import medhealth_control
+import medhealth_export
+import medhealth_history
+import medhealth_import
+import medhealth_metrics
+import medhealth_migrations
+import medhealth_ppg
+import medhealth_system
+import medhealth_tracing
+from medhealth_db import VitalsWriter, WriteBehindQueue, open_connection, sqlite_timestamp
+from medhealth_scheduler import DoseScheduler, local_day_bounds
+from medhealth_sensors import SensorChannel
+
+FIXTURE_MEDICATIONS = 40
+
+
+def build_fixture_db(db_path: str, log_rows: int, medications: int = FIXTURE_MEDICATIONS,
+                     journal_mode: str = "WAL", indexes: bool = True, seed: int = 42,
+                     legacy_schema: bool = False):
+    """Create a database with the device schema and log_rows medication logs
+
+    legacy_schema builds the tables of a pre-migrations release instead
+    (initial schema only, user_version 0) and fills only the text times.
+    """
+    rng = random.Random(seed)
+    if legacy_schema:
+        conn = sqlite3.connect(db_path)
+        for statement in medhealth_migrations.load_migrations()[0].statements:
+            conn.execute(statement)
+        conn.close()
+    else:
+        original_db = medhealth_system.DB_FILE
+        medhealth_system.DB_FILE = db_path
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                medhealth_system.init_database()
+        finally:
+            medhealth_system.DB_FILE = original_db
+            medhealth_system.close_all_connections()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    if not indexes:
+        for (index_name,) in conn.execute("""SELECT name FROM sqlite_master
+                                             WHERE type = 'index' AND sql IS NOT NULL""").fetchall():
+            conn.execute(f"DROP INDEX {index_name}")
+    minutes = [(i * 37) % 24 * 60 + (i * 13) % 60 for i in range(medications)]
+    if legacy_schema:
+        conn.executemany("INSERT INTO medications (name, schedule_time) VALUES (?, ?)",
+                         [(f"Med {i}", "%02d:%02d" % divmod(m, 60)) for i, m in enumerate(minutes)])
+    else:
+        conn.executemany("INSERT INTO medications (name, schedule_time, schedule_minute) VALUES (?, ?, ?)",
+                         [(f"Med {i}", "%02d:%02d" % divmod(m, 60), m) for i, m in enumerate(minutes)])
+    meds = conn.execute("SELECT id, name, schedule_time FROM medications").fetchall()
+
+    # Text times as the pre-migration device wrote them: 'HH:MM' schedule,
+    # local 'HH:MM:SS' actual time, UTC created_at
+    start = datetime.now() - timedelta(days=log_rows // max(len(meds), 1) + 1)
+    rows = []
+    for i in range(log_rows):
+        med_id, name, schedule_time = meds[i % len(meds)]
+        if i % len(meds) == 0:
+            logged = start + timedelta(days=i // len(meds))
+            epoch = int(logged.timestamp())
+            midnight = int(logged.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+            actual_time, created_at = logged.strftime("%H:%M:%S"), sqlite_timestamp(epoch)
+        status = "taken" if rng.random() < 0.85 else "missed"
+        scheduled = midnight + minutes[i % len(meds)] * 60
+        vitals = (36.6, 72) if status == "taken" and i % 10 == 0 else (None, None)  # Every 10th dose measured
+        rows.append((med_id, name, schedule_time, actual_time, status, *vitals,
+                     created_at, scheduled, epoch, epoch))
+    if legacy_schema:
+        conn.executemany('''INSERT INTO medication_logs
+                            (medication_id, medication_name, scheduled_time, actual_time,
+                             status, temperature, heart_rate, created_at)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', [row[:8] for row in rows])
+    else:
+        conn.executemany('''INSERT INTO medication_logs
+                            (medication_id, medication_name, scheduled_time, actual_time,
+                             status, temperature, heart_rate, created_at,
+                             scheduled_epoch, actual_epoch, created_epoch)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+        conn.commit()
+        medhealth_adherence.rebuild(conn)
+    conn.commit()
+    conn.close()
+
+
+def build_load_db(db_path: str, patients: int, days: int, medications: int = 4, seed: int = 42,
+                  end_date=None, append: bool = False, batch_rows: int = add_sample_data.BATCH_ROWS):
+    """Migrated database filled by the load generator; returns its GeneratedRows"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA cache_size=-65536")
+    medhealth_migrations.migrate(conn)
+    rows = add_sample_data.generate(conn, patients, medications, days, seed, end_date, append, batch_rows)
+    conn.close()
+    return rows
+
+
+def content_checksum(db_path: str) -> tuple:
+    """Aggregates over every generated column, to compare two databases"""
+    conn = sqlite3.connect(db_path)
+    checksum = conn.execute("""SELECT COUNT(*), SUM(medication_id), SUM(actual_epoch), TOTAL(temperature),
+                                      SUM(heart_rate), SUM(status = 'taken'), MAX(actual_time)
+                               FROM medication_logs""").fetchone() + \
+        conn.execute("SELECT COUNT(*), SUM(created_epoch), TOTAL(temperature), SUM(heart_rate) FROM vitals_logs").fetchone()
+    conn.close()
+    return checksum
+
+
+@contextlib.contextmanager
+def use_database(db_path: str):
+    """Point medhealth_system at db_path for the duration of the block"""
+    original_db = medhealth_system.DB_FILE
+    medhealth_system.DB_FILE = db_path
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        medhealth_system.DB_FILE = original_db
+        medhealth_system.close_all_connections()
+
+
+@contextlib.contextmanager
+def fixture_database(log_rows: int = 0, name: str = "fixture.db", use: bool = False, **options):
+    """build_fixture_db() in a temporary directory; yields the database path
+
+    use=True also points medhealth_system at it (use_database). Other
+    options go to build_fixture_db; the directory is removed afterwards.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, name)
+        build_fixture_db(db_path, log_rows, **options)
+        if use:
+            with use_database(db_path):
+                yield db_path
+        else:
+            yield db_path
+
+
+@contextlib.contextmanager
+def legacy_connections():
+    """Restore the old open-per-call behaviour (connection closed when dropped)"""
+    original = medhealth_system.get_connection
+    medhealth_system.get_connection = lambda db_file: sqlite3.connect(db_file)
+    try:
+        yield
+    finally:
+        medhealth_system.get_connection = original
+
+
+def calls_per_second(func, min_time: float = 1.0) -> float:
+    """Call func repeatedly for at least min_time seconds and return the rate"""
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+
+def insert_log_row():
+    """One synchronous medication_logs insert and commit (log_medication before the log queue)"""
+    conn = medhealth_system.get_connection(medhealth_system.DB_FILE)
+    conn.execute("""INSERT INTO medication_logs
+                    (medication_id, medication_name, scheduled_time, actual_time, status,
+                     scheduled_epoch, actual_epoch, created_epoch)
+                    VALUES (1, 'Med 0', '00:00', '00:00:00', 'taken', 0, 0, 0)""")
+    conn.commit()
+
+
+def bench_connections():
+    """Per-call connections vs the shared connection manager (100k log rows)"""
+    operations = {
+        "get_active_medications": medhealth_system.get_active_medications,
+        "get_upcoming_medications": medhealth_system.get_upcoming_medications,
+        "log insert + commit": insert_log_row,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.db")
+        shared_db = os.path.join(tmp, "shared.db")
+        build_fixture_db(legacy_db, 100_000, journal_mode="DELETE")
+        build_fixture_db(shared_db, 100_000, journal_mode="WAL")
+
+        print(f"{'Operation':<28} {'Before (calls/s)':>18} {'After (calls/s)':>18} {'Speedup':>9}")
+        print("─" * 76)
+        for name, func in operations.items():
+            with use_database(legacy_db), legacy_connections():
+                before = calls_per_second(func)
+            with use_database(shared_db):
+                after = calls_per_second(func)
+            print(f"{name:<28} {before:>18.1f} {after:>18.1f} {after / before:>8.1f}x")
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params=()) -> str:
+    """EXPLAIN QUERY PLAN output flattened to one string"""
+    return " | ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+TAKEN_TODAY_LEGACY_SQL = '''SELECT COUNT(*) FROM medication_logs
+                            WHERE medication_id = ? AND DATE(created_at) = ? AND status = 'taken' '''
+TAKEN_TODAY_SQL = medhealth_system.TAKEN_TODAY_SQL
+LATEST_TODAY_SQL = '''SELECT status, actual_epoch FROM medication_logs
+                      WHERE medication_id = ? AND created_epoch >= ? AND created_epoch < ?
+                      ORDER BY created_epoch DESC LIMIT 1'''
+
+
+def bench_indexes(log_rows: int = 1_000_000):
+    """DATE(created_at) full scans vs indexed day-range seeks (1M log rows)"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    today_range = local_day_bounds(time.time())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.db")
+        indexed_db = os.path.join(tmp, "indexed.db")
+        build_fixture_db(legacy_db, log_rows, indexes=False)
+        build_fixture_db(indexed_db, log_rows)
+
+        # The index-seek regression check lives in tests/test_db.py
+        conn = sqlite3.connect(indexed_db)
+        print(f"Plan: {query_plan(conn, TAKEN_TODAY_SQL, (1, *today_range))}")
+        dashboard_plan = query_plan(conn, medhealth_system.DASHBOARD_SQL,
+                                    {"start": today_range[0], "end": today_range[1]})
+        print(f"Plan: {dashboard_plan}")
+        conn.close()
+
+        legacy = sqlite3.connect(legacy_db)
+        indexed = sqlite3.connect(indexed_db)
+        before = calls_per_second(lambda: legacy.execute(TAKEN_TODAY_LEGACY_SQL, (1, today)).fetchone())
+        after = calls_per_second(lambda: indexed.execute(TAKEN_TODAY_SQL, (1, *today_range)).fetchone())
+        legacy.close()
+        indexed.close()
+
+        print(f"\n{'Query':<28} {'Before (ms)':>14} {'After (ms)':>14} {'Speedup':>9}")
+        print("─" * 68)
+        print(f"{'taken today?':<28} {1000 / before:>14.3f} {1000 / after:>14.3f} {after / before:>8.0f}x")
+
+
+def legacy_dashboard_queries(conn: sqlite3.Connection):
+    """The pre-loader dashboard: one lookup per medication plus the upcoming loop"""
+    today_range = local_day_bounds(time.time())
+    now = datetime.now()
+    current_minute = now.hour * 60 + now.minute
+    medications = conn.execute('''SELECT id, name, schedule_minute FROM medications
+                                  WHERE active = 1 ORDER BY schedule_minute''').fetchall()
+    for med_id, _, _ in medications:
+        conn.execute(LATEST_TODAY_SQL, (med_id, *today_range)).fetchone()
+    upcoming = conn.execute('''SELECT id, name, schedule_minute FROM medications
+                               WHERE active = 1 AND schedule_minute >= ?
+                               ORDER BY schedule_minute LIMIT 5''', (current_minute,)).fetchall()
+    for med_id, _, _ in upcoming:
+        conn.execute(TAKEN_TODAY_SQL, (med_id, *today_range)).fetchone()
+
+
+def bench_dashboard():
+    """N+1 dashboard queries vs load_dashboard_data() (40 medications, 100k log rows)"""
+    with fixture_database(100_000, name="dashboard.db") as db_path:
+
+        with use_database(db_path):
+            conn = medhealth_system.get_connection(db_path)
+            before = calls_per_second(lambda: legacy_dashboard_queries(conn))
+            after = calls_per_second(medhealth_system.load_dashboard_data)
+
+        print(f"{'Loader':<28} {'Before (ms)':>14} {'After (ms)':>14} {'Speedup':>9}")
+        print("─" * 68)
+        print(f"{'dashboard data':<28} {1000 / before:>14.3f} {1000 / after:>14.3f} {after / before:>8.1f}x")
+
+
+def bench_scheduler(entries: int = 20_000, spread: float = 2.0):
+    """Heap scheduler: update cost and firing lateness for 20k entries"""
+    scheduler = DoseScheduler()
+    base = time.time() + 0.5
+    due_times = [base + spread * i / entries for i in range(entries)]
+
+    start = time.perf_counter()
+    for key, due_at in enumerate(due_times):
+        scheduler.schedule(key, due_at)
+    schedule_us = (time.perf_counter() - start) / entries * 1e6
+
+    # Move every entry once (the old heap entries become stale and are compacted away)
+    start = time.perf_counter()
+    for key, due_at in enumerate(due_times):
+        scheduler.schedule(key, due_at)
+    reschedule_us = (time.perf_counter() - start) / entries * 1e6
+
+    lateness = []
+    while len(lateness) < entries:
+        lateness += [event.lateness for event in scheduler.wait_for_due(timeout=spread + 5)]
+
+    print(f"Entries:             {entries}")
+    print(f"schedule():          {schedule_us:.2f} µs/op")
+    print(f"re-schedule():       {reschedule_us:.2f} µs/op")
+    print(f"Fired:               {len(lateness)}")
+    print(f"Lateness mean/max:   {np.mean(lateness) * 1000:.3f} / {max(lateness) * 1000:.3f} ms")
+    print(f"Jitter (stddev):     {np.std(lateness) * 1000:.3f} ms")
+
+
+def bench_schedule_cache():
+    """get_active_medications(): medications query vs schedule cache (40 medications)"""
+    with fixture_database(100_000, name="cache.db") as db_path:
+
+        with use_database(db_path):
+            conn = medhealth_system.get_connection(db_path)
+            before = calls_per_second(lambda: conn.execute('''SELECT id, name, schedule_minute FROM medications
+                                                             WHERE active = 1 ORDER BY schedule_minute''').fetchall())
+            hits, misses = medhealth_system.schedule_cache.hits, medhealth_system.schedule_cache.misses
+            after = calls_per_second(medhealth_system.get_active_medications)
+            stats = medhealth_system.schedule_cache.stats()
+
+        print(f"{'Source':<28} {'Calls/s':>14}")
+        print("─" * 44)
+        print(f"{'medications query':<28} {before:>14.0f}")
+        print(f"{'schedule cache':<28} {after:>14.0f}")
+        print(f"\nCache hits: {stats['hits'] - hits} | misses (table reloads): {stats['misses'] - misses}")
+
+
+def bench_concurrent_alarms(doses: int = 20):
+    """20 medications due in the same minute: all ring, one press confirms all"""
+    with fixture_database(0, name="alarms.db", medications=0) as db_path:
+
+        with use_database(db_path):
+            med_ids = [medhealth_system.schedule_cache.add(db_path, f"Dose {i}", 8 * 60) for i in range(doses)]
+            medhealth_system.alarm_monitoring_active = True
+            loop = threading.Thread(target=medhealth_system.medication_alarm_monitoring, daemon=True)
+            loop.start()
+
+            due_at = time.time() + 0.5
+            for med_id in med_ids:
+                medhealth_system.dose_scheduler.schedule(med_id, due_at, (f"Dose {med_id - 1}", 8 * 60))
+            while len(medhealth_system.dose_alarms.outstanding()) < doses and time.time() < due_at + 5:
+                time.sleep(0.01)
+            ringing = medhealth_system.dose_alarms.outstanding()
+            ring_lateness = max(alarm.rang_at - alarm.due_at for alarm in ringing)
+
+            confirmed = medhealth_system.confirm_ringing_doses()
+            medhealth_system.stop_alarm_monitoring()
+            loop.join(5)
+            medhealth_system.log_queue.flush()
+
+            taken = medhealth_system.get_connection(db_path).execute(
+                "SELECT COUNT(DISTINCT medication_id) FROM medication_logs WHERE status = 'taken'").fetchone()[0]
+
+        print(f"Doses due:           {doses}")
+        print(f"Ringing together:    {len(ringing)} (latest started {ring_lateness * 1000:.1f} ms after due)")
+        print(f"Confirmed by 1 press:{confirmed:>3}")
+        print(f"Logged as taken:     {taken}")
+
+
+class FakeGPIO:
+    """Just enough of RPi.GPIO to drive the button code without hardware"""
+
+    BOARD, IN, OUT, PUD_UP, BOTH, LOW, HIGH = "BOARD", "IN", "OUT", "PUD_UP", "BOTH", 0, 1
+
+    def __init__(self):
+        self.levels = {}
+        self.callbacks = {}
+
+    def input(self, pin):
+        return self.levels.get(pin, self.HIGH)
+
+    def output(self, pin, level):
+        self.levels[pin] = level
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        self.callbacks[pin] = callback
+
+    def set_level(self, pin, level):
+        """Change an input level and fire its edge callback like the GPIO thread would"""
+        self.levels[pin] = level
+        callback = self.callbacks.get(pin)
+        if callback:
+            threading.Thread(target=callback, args=(pin,)).start()
+
+
+@contextlib.contextmanager
+def fake_gpio(interrupts: bool):
+    """Install FakeGPIO, with or without button edge detection"""
+    gpio = FakeGPIO()
+    original = medhealth_system.GPIO, medhealth_system.button_interrupts
+    medhealth_system.GPIO = gpio
+    medhealth_system.button_interrupts = False
+    if interrupts:
+        with contextlib.redirect_stdout(io.StringIO()):
+            medhealth_system.enable_button_interrupts()
+    try:
+        yield gpio
+    finally:
+        medhealth_system.GPIO, medhealth_system.button_interrupts = original
+
+
+def bench_button(presses: int = 20, idle_seconds: float = 3.0):
+    """Button press-to-acknowledge latency and idle CPU: 20 ms polling vs edge events"""
+    print(f"{'Mode':<16} {'Latency p50 (ms)':>17} {'Latency max (ms)':>17} {'Idle CPU (%)':>13}")
+    print("─" * 66)
+    for mode, interrupts in (("polling", False), ("edge events", True)):
+        with fake_gpio(interrupts) as gpio:
+            latencies = []
+            for _ in range(presses):
+                result = {}
+                waiter = threading.Thread(
+                    target=lambda: result.setdefault("at", medhealth_system.wait_for_button(5) and time.perf_counter()))
+                waiter.start()
+                time.sleep(0.05)
+                pressed_at = time.perf_counter()
+                gpio.set_level(medhealth_system.BUTTON_PIN, gpio.LOW)
+                time.sleep(0.08)  # Human press length; polling waits for release
+                gpio.set_level(medhealth_system.BUTTON_PIN, gpio.HIGH)
+                waiter.join()
+                latencies.append((result["at"] - pressed_at) * 1000)
+
+            cpu_start = time.process_time()
+            medhealth_system.wait_for_button(idle_seconds)
+            idle_cpu = (time.process_time() - cpu_start) / idle_seconds * 100
+
+        latencies.sort()
+        print(f"{mode:<16} {latencies[len(latencies) // 2]:>17.2f} {latencies[-1]:>17.2f} {idle_cpu:>13.2f}")
+
+
+def legacy_health_alert(led_pin):
+    """The pre-worker alert: a new thread toggling pins with time.sleep"""
+    def run():
+        end_time = time.time() + 5
+        while time.time() < end_time:
+            medhealth_system.led_on(led_pin)
+            time.sleep(0.3)
+            medhealth_system.led_off(led_pin)
+            time.sleep(0.3)
+        end_time = time.time() + 5
+        while time.time() < end_time:
+            medhealth_system.buzzer_on()
+            time.sleep(0.1)
+            medhealth_system.buzzer_off()
+            time.sleep(0.1)
+    threading.Thread(target=run, daemon=True).start()
+
+
+def bench_actuators(seconds: float = 10.0, interval: float = 0.5):
+    """Sustained abnormal vitals: thread count and CPU, thread-per-alert vs actuator worker"""
+    originals = (medhealth_system.read_temperature, medhealth_system.read_heart_rate,
+                 medhealth_system.monitoring_active)
+    medhealth_system.read_temperature = lambda: 40.0
+    medhealth_system.read_heart_rate = lambda: 150
+
+    def legacy_check():
+        legacy_health_alert(medhealth_system.LED_TEMP_PIN)
+        legacy_health_alert(medhealth_system.LED_HEART_PIN)
+
+    print(f"{'Mode':<20} {'Alerts':>7} {'Peak threads':>13} {'CPU (%)':>9}")
+    print("─" * 52)
+    baseline_threads = threading.active_count()
+    try:
+        medhealth_system.monitoring_active = True
+        for mode, check in (("thread per alert", legacy_check),
+                            ("actuator worker", medhealth_system.check_health_monitoring)):
+            # Let alert threads from the previous mode finish first
+            while threading.active_count() > baseline_threads:
+                time.sleep(0.1)
+            with fake_gpio(False), contextlib.redirect_stdout(io.StringIO()):
+                peak = 0
+                alerts = 0
+                cpu_start = time.process_time()
+                end = time.monotonic() + seconds
+                while time.monotonic() < end:
+                    check()
+                    alerts += 2
+                    time.sleep(interval)
+                    peak = max(peak, threading.active_count() - baseline_threads)
+                cpu = (time.process_time() - cpu_start) / seconds * 100
+                medhealth_system.actuators.stop_all()
+            print(f"{mode:<20} {alerts:>7} {peak:>13} {cpu:>9.2f}")
+    finally:
+        (medhealth_system.read_temperature, medhealth_system.read_heart_rate,
+         medhealth_system.monitoring_active) = originals
+
+
+def bench_sampler(i2c_read_seconds: float = 0.05):
+    """Consumer read latency: direct sensor read vs sampler ring buffer"""
+    def slow_sensor():
+        time.sleep(i2c_read_seconds)  # Stand-in for a bus transaction
+        return 72.0
+
+    channel = SensorChannel("bench", slow_sensor, interval=0.01, capacity=600)
+    channel.start()
+    channel.wait_for_sample(1)
+    time.sleep(1)  # Fill part of the ring
+
+    def per_call_us(func, calls):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        return (time.perf_counter() - start) / calls * 1e6
+
+    direct = per_call_us(slow_sensor, 20)
+    latest = per_call_us(channel.latest, 200_000)
+    window = per_call_us(lambda: channel.buffer.window(1.0), 20_000)
+    channel.stop()
+
+    print(f"{'Consumer read':<36} {'Latency (µs)':>14}")
+    print("─" * 52)
+    print(f"{f'direct sensor read ({i2c_read_seconds * 1000:.0f} ms bus)':<36} {direct:>14.1f}")
+    print(f"{'sampler latest()':<36} {latest:>14.3f}")
+    print(f"{'sampler 1 s window (~18 samples)':<36} {window:>14.3f}")
+
+
+class FakeMax30102I2C:
+    """busio.I2C stand-in whose MAX30102 FIFO replays a recorded red/IR trace"""
+
+    def __init__(self, red, ir):
+        self.red = red
+        self.ir = ir
+        self.position = 0
+        self.pending = 0  # Samples "acquired" since the last drain
+
+    def try_lock(self):
+        return True
+
+    def unlock(self):
+        pass
+
+    def writeto(self, address, data):
+        pass
+
+    def writeto_then_readfrom(self, address, out, buffer):
+        register = out[0]
+        if register == medhealth_ppg.REG_FIFO_WR_PTR:
+            buffer[:3] = bytes((self.pending % medhealth_ppg.FIFO_DEPTH, 0, 0))
+        elif register == medhealth_ppg.REG_FIFO_DATA:
+            count = len(buffer) // medhealth_ppg.BYTES_PER_SAMPLE
+            data = bytearray()
+            for red, ir in zip(self.red[self.position:self.position + count],
+                               self.ir[self.position:self.position + count]):
+                data += int(red).to_bytes(3, "big") + int(ir).to_bytes(3, "big")
+            buffer[:len(data)] = data
+            self.position += count
+            self.pending = 0
+
+
+def bench_ppg(seconds: float = 8.0):
+    """PPG heart-rate pipeline: accuracy on synthetic traces and samples/second"""
+    fs = medhealth_ppg.SAMPLE_RATE
+    print(f"{'True BPM':<10} {'Estimated':>10} {'Error':>8}")
+    print("─" * 30)
+    worst = 0.0
+    for true_bpm in (45, 60, 72, 90, 110, 140, 180):
+        red, ir = medhealth_ppg.synthetic_ppg(true_bpm, seconds, seed=true_bpm)
+        # Replay through the FIFO reader in 25-sample bursts (one 0.25 s drain each)
+        i2c = FakeMax30102I2C(red, ir)
+        fifo = medhealth_ppg.Max30102Fifo(i2c)
+        pipeline = medhealth_ppg.HeartRatePipeline()
+        bpm = None
+        while i2c.position < ir.size:
+            i2c.pending = min(25, ir.size - i2c.position)
+            bpm = pipeline.feed(*fifo.read_samples())
+        error = abs(bpm - true_bpm) if bpm is not None else float("inf")
+        worst = max(worst, error)
+        print(f"{true_bpm:<10} {bpm if bpm is None else round(bpm, 1):>10} {error:>8.1f}")
+    assert worst <= 3.0, f"PPG estimate off by {worst:.1f} bpm"
+
+    no_finger = medhealth_ppg.analyze_window(*(np.full((2, int(fs * seconds)), 2000.0)), fs)
+    assert no_finger is None, "estimate without a finger on the sensor"
+
+    # Throughput: decode + window + one estimate per second of signal
+    red, ir = medhealth_ppg.synthetic_ppg(72, 60)
+    raw = np.stack([red, ir], axis=1).astype(">u4").view(np.uint8).reshape(-1, 2, 4)[..., 1:].tobytes()
+    chunk = medhealth_ppg.FIFO_DEPTH * medhealth_ppg.BYTES_PER_SAMPLE
+    pipeline = medhealth_ppg.HeartRatePipeline()
+    start = time.perf_counter()
+    for offset in range(0, len(raw), chunk):
+        pipeline.feed(*medhealth_ppg.decode_fifo(raw[offset:offset + chunk]))
+    elapsed = time.perf_counter() - start
+    window = medhealth_ppg.synthetic_ppg(72, seconds)
+    start = time.perf_counter()
+    for _ in range(200):
+        medhealth_ppg.analyze_window(*window, fs)
+    estimate_ms = (time.perf_counter() - start) / 200 * 1000
+
+    print()
+    print(f"pipeline throughput: {ir.size / elapsed:,.0f} samples/s "
+          f"({ir.size / elapsed / fs:,.0f}x real time at {fs} sps)")
+    print(f"estimate over {seconds:.0f} s window: {estimate_ms:.2f} ms "
+          f"(legacy read_heart_rate: ≥1 s of 100 ms sleeps per reading)")
+
+
+def bench_spo2(minutes: int = 60, segment_seconds: int = 60, seed: int = 7):
+    """SpO2 and signal quality over a 60-minute synthetic trace with motion episodes"""
+    fs = medhealth_ppg.SAMPLE_RATE
+    rng = random.Random(seed)
+    pipeline = medhealth_ppg.HeartRatePipeline()
+    segments = minutes * 60 // segment_seconds
+    counts = {"clean": [0, 0], "motion": [0, 0]}  # kind -> [windows, accepted]
+    errors = []
+    false_accepts = 0
+    peak_memory = {}
+    analysed = 0
+    analysis = 0.0
+
+    for segment in range(segments):
+        bpm = rng.uniform(50, 130)
+        spo2 = rng.uniform(86, 99)
+        kind = "motion" if rng.random() < 0.2 else "clean"
+        red, ir = medhealth_ppg.synthetic_ppg(bpm, segment_seconds, spo2=spo2,
+                                              motion=10.0 if kind == "motion" else 0.0,
+                                              seed=seed * 1000 + segment)
+        # Trace allocations in the second and last segment only (tracemalloc is slow)
+        traced = segment in (1, segments - 1)
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        for offset in range(0, ir.size, 25):
+            previous = pipeline.reading
+            pipeline.feed(red[offset:offset + 25], ir[offset:offset + 25])
+            if pipeline.reading is previous:
+                continue
+            analysed += 1
+            # Score only windows lying entirely inside this segment
+            if offset + 25 < medhealth_ppg.WINDOW_SECONDS * fs:
+                continue
+            reading = pipeline.reading
+            counts[kind][0] += 1
+            if reading is not None and reading.bpm is not None:
+                counts[kind][1] += 1
+                errors.append(abs(reading.spo2 - spo2))
+                false_accepts += abs(reading.bpm - bpm) > 5
+        if traced:
+            peak_memory[segment] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            analysis += time.perf_counter() - start
+
+    timed_seconds = (segments - 2) * segment_seconds
+    print(f"{'Segment type':<14} {'Windows':>9} {'Accepted':>10}")
+    print("─" * 35)
+    for kind, (total, accepted) in counts.items():
+        print(f"{kind:<14} {total:>9} {accepted / max(total, 1):>10.1%}")
+    print()
+    print(f"SpO2 error on accepted windows: mean {np.mean(errors):.3f}, max {np.max(errors):.2f} points")
+    print(f"accepted windows with HR off by >5 bpm: {false_accepts}")
+    print(f"analysis: {analysed * (segments - 2) / segments / analysis:,.0f} windows/s, "
+          f"{timed_seconds * fs / analysis:,.0f} samples/s")
+    print(f"peak memory while feeding: {peak_memory[1] / 1024:.0f} KiB in minute 2, "
+          f"{peak_memory[segments - 1] / 1024:.0f} KiB in minute {minutes}")
+    assert false_accepts == 0, "motion artefacts passed the quality gate"
+    assert counts["motion"][1] / max(counts["motion"][0], 1) < 0.05, "motion windows not rejected"
+
+
+def bytes_written() -> int:
+    """Bytes this process has passed to write() so far (Linux), or 0 if unknown"""
+    try:
+        with open("/proc/self/io") as io_stats:
+            for line in io_stats:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def bench_vitals(hours: int = 24, interval: float = 10.0):
+    """24 h of vitals every 10 s: commit per reading vs batched, downsampled writer"""
+    start_at = time.time() - hours * 3600
+    readings = [(start_at + i * interval, round(36.5 + (i % 7) * 0.1, 1), 70 + i % 15)
+                for i in range(int(hours * 3600 / interval))]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, flush_interval in (("per reading", None), ("batched 1 min", 60), ("batched 5 min", 300)):
+            db_path = os.path.join(tmp, f"{mode.replace(' ', '_')}.db")
+            build_fixture_db(db_path, 0, medications=0)
+            writer = VitalsWriter(flush_interval=flush_interval or 60)
+            written = bytes_written()
+            start = time.perf_counter()
+            if flush_interval is None:
+                conn = medhealth_system.get_connection(db_path)
+                for at, temp, hr in readings:
+                    conn.execute("""INSERT INTO vitals_logs (temperature, heart_rate, status, created_at, created_epoch)
+                                    VALUES (?, ?, 'normal', ?, ?)""", (temp, hr, sqlite_timestamp(at), int(at)))
+                    conn.commit()
+                commits = len(readings)
+            else:
+                for at, temp, hr in readings:
+                    writer.record(db_path, temp, hr, "normal", at=at)
+                writer.flush(db_path, now=readings[-1][0])
+                commits = writer.commits
+            elapsed = time.perf_counter() - start
+            written = bytes_written() - written
+            medhealth_system.close_all_connections()
+
+            conn = sqlite3.connect(db_path)
+            rows, raw_rows, samples = conn.execute("""SELECT COUNT(*), COUNT(*) - COUNT(samples),
+                                                             SUM(COALESCE(samples, 1))
+                                                      FROM vitals_logs""").fetchone()
+            conn.close()
+            assert samples == len(readings), f"{mode}: {samples} readings stored, expected {len(readings)}"
+            results[mode] = (commits, written, rows, raw_rows, elapsed)
+
+    print(f"{'Mode':<14} {'Commits':>9} {'Bytes written':>15} {'Rows kept':>11} {'Raw rows':>10} {'Time (s)':>10}")
+    print("─" * 74)
+    for mode, (commits, written, rows, raw_rows, elapsed) in results.items():
+        written_text = f"{written / 1024 / 1024:.1f} MiB" if written else "n/a"
+        print(f"{mode:<14} {commits:>9} {written_text:>15} {rows:>11} {raw_rows:>10} {elapsed:>10.2f}")
+    print(f"\n{len(readings)} readings; the batched writer keeps the last hour raw "
+          f"and 1-minute means before that")
+
+
+def bench_log_queue(rows: int = 5000):
+    """medication_logs inserts: synchronous commit per row vs write-behind group commit"""
+    sql = """INSERT INTO medication_logs (medication_id, medication_name, scheduled_time, actual_time, status,
+                                          scheduled_epoch, actual_epoch, created_epoch)
+             VALUES (?, ?, '08:00', '08:00:05', 'taken', 0, 5, 5)"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("commit per row (NORMAL)", "commit per row (FULL)", "write-behind (FULL)"):
+            db_path = os.path.join(tmp, f"{len(results)}.db")
+            build_fixture_db(db_path, 0, medications=0)
+            latencies = []
+            start = time.perf_counter()
+            if mode.startswith("commit per row"):
+                conn = medhealth_system.get_connection(db_path)
+                conn.execute(f"PRAGMA synchronous={'FULL' if 'FULL' in mode else 'NORMAL'}")
+                for i in range(rows):
+                    call = time.perf_counter()
+                    conn.execute(sql, (i, f"Med {i}"))
+                    conn.commit()
+                    latencies.append(time.perf_counter() - call)
+                commits = rows
+            else:
+                log_queue = WriteBehindQueue()
+                for i in range(rows):
+                    call = time.perf_counter()
+                    log_queue.submit(db_path, sql, (i, f"Med {i}"))
+                    latencies.append(time.perf_counter() - call)
+                log_queue.close()
+                commits = log_queue.commits
+            elapsed = time.perf_counter() - start
+            medhealth_system.close_all_connections()
+            stored = sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM medication_logs").fetchone()[0]
+            assert stored == rows, f"{mode}: {stored} of {rows} rows stored"
+            latencies.sort()
+            results[mode] = (rows / elapsed, latencies[len(latencies) // 2],
+                             latencies[len(latencies) * 99 // 100], commits)
+
+    print(f"{'Mode':<26} {'Rows/s':>10} {'Caller p50 (µs)':>16} {'p99 (µs)':>10} {'Commits':>9}")
+    print("─" * 75)
+    for mode, (rate, p50, p99, commits) in results.items():
+        print(f"{mode:<26} {rate:>10,.0f} {p50 * 1e6:>16.1f} {p99 * 1e6:>10.1f} {commits:>9}")
+
+
+def bench_migrations(log_rows: int = 1_000_000):
+    """Upgrade a pre-migrations database (1M log rows): dry-run estimate vs actual, writer stalls"""
+    with fixture_database(log_rows, name="legacy.db", legacy_schema=True) as db_path:
+        migrations = medhealth_migrations.load_migrations()
+
+        conn = open_connection(db_path)
+        start = time.perf_counter()
+        steps = medhealth_migrations.plan(conn)
+        dry_run = time.perf_counter() - start
+        assert medhealth_migrations.current_version(conn) == 0, "dry run changed the database"
+
+        # A concurrent logger keeps inserting while the upgrade holds the write
+        # lock, retrying busy errors the way the write-behind queue does
+        stalls = []
+        busy = []
+        stop = threading.Event()
+
+        def writer():
+            writer_conn = open_connection(db_path)
+            while not stop.is_set():
+                begin = time.perf_counter()
+                while True:
+                    try:
+                        writer_conn.execute("""INSERT INTO medication_logs (medication_id, status)
+                                               VALUES (1, 'taken')""")
+                        writer_conn.commit()
+                        break
+                    except sqlite3.OperationalError:
+                        writer_conn.rollback()
+                        busy.append(time.perf_counter())
+                stalls.append(time.perf_counter() - begin)
+                time.sleep(0.01)
+            writer_conn.close()
+
+        thread = threading.Thread(target=writer, daemon=True)
+        thread.start()
+        time.sleep(0.1)
+        actual = {}
+        for step in steps:
+            begin = time.perf_counter()
+            medhealth_migrations.migrate(conn, migrations[:step.version])
+            actual[step.version] = time.perf_counter() - begin
+        stop.set()
+        thread.join()
+        assert medhealth_migrations.current_version(conn) == medhealth_migrations.latest_version()
+        conn.close()
+
+    print(f"Dry run (sampled {medhealth_migrations.DRY_RUN_SAMPLE_ROWS:,} rows/table): {dry_run:.2f} s\n")
+    print(f"{'Step':<46} {'Rows':>10} {'Estimate (s)':>13} {'Actual (s)':>11}")
+    print("─" * 83)
+    for step in steps:
+        print(f"{f'{step.version:04d} {step.name}':<46} {step.rows:>10,} "
+              f"{step.estimated_seconds:>13.2f} {actual[step.version]:>11.2f}")
+    stalls.sort()
+    print(f"\nConcurrent inserts during upgrade: {len(stalls)}, "
+          f"p50 {stalls[len(stalls) // 2] * 1000:.1f} ms, max {stalls[-1] * 1000:.0f} ms, "
+          f"{len(busy)} busy timeouts retried (longest single step {max(actual.values()) * 1000:.0f} ms)")
+
+
+def legacy_alarm_check(conn: sqlite3.Connection, now: datetime) -> list:
+    """One pass of the pre-typed alarm loop: parse every 'HH:MM' and compare datetimes"""
+    due = []
+    for med_id, name, schedule_time in conn.execute("""SELECT id, name, schedule_time FROM medications
+                                                       WHERE active = 1""").fetchall():
+        hour, minute = map(int, schedule_time.split(':'))
+        scheduled = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if abs((now - scheduled).total_seconds()) <= 30:
+            due.append(med_id)
+    return due
+
+
+def typed_alarm_check(conn: sqlite3.Connection, now: datetime) -> list:
+    """The same pass on schedule_minute: integer arithmetic only"""
+    seconds_now = now.hour * 3600 + now.minute * 60 + now.second
+    return [med_id for med_id, schedule_minute in conn.execute("""SELECT id, schedule_minute FROM medications
+                                                                  WHERE active = 1""").fetchall()
+            if abs(schedule_minute * 60 - seconds_now) <= 30]
+
+
+def index_bytes(conn: sqlite3.Connection, table: str) -> dict:
+    """Size of each index on table (dbstat)"""
+    return dict(conn.execute("""SELECT name, SUM(pgsize) FROM dbstat
+                                WHERE name IN (SELECT name FROM sqlite_master
+                                               WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL)
+                                GROUP BY name ORDER BY name""", (table,)))
+
+
+def bench_time_model(log_rows: int = 1_000_000):
+    """Text times vs integer epoch / minute-of-day columns: alarm check and history (1M log rows)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        text_db = os.path.join(tmp, "text.db")
+        typed_db = os.path.join(tmp, "typed.db")
+        build_fixture_db(text_db, log_rows, legacy_schema=True)
+        migrations = medhealth_migrations.load_migrations()
+        conn = sqlite3.connect(text_db)
+        medhealth_migrations.migrate(conn, migrations[:4])  # Text-column indexes, pre-typed schema
+        conn.execute("VACUUM INTO ?", (typed_db,))
+        conn.close()
+
+        typed = sqlite3.connect(typed_db)
+        start = time.perf_counter()
+        medhealth_migrations.migrate(typed)
+        backfill = time.perf_counter() - start
+        missing = typed.execute("""SELECT COUNT(*) FROM medication_logs
+                                   WHERE created_epoch IS NULL OR scheduled_epoch IS NULL
+                                      OR actual_epoch IS NULL""").fetchone()[0]
+        assert missing == 0, f"{missing} rows left without epoch times"
+        typed.execute("VACUUM")
+        text = sqlite3.connect(text_db)
+        text.execute("VACUUM")
+
+        now = datetime.now()
+        day_start, day_end = local_day_bounds(now.timestamp())
+        week_start = day_start - 7 * 86400
+        assert legacy_alarm_check(text, now) == typed_alarm_check(typed, now)
+        queries = [
+            ("alarm check (40 meds)",
+             lambda: legacy_alarm_check(text, now), lambda: typed_alarm_check(typed, now)),
+            ("taken today?",
+             lambda: text.execute("""SELECT COUNT(*) FROM medication_logs
+                                     WHERE medication_id = 1 AND created_at >= ? AND created_at < ?
+                                       AND status = 'taken'""",
+                                  (sqlite_timestamp(day_start), sqlite_timestamp(day_end))).fetchone(),
+             lambda: typed.execute(TAKEN_TODAY_SQL, (1, day_start, day_end)).fetchone()),
+            ("history (latest 20)",
+             lambda: text.execute("""SELECT medication_name, scheduled_time, actual_time, status, created_at
+                                     FROM medication_logs ORDER BY created_at DESC LIMIT 20""").fetchall(),
+             lambda: typed.execute("""SELECT medication_name, scheduled_epoch, actual_epoch, status, created_epoch
+                                      FROM medication_logs ORDER BY created_epoch DESC LIMIT 20""").fetchall()),
+            ("missed in last 7 days",
+             lambda: text.execute("""SELECT COUNT(*) FROM medication_logs
+                                     WHERE status = 'missed' AND created_at >= ?""",
+                                  (sqlite_timestamp(week_start),)).fetchone(),
+             lambda: typed.execute("""SELECT COUNT(*) FROM medication_logs
+                                      WHERE status = 'missed' AND created_epoch >= ?""",
+                                   (week_start,)).fetchone()),
+        ]
+        print(f"{'Query':<28} {'Text (ms)':>14} {'Integer (ms)':>14} {'Speedup':>9}")
+        print("─" * 68)
+        for name, before_func, after_func in queries:
+            assert before_func() == after_func() or name.startswith("history"), name
+            before = calls_per_second(before_func)
+            after = calls_per_second(after_func)
+            print(f"{name:<28} {1000 / before:>14.4f} {1000 / after:>14.4f} {after / before:>8.1f}x")
+
+        text_index = index_bytes(text, "medication_logs")
+        typed_index = index_bytes(typed, "medication_logs")
+        text.close()
+        typed.close()
+
+    print(f"\nBackfill + index rebuild (migrations 5-{migrations[-1].version}): {backfill:.2f} s")
+    print("\nmedication_logs indexes (MiB):")
+    for name, size in list(text_index.items()) + list(typed_index.items()):
+        print(f"  {name:<36} {size / 2**20:>6.1f}")
+
+
+ADHERENCE_FROM_LOGS_SQL = """SELECT date(scheduled_epoch, 'unixepoch', 'localtime') AS day,
+                                    COUNT(*), SUM(status = 'taken'), SUM(status = 'missed'),
+                                    SUM(CASE WHEN status = 'taken' THEN actual_epoch - scheduled_epoch END),
+                                    SUM(temperature IS NOT NULL OR heart_rate IS NOT NULL)
+                             FROM medication_logs
+                             WHERE created_epoch >= ? {medication}
+                             GROUP BY day ORDER BY day"""
+
+
+def bench_adherence(log_rows: int = 1_000_000, doses: int = 5000):
+    """12-month adherence chart: aggregate medication_logs vs the daily_adherence rollup (1M log rows)"""
+    with fixture_database(log_rows, name="adherence.db") as db_path:
+        conn = sqlite3.connect(db_path)
+        start = time.perf_counter()
+        rollup_rows = medhealth_adherence.rebuild(conn)
+        rebuild_seconds = time.perf_counter() - start
+
+        since = medhealth_adherence.first_day(365)
+        since_epoch = int(datetime.strptime(since, "%Y-%m-%d").timestamp())
+        all_logs = ADHERENCE_FROM_LOGS_SQL.format(medication="")
+        one_log = ADHERENCE_FROM_LOGS_SQL.format(medication="AND medication_id = ?")
+        charts = [
+            ("12 months, all medications",
+             lambda: conn.execute(all_logs, (since_epoch,)).fetchall(),
+             lambda: medhealth_adherence.daily(conn, 365),
+             conn.execute("SELECT COUNT(*) FROM medication_logs WHERE created_epoch >= ?",
+                          (since_epoch,)).fetchone()[0],
+             conn.execute("SELECT COUNT(*) FROM daily_adherence WHERE day >= ?", (since,)).fetchone()[0]),
+            ("12 months, one medication",
+             lambda: conn.execute(one_log, (since_epoch, 1)).fetchall(),
+             lambda: medhealth_adherence.daily(conn, 365, 1),
+             conn.execute("""SELECT COUNT(*) FROM medication_logs
+                             WHERE created_epoch >= ? AND medication_id = 1""", (since_epoch,)).fetchone()[0],
+             conn.execute("""SELECT COUNT(*) FROM daily_adherence
+                             WHERE day >= ? AND medication_id = 1""", (since,)).fetchone()[0]),
+        ]
+        print(f"{'Chart':<28} {'Logs (ms)':>10} {'Rollup (ms)':>12} {'Speedup':>8} {'Rows: logs':>11} {'rollup':>7}")
+        print("─" * 81)
+        for name, from_logs, from_rollup, log_count, rollup_count in charts:
+            expected = [tuple(row[:4]) for row in from_logs()]
+            assert expected == [tuple(point[:4]) for point in from_rollup()], name
+            before = calls_per_second(from_logs)
+            after = calls_per_second(from_rollup)
+            print(f"{name:<28} {1000 / before:>10.2f} {1000 / after:>12.2f} {after / before:>7.1f}x "
+                  f"{log_count:>11,} {rollup_count:>7,}")
+        conn.close()
+
+        # Write side: log row alone vs log row + rollup upsert, both through the log queue
+        insert_sql = """INSERT INTO medication_logs (medication_id, medication_name, scheduled_time, actual_time,
+                                                     status, scheduled_epoch, actual_epoch, created_epoch)
+                        VALUES (?, 'Med', '08:00', '08:05:00', 'taken', ?, ?, ?)"""
+        print(f"\n{'Log write':<28} {'Doses/s':>10}")
+        print("─" * 40)
+        base = time.time() - doses * 3600
+        for mode in ("log row only", "log row + rollup upsert"):
+            log_queue = WriteBehindQueue()
+            start = time.perf_counter()
+            for i in range(doses):
+                due = base + i * 3600
+                group = [(insert_sql, (1 + i % FIXTURE_MEDICATIONS, due, due + 300, due + 300))]
+                if mode != "log row only":
+                    group.append(medhealth_adherence.dose_statement(1 + i % FIXTURE_MEDICATIONS,
+                                                                   due, due + 300, "taken", False))
+                log_queue.submit_group(db_path, group)
+            log_queue.close()
+            print(f"{mode:<28} {doses / (time.perf_counter() - start):>10,.0f}")
+        medhealth_system.close_all_connections()
+
+        conn = sqlite3.connect(db_path)
+        incremental = conn.execute("SELECT SUM(scheduled) FROM daily_adherence").fetchone()[0]
+        medhealth_adherence.rebuild(conn)
+        rebuilt = conn.execute("SELECT SUM(scheduled) FROM daily_adherence").fetchone()[0]
+        conn.close()
+
+    print(f"\nRebuild from {log_rows:,} logs: {rebuild_seconds:.2f} s ({rollup_rows:,} rollup rows)")
+    print(f"Incremental vs rebuilt dose count: {incremental:,} / {rebuilt:,} "
+          f"(rebuild also picks up the {doses:,} logs written without upserts)")
+
+
+def history_offset_page(conn: sqlite3.Connection, filters: medhealth_history.HistoryFilter,
+                        number: int, size: int = 20):
+    """Page `number` (1-based) with LIMIT/OFFSET, the paging keyset replaces"""
+    conditions, params = medhealth_history.where_clause(filters)
+    return conn.execute(f"""SELECT id, medication_id, medication_name, scheduled_epoch, actual_epoch,
+                                   status, temperature, heart_rate, created_epoch
+                            FROM medication_logs {'WHERE ' + conditions if conditions else ''}
+                            ORDER BY created_epoch DESC, id DESC LIMIT ? OFFSET ?""",
+                        params + [size, (number - 1) * size]).fetchall()
+
+
+def bench_history(log_rows: int = 1_000_000, pages=(1, 10, 100, 1000, 10000)):
+    """History browser: keyset vs OFFSET paging, with filters (1M log rows, 20 rows per page)"""
+    with fixture_database(log_rows, name="history.db") as db_path:
+        conn = sqlite3.connect(db_path)
+        last_epoch = conn.execute("SELECT MAX(created_epoch) FROM medication_logs").fetchone()[0]
+        last_day = time.strftime("%Y-%m-%d", time.localtime(last_epoch))
+        month_ago = time.strftime("%Y-%m-%d", time.localtime(last_epoch - 30 * 86400))
+        filter_sets = [
+            ("all entries", medhealth_history.HistoryFilter()),
+            ("one medication", medhealth_history.HistoryFilter(medication_id=1)),
+            ("missed", medhealth_history.HistoryFilter(status="missed")),
+            ("with vitals", medhealth_history.HistoryFilter(with_vitals=True)),
+            ("last 30 days", medhealth_history.HistoryFilter(since=month_ago, until=last_day)),
+        ]
+
+        legacy = calls_per_second(lambda: conn.execute("""SELECT medication_name, scheduled_time, actual_time,
+                                                                 status, created_at
+                                                          FROM medication_logs
+                                                          ORDER BY created_at DESC LIMIT 20""").fetchall())
+        print(f"Previous view_history (ORDER BY created_at, unindexed): {1000 / legacy:.1f} ms for 20 rows\n")
+
+        print(f"{'Filter':<16} {'Matches':>9} {'Page':>6} {'OFFSET (ms)':>12} {'Keyset (ms)':>12} {'Speedup':>8}")
+        print("─" * 68)
+        for name, filters in filter_sets:
+            conditions, params = medhealth_history.where_clause(filters)
+            matches = conn.execute(f"SELECT COUNT(*) FROM medication_logs "
+                                   f"{'WHERE ' + conditions if conditions else ''}", params).fetchone()[0]
+            for number in pages:
+                if (number - 1) * 20 >= matches:
+                    break
+                # Keyset needs the cursor the page before hands over; look it up untimed
+                cursor = None
+                if number > 1:
+                    previous = history_offset_page(conn, filters, number - 1)
+                    cursor = (previous[-1][8], previous[-1][0])
+                expected = history_offset_page(conn, filters, number)
+                assert [tuple(entry) for entry in medhealth_history.page(conn, filters, cursor).entries] == expected
+                before = calls_per_second(lambda: history_offset_page(conn, filters, number), 0.5)
+                after = calls_per_second(lambda: medhealth_history.page(conn, filters, cursor), 0.5)
+                print(f"{name if number == pages[0] else '':<16} {matches if number == pages[0] else '':>9} "
+                      f"{number:>6} {1000 / before:>12.3f} {1000 / after:>12.3f} {after / before:>7.1f}x")
+        conn.close()
+
+
+EXPORT_CHILD = """
+import csv, resource, sqlite3, sys, time
+import medhealth_export
+db_path, path, mode = sys.argv[1:4]
+
+
+def peak_kib():
+    # VmHWM starts afresh at exec; ru_maxrss keeps the forked parent's peak on Linux
+    try:
+        with open("/proc/self/status") as status:
+            return next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+start = time.perf_counter()
+if mode == "fetchall":
+    conn = sqlite3.connect(db_path)
+    columns = medhealth_export.EXPORT_COLUMNS["medication_logs"]
+    rows = conn.execute("SELECT " + ", ".join(sql for _, sql in columns)
+                        + " FROM medication_logs ORDER BY created_epoch, id").fetchall()
+    with open(path, "w", newline="") as out:
+        writer = csv.writer(out)
+        writer.writerow([name for name, _ in columns])
+        writer.writerows(rows)
+    rows = len(rows)
+elif mode == "idle":
+    rows = 0
+else:
+    rows = medhealth_export.export_file(db_path, "medication_logs", path, since=mode or None)[0]
+print(rows, time.perf_counter() - start, peak_kib())
+"""
+
+
+def bench_export(log_rows: int = 5_000_000):
+    """Streaming CSV/JSONL export vs fetchall(): rows/s and peak RSS (5M log rows)"""
+    repo = os.path.dirname(os.path.abspath(__file__))
+    with fixture_database(1_000_000, name="export.db") as db_path:
+        tmp = os.path.dirname(db_path)
+        conn = sqlite3.connect(db_path)
+        while conn.execute("SELECT MAX(id) FROM medication_logs").fetchone()[0] < log_rows:
+            conn.execute("""INSERT INTO medication_logs
+                            (medication_id, medication_name, scheduled_time, actual_time, status, temperature,
+                             heart_rate, created_at, scheduled_epoch, actual_epoch, created_epoch)
+                            SELECT medication_id, medication_name, scheduled_time, actual_time, status, temperature,
+                                   heart_rate, created_at, scheduled_epoch, actual_epoch, created_epoch
+                            FROM medication_logs WHERE id <= 1000000""")
+            conn.commit()
+        total = conn.execute("SELECT COUNT(*) FROM medication_logs").fetchone()[0]
+        last_epoch = conn.execute("SELECT MAX(created_epoch) FROM medication_logs").fetchone()[0]
+        conn.close()
+        month_ago = time.strftime("%Y-%m-%d", time.localtime(last_epoch - 30 * 86400))
+
+        runs = [
+            ("interpreter only", "idle", "idle.csv"),
+            ("fetchall() + csv", "fetchall", "all.csv"),
+            ("stream csv", "", "logs.csv"),
+            ("stream jsonl", "", "logs.jsonl"),
+            ("stream csv.gz", "", "logs.csv.gz"),
+            ("stream jsonl.gz", "", "logs.jsonl.gz"),
+            ("stream csv, 30 days", month_ago, "month.csv"),
+        ]
+        print(f"{'Export':<22} {'Rows':>10} {'Seconds':>8} {'Rows/s':>10} {'Peak RSS (MiB)':>15} {'File (MiB)':>11}")
+        print("─" * 81)
+        for name, mode, filename in runs:
+            path = os.path.join(tmp, filename)
+            output = subprocess.run([sys.executable, "-c", EXPORT_CHILD, db_path, path, mode], cwd=repo,
+                                    stdout=subprocess.PIPE, text=True, check=True).stdout.split()
+            rows, seconds, peak_kib = int(output[0]), float(output[1]), int(output[2])
+            assert mode not in ("", "fetchall") or rows == total, f"{name}: {rows} of {total} rows"
+            size = os.path.getsize(path) / 2**20 if os.path.exists(path) else 0.0
+            rate = f"{rows / seconds:>10,.0f}" if rows else f"{'-':>10}"
+            print(f"{name:<22} {rows:>10,} {seconds:>8.2f} {rate} {peak_kib / 1024:>15.1f} {size:>11.1f}")
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def write_schedule_file(path: str, medications: int, bad_lines=()):
+    """A CSV or JSON schedule file of `medications` entries; bad_lines get an invalid time"""
+    entries = [(f"Patient {i // 8} med {i % 8}", "%02d:%02d" % divmod((i * 7) % 1440, 60))
+               for i in range(medications)]
+    for line in bad_lines:
+        entries[line - 2] = (entries[line - 2][0], "24:00")  # line 1 is the header / '['
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if path.endswith(".json"):
+            f.write("[\n" + ",\n".join(json.dumps({"name": name, "schedule_time": schedule_time})
+                                         for name, schedule_time in entries) + "\n]\n")
+        else:
+            writer = csv.writer(f)
+            writer.writerow(["name", "schedule_time"])
+            writer.writerows(entries)
+
+
+def bench_import(medications: int = 100_000, one_by_one: int = 2000):
+    """Bulk schedule import (one executemany transaction) vs add_medication per row (100k rows)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'Path':<40} {'Rows':>8} {'Seconds':>8} {'Rows/s':>10}")
+        print("─" * 69)
+        db_path = os.path.join(tmp, "single.db")
+        build_fixture_db(db_path, 0, medications=0)
+        with use_database(db_path):
+            start = time.perf_counter()
+            for i in range(one_by_one):
+                medhealth_system.add_medication(f"Med {i}", "%02d:%02d" % divmod(i % 1440, 60))
+            elapsed = time.perf_counter() - start
+        print(f"{'add_medication() per row':<40} {one_by_one:>8,} {elapsed:>8.2f} {one_by_one / elapsed:>10,.0f}")
+
+        for suffix in ("csv", "json"):
+            path = os.path.join(tmp, f"ward.{suffix}")
+            write_schedule_file(path, medications)
+            db_path = os.path.join(tmp, f"bulk_{suffix}.db")
+            build_fixture_db(db_path, 0, medications=0)
+            with use_database(db_path):
+                reloads = medhealth_system.schedule_cache.stats()["misses"]
+                start = time.perf_counter()
+                imported = medhealth_system.import_medication_schedule(path)
+                elapsed = time.perf_counter() - start
+                cached = len(medhealth_system.schedule_cache.medications(db_path))
+                reloads = medhealth_system.schedule_cache.stats()["misses"] - reloads
+            assert imported == cached == medications, (imported, cached)
+            assert reloads == 1, f"schedule cache reloaded {reloads} times"  # Opening the new database only
+            print(f"{'import ' + suffix + ' (parse + insert + schedule)':<40} {medications:>8,} "
+                  f"{elapsed:>8.2f} {medications / elapsed:>10,.0f}")
+        for med_id in medhealth_system.dose_scheduler.keys():
+            medhealth_system.dose_scheduler.remove(med_id)
+
+        bad_lines = [17, medications // 2, medications]
+        path = os.path.join(tmp, "ward_errors.csv")
+        write_schedule_file(path, medications, bad_lines)
+        start = time.perf_counter()
+        rows, issues = medhealth_import.parse_schedule_file(path)
+        elapsed = time.perf_counter() - start
+        assert [issue.line for issue in issues] == bad_lines, issues
+        print(f"\nValidation with {len(bad_lines)} bad rows: {elapsed:.2f} s, reported lines "
+              f"{', '.join(str(issue.line) for issue in issues)}; nothing written")
+
+
+def bench_loadgen(patients: int = 500, days: int = 365):
+    """Seeded load generator: rows/min, batch size, determinism and append (500 patients x 365 days)"""
+    end_date = datetime.now().date() - timedelta(days=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'Load':<36} {'Rows':>10} {'Seconds':>8} {'M rows/min':>11}")
+        print("─" * 68)
+        runs = [
+            ("executemany 1 row (50 patients)", "single.db", 50, 1, False),
+            ("executemany 50k (50 patients)", "batched_small.db", 50, add_sample_data.BATCH_ROWS, False),
+            (f"executemany 50k ({patients} patients)", "load.db", patients, add_sample_data.BATCH_ROWS, False),
+            (f"append, indexes kept (+{patients})", "load.db", patients, add_sample_data.BATCH_ROWS, True),
+        ]
+        for name, filename, count, batch_rows, append in runs:
+            start = time.perf_counter()
+            rows = build_load_db(os.path.join(tmp, filename), count, days, seed=7 + append,
+                                 end_date=end_date, append=append, batch_rows=batch_rows)
+            elapsed = time.perf_counter() - start
+            total = sum(rows)
+            print(f"{name:<36} {total:>10,} {elapsed:>8.1f} {total / elapsed * 60 / 1e6:>11.2f}")
+
+        conn = sqlite3.connect(os.path.join(tmp, "load.db"))
+        logs, taken, with_vitals = conn.execute("""SELECT COUNT(*), SUM(status = 'taken'),
+                                                          SUM(temperature IS NOT NULL) FROM medication_logs""").fetchone()
+        rollup = conn.execute("SELECT SUM(scheduled) FROM daily_adherence").fetchone()[0]
+        patient_rates = [rate for (rate,) in conn.execute("""SELECT AVG(status = 'taken') FROM medication_logs
+                                                             GROUP BY (medication_id - 1) / 4""")]
+        conn.close()
+        assert rollup == logs, f"daily_adherence holds {rollup} doses for {logs} logs"
+        patient_rates.sort()
+        print(f"\nAfter append: {logs:,} doses, {taken / logs:.1%} taken, {with_vitals / logs:.1%} with vitals; "
+              f"per-patient adherence p10/p50/p90 = {patient_rates[len(patient_rates) // 10]:.0%} / "
+              f"{patient_rates[len(patient_rates) // 2]:.0%} / {patient_rates[len(patient_rates) * 9 // 10]:.0%}")
+
+        build_load_db(os.path.join(tmp, "again.db"), 50, days, seed=7, end_date=end_date)
+        same = content_checksum(os.path.join(tmp, "again.db")) == content_checksum(os.path.join(tmp, "batched_small.db"))
+        assert same, "same seed produced different data"
+        print("Same seed, same end date: identical data ✓")
+
+
+def ns_per_call(func, calls: int = 1_000_000) -> float:
+    """Mean wall time of func() in ns, less the cost of calling a no-op"""
+    def run(target):
+        start = time.perf_counter()
+        for _ in range(calls):
+            target()
+        return time.perf_counter() - start
+    return (run(func) - run(lambda: None)) / calls * 1e9
+
+
+def bench_metrics(threads: int = 4):
+    """Metrics overhead: ns per recorded sample, under contention, and scrape cost"""
+    registry = medhealth_metrics.Registry()
+    counter = registry.counter("bench_events_total", "Events")
+    labeled = registry.counter("bench_labeled_total", "Events by kind", ["kind"])
+    gauge = registry.gauge("bench_level", "Level")
+    histogram = registry.histogram("bench_seconds", "Durations", ["query"])
+    child, series = labeled.labels("a"), histogram.labels("q")
+
+    def timed():
+        with series.time():
+            pass
+
+    print(f"{'Operation':<40} {'ns/sample':>10}")
+    print("─" * 51)
+    for name, func in [("Counter.inc()", counter.inc),
+                       ("labeled child .inc() (kept)", child.inc),
+                       ("labels('a').inc() (looked up)", lambda: labeled.labels("a").inc()),
+                       ("Gauge.set()", lambda: gauge.set(1.0)),
+                       ("Histogram.observe()", lambda: series.observe(0.003)),
+                       ("with Histogram.time()", timed)]:
+        print(f"{name:<40} {ns_per_call(func):>10.0f}")
+
+    # Same histogram from several threads: lock contention under the GIL
+    calls = 200_000
+    before = series.count
+    workers = [threading.Thread(target=lambda: [series.observe(0.003) for _ in range(calls)]) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    print(f"{f'Histogram.observe(), {threads} threads':<40} {elapsed / (calls * threads) * 1e9:>10.0f}")
+    assert series.count - before == threads * calls, "observations were lost"
+
+    # Scrape: the device's own registry (every runtime metric) rendered to text
+    families = len(medhealth_metrics.REGISTRY.render().split("# TYPE")) - 1
+    render_rate = calls_per_second(medhealth_metrics.REGISTRY.render)
+    print(f"\nScrape: {families} families, {len(medhealth_metrics.REGISTRY.render()):,} bytes, "
+          f"render {1000 / render_rate:.2f} ms")
+
+
+def bench_tracing(doses: int = 20, rounds: int = 3, press_after: float = 0.3):
+    """Alarm latency traces: 3 rounds of 20 doses due together, confirmed by one (fake) press"""
+    with fixture_database(0, name="traces.db", medications=0) as db_path:
+
+        with use_database(db_path), fake_gpio(interrupts=True) as gpio:
+            med_ids = [medhealth_system.schedule_cache.add(db_path, f"Dose {i}", 8 * 60) for i in range(doses)]
+            medhealth_system.alarm_monitoring_active = True
+            loop = threading.Thread(target=medhealth_system.medication_alarm_monitoring, daemon=True)
+            loop.start()
+            for _ in range(rounds):
+                due_at = time.time() + 0.5
+                for med_id in med_ids:
+                    medhealth_system.dose_scheduler.schedule(med_id, due_at, (f"Dose {med_id - 1}", 8 * 60))
+                while len(medhealth_system.dose_alarms.outstanding()) < doses and time.time() < due_at + 5:
+                    time.sleep(0.01)
+                time.sleep(press_after)
+                gpio.set_level(medhealth_system.BUTTON_PIN, gpio.LOW)
+                time.sleep(0.08)
+                gpio.set_level(medhealth_system.BUTTON_PIN, gpio.HIGH)
+                # The worker then offers vitals for 5 s; wait until every dose is logged
+                while medhealth_system.dose_tracer.open_traces() and time.time() < due_at + 15:
+                    time.sleep(0.05)
+                # Fire again today: the taken-today check would otherwise skip the next round
+                medhealth_system.log_queue.flush()
+                with medhealth_system.get_connection(db_path) as conn:
+                    conn.execute("DELETE FROM medication_logs")
+            medhealth_system.stop_alarm_monitoring()
+            loop.join(5)
+            medhealth_system.log_queue.flush()
+
+            conn = medhealth_system.get_connection(db_path)
+            stats = medhealth_tracing.report(conn)
+            traced = conn.execute("SELECT COUNT(*) FROM dose_traces").fetchone()[0]
+
+        print(f"{'Stage':<10} {'Doses':>6} {'p50':>10} {'p95':>10} {'p99':>10} {'Max':>10}")
+        print("─" * 61)
+        for row in stats:
+            print(f"{row.stage:<10} {row.count:>6} {medhealth_tracing.format_seconds(row.p50):>10} "
+                  f"{medhealth_tracing.format_seconds(row.p95):>10} {medhealth_tracing.format_seconds(row.p99):>10} "
+                  f"{medhealth_tracing.format_seconds(row.max):>10}")
+        assert traced == doses * rounds, f"{traced} traces persisted for {doses * rounds} doses"
+
+        tracer = medhealth_tracing.DoseTracer()
+        def one_dose():
+            tracer.start(1, 0.0)
+            tracer.mark(1, 0.0, "buzzer_on_at")
+            tracer.mark(1, 0.0, "pressed_at")
+            tracer.finish(1, 0.0, 1.0).statement()
+        print(f"\nTracing cost per dose (start, 2 marks, finish, statement): {ns_per_call(one_dose, 100_000) / 1000:.1f} µs")
+
+
+def import_times(code: str, repo: str) -> list:
+    """(self ms, cumulative ms, depth, module) per import of `python -X importtime -c code`, in load order"""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=repo, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True, check=True).stderr
+    imports = []
+    for line in stderr.splitlines()[1:]:  # After the header
+        own, cumulative, name = line.split(":", 1)[1].split("|")
+        imports.append((int(own) / 1000, int(cumulative) / 1000, (len(name) - len(name.lstrip()) - 1) // 2,
+                        name.strip()))
+    return imports
+
+
+def wall_ms(command: list, repo: str, runs: int) -> float:
+    """Median wall time of a command in ms"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=repo, stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return sorted(times)[runs // 2] * 1000
+
+
+def bench_startup(runs: int = 15):
+    """Startup: import time of medhealth_system (lazy vs loaded hardware) and CLI wall time"""
+    repo = os.path.dirname(os.path.abspath(__file__))
+    compileall.compile_dir(repo, maxlevels=0, quiet=1)  # Warm bytecode, as on the device after the first run
+
+    cases = [
+        ("import medhealth_system", "import medhealth_system"),
+        ("  + load_hardware()", "import medhealth_system; medhealth_system.load_hardware()"),
+    ]
+    print(f"{'Import':<28} {'Median (ms)':>12}")
+    print("─" * 41)
+    for name, code in cases:
+        totals = sorted(sum(cumulative for _, cumulative, depth, _ in import_times(code, repo) if depth == 0)
+                        for _ in range(runs))
+        print(f"{name:<28} {totals[runs // 2]:>12.1f}")
+
+    # Biggest imports medhealth_system pulls in directly (cumulative)
+    children = [(cumulative, module) for _, cumulative, depth, module in import_times(cases[0][1], repo)
+                if depth == 1]
+    print("\nLargest direct imports: " + ", ".join(f"{module} {cumulative:.1f} ms"
+                                                  for cumulative, module in sorted(children, reverse=True)[:5]))
+
+    with fixture_database(10_000, name="startup.db") as db_path:
+        commands = [
+            ("python -c pass", [sys.executable, "-c", "pass"]),
+            ("-m medhealth_system list", [sys.executable, "-m", "medhealth_system", "--db", db_path, "list"]),
+            ("medhealth_system.py list", [sys.executable, "medhealth_system.py", "--db", db_path, "list"]),
+            ("-m medhealth_system stats", [sys.executable, "-m", "medhealth_system", "--db", db_path, "stats"]),
+        ]
+        print(f"\n{'CLI (wall, whole process)':<28} {'Median (ms)':>12}")
+        print("─" * 41)
+        for name, command in commands:
+            print(f"{name:<28} {wall_ms(command, repo, runs):>12.1f}")
+    print("(a script run as medhealth_system.py is compiled from source every time; -m uses the cached bytecode)")
+
+
+def bench_control(calls: int = 2000, medications: int = 20):
+    """Control socket round trips to a daemon subprocess (mock hardware), per command"""
+    repo = os.path.dirname(os.path.abspath(__file__))
+    with fixture_database(100_000, name="control.db", medications=medications) as db_path:
+        tmp = os.path.dirname(db_path)
+        socket_path = os.path.join(tmp, "control.sock")
+        # Run from tmp: the daemon writes its metrics file into the working directory on exit
+        daemon = subprocess.Popen([sys.executable, os.path.join(repo, "medhealth_system.py"), "--db", db_path,
+                                   "daemon", "--socket", socket_path], cwd=tmp, stdout=subprocess.DEVNULL)
+        client = medhealth_control.ControlClient(socket_path)
+        try:
+            started = time.perf_counter()
+            while True:
+                try:
+                    client.request("ping")
+                    break
+                except OSError:
+                    if time.perf_counter() - started > 30 or daemon.poll() is not None:
+                        raise
+                    time.sleep(0.05)
+            print(f"Daemon ready in {time.perf_counter() - started:.2f} s\n")
+
+            def round_trips(request, count):
+                times = []
+                for _ in range(count):
+                    start = time.perf_counter()
+                    request()
+                    times.append(time.perf_counter() - start)
+                times.sort()
+                return times[count // 2] * 1e6, times[int(count * 0.99)] * 1e6
+
+            def add_remove():
+                med = client.request("add", name="Bench", schedule_time="12:00")
+                client.request("remove", id=med["id"])
+
+            def fresh_connection():
+                medhealth_control.ControlClient(socket_path).request("ping")
+
+            cases = [
+                ("ping", lambda: client.request("ping"), calls),
+                ("ping, new connection", fresh_connection, calls // 4),
+                ("status", lambda: client.request("status"), calls),
+                ("medications", lambda: client.request("medications"), calls),
+                ("vitals (latest)", lambda: client.request("vitals"), calls),
+                ("flush", lambda: client.request("flush"), calls),
+                ("add + remove", add_remove, calls // 10),
+            ]
+            print(f"{'Command':<24} {'Calls':>6} {'p50 (µs)':>10} {'p99 (µs)':>10}")
+            print("─" * 53)
+            for name, request, count in cases:
+                p50, p99 = round_trips(request, count)
+                print(f"{name:<24} {count:>6} {p50:>10.0f} {p99:>10.0f}")
+
+            # The same status from a shell: a new client process per command
+            command = [sys.executable, "medhealth_control.py", "--socket", socket_path, "status"]
+            print(f"{'medhealth_control.py':<24} {5:>6} {wall_ms(command, repo, 5) * 1000:>10.0f}")
+        finally:
+            client.close()
+            daemon.send_signal(signal.SIGTERM)
+            daemon.wait(30)
+
+
+BENCHMARKS = {
+    "connections": bench_connections,
+    "indexes": bench_indexes,
+    "dashboard": bench_dashboard,
+    "scheduler": bench_scheduler,
+    "cache": bench_schedule_cache,
+    "alarms": bench_concurrent_alarms,
+    "button": bench_button,
+    "actuators": bench_actuators,
+    "sampler": bench_sampler,
+    "ppg": bench_ppg,
+    "spo2": bench_spo2,
+    "vitals": bench_vitals,
+    "logqueue": bench_log_queue,
+    "migrations": bench_migrations,
+    "timemodel": bench_time_model,
+    "adherence": bench_adherence,
+    "history": bench_history,
+    "export": bench_export,
+    "import": bench_import,
+    "loadgen": bench_loadgen,
+    "metrics": bench_metrics,
+    "tracing": bench_tracing,
+    "startup": bench_startup,
+    "control": bench_control,
+}
+
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (available: {', '.join(BENCHMARKS)})")
+            sys.exit(1)
+        print("\n" + "=" * 76)
+        print(f" {name}: {BENCHMARKS[name].__doc__}")
+        print("=" * 76)
+        BENCHMARKS[name]()
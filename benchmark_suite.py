@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Regression benchmark suite for the MedHealth device runtime hot paths
+
+Times each hot path against generated databases of 10k, 1M and 10M
+medication_logs rows (add_sample_data.generate(): 10 patients x 4
+medications, with as many days of history as the row count needs), with
+GPIO and sensors in mock mode. Every metric is measured in several rounds;
+latencies are the median and p95 per call, throughput is logs per second,
+and the reported value is the median over the rounds. Results are written
+as JSON; given a baseline from an earlier run, any metric that got worse by
+more than the tolerance, with no overlap between the rounds of the two
+runs, fails the run (exit 1).
+benchmark.py holds the one-off before/after comparisons; this file is
+what CI runs.
+
+Usage:
+    python benchmark_suite.py [--sizes 10k,1m,10m] [--output results.json]
+                              [--baseline baseline.json] [--tolerance 0.3] [--db-dir DIR]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import medhealth_adherence
+import medhealth_history
+import medhealth_system
+from benchmark import build_load_db, use_database
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}  # medication_logs rows
+SUITE_PATIENTS = 10
+SUITE_MEDICATIONS = 4  # per patient
+SUITE_SEED = 42
+DEFAULT_TOLERANCE = 0.30  # Fail when a metric is >30% worse than the baseline...
+NOISE_FLOORS = {"ms": 0.02}  # ...and also worse by more than this, per unit (timer resolution)
+ROUNDS = 5  # rounds per metric; the value is the median of the round results
+MIN_TIME = 1.0  # seconds spent timing each latency metric, over all rounds...
+MIN_CALLS = 10  # ...and at least this many calls per round
+LOG_CALLS = 2000  # log_medication() calls per round for the throughput metric
+
+Metrics = Dict[str, dict]
+
+
+def median(values: List[float]) -> float:
+    return sorted(values)[len(values) // 2]
+
+
+def latency(func: Callable, min_time: float = MIN_TIME, min_calls: int = MIN_CALLS, rounds: int = ROUNDS) -> dict:
+    """Median of the per-round median wall times per call in ms, and p95 over all calls"""
+    durations, runs = [], []
+    for _ in range(rounds):
+        round_durations = []
+        deadline = time.perf_counter() + min_time / rounds
+        while len(round_durations) < min_calls or time.perf_counter() < deadline:
+            start = time.perf_counter()
+            func()
+            round_durations.append(time.perf_counter() - start)
+        runs.append(median(round_durations) * 1000)
+        durations.extend(round_durations)
+    durations.sort()
+    return {"value": median(runs), "runs": runs, "p95": durations[int(len(durations) * 0.95)] * 1000,
+            "unit": "ms", "better": "lower", "calls": len(durations)}
+
+
+@contextlib.contextmanager
+def mock_hardware():
+    """GPIO and sensors in mock mode, and no terminal clearing, whatever the host has"""
+    saved = (medhealth_system.GPIO, medhealth_system.temp_sensor, medhealth_system.heart_rate_sensor,
+             medhealth_system.ppg_fifo, os.system)
+    medhealth_system.GPIO = None
+    medhealth_system.temp_sensor = medhealth_system.heart_rate_sensor = medhealth_system.ppg_fifo = None
+    os.system = lambda command: 0  # display_monitoring_dashboard() clears the screen first
+    try:
+        yield
+    finally:
+        (medhealth_system.GPIO, medhealth_system.temp_sensor, medhealth_system.heart_rate_sensor,
+         medhealth_system.ppg_fifo, os.system) = saved
+
+
+def fixture_path(db_dir: str, size: str) -> str:
+    """Generated database for a size, built on first use and reused from db_dir"""
+    path = os.path.join(db_dir, f"suite_{size}_seed{SUITE_SEED}.db")
+    if not os.path.exists(path):
+        days = max(SIZES[size] // (SUITE_PATIENTS * SUITE_MEDICATIONS), 1)
+        print(f"  building {size} fixture ({days:,} days)...", flush=True)
+        build_load_db(path, SUITE_PATIENTS, days, SUITE_MEDICATIONS, SUITE_SEED)
+    return path
+
+
+def run_size(db_path: str, min_time: float = MIN_TIME) -> Metrics:
+    """Every hot-path metric against one database"""
+    results = {}
+    with mock_hardware(), use_database(db_path):
+        conn = medhealth_system.get_connection(db_path)
+        rows = conn.execute("SELECT COUNT(*) FROM medication_logs").fetchone()[0]
+        medications = medhealth_system.get_active_medications()
+        first_med = medications[0][0]
+
+        # Alarm loop: taken-today check for every medication (all doses due at once),
+        # and the periodic resync of the dose scheduler
+        results["alarm_due_check"] = latency(
+            lambda: [medhealth_system.medication_taken_today(med_id) for med_id, _, _ in medications], min_time)
+        results["schedule_resync"] = latency(medhealth_system.sync_dose_schedule, min_time)
+        for med_id in medhealth_system.dose_scheduler.keys():
+            medhealth_system.dose_scheduler.remove(med_id)
+
+        results["dashboard_load"] = latency(medhealth_system.load_dashboard_data, min_time)
+        results["dashboard_render"] = latency(medhealth_system.display_monitoring_dashboard, min_time)
+        results["upcoming_medications"] = latency(medhealth_system.get_upcoming_medications, min_time)
+
+        # view_history: first page, a page far back (keyset cursor looked up untimed),
+        # a filtered page and the adherence summary shown under each page
+        depth = min(rows // 2, 200_000)
+        cursor = conn.execute("""SELECT created_epoch, id FROM medication_logs
+                                 ORDER BY created_epoch DESC, id DESC LIMIT 1 OFFSET ?""", (depth,)).fetchone()
+        missed = medhealth_history.HistoryFilter(medication_id=first_med, status="missed")
+        results["history_first_page"] = latency(lambda: medhealth_history.page(conn), min_time)
+        results["history_deep_page"] = latency(lambda: medhealth_history.page(conn, cursor=cursor), min_time)
+        results["history_filtered_page"] = latency(lambda: medhealth_history.page(conn, missed), min_time)
+        results["history_summary"] = latency(lambda: medhealth_adherence.summary(conn, 30), min_time)
+
+        results["sensor_read_temperature"] = latency(medhealth_system.read_temperature, min_time)
+        results["sensor_read_heart_rate"] = latency(medhealth_system.read_heart_rate, min_time)
+        medhealth_system.sensor_sampler.start()
+        try:
+            time.sleep(medhealth_system.TEMP_SAMPLE_INTERVAL)  # First samples in
+            results["latest_vitals"] = latency(medhealth_system.latest_vitals, min_time)
+        finally:
+            medhealth_system.sensor_sampler.stop()
+
+        # log_medication throughput through the write-behind queue, until on disk;
+        # the rows are removed again so a reused fixture does not grow
+        last_id = conn.execute("SELECT MAX(id) FROM medication_logs").fetchone()[0]
+        now = time.time()
+        runs = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            for i in range(LOG_CALLS):
+                med_id, name, _ = medications[i % len(medications)]
+                medhealth_system.log_medication(med_id, name, now - 60, now, "taken", 36.6, 72)
+            medhealth_system.log_queue.flush()
+            runs.append(LOG_CALLS / (time.perf_counter() - start))
+        results["log_medication"] = {"value": median(runs), "runs": runs, "unit": "logs/s", "better": "higher",
+                                     "calls": LOG_CALLS * ROUNDS}
+        conn.execute("DELETE FROM medication_logs WHERE id > ?", (last_id,))
+        conn.commit()
+        medhealth_adherence.rebuild(conn, medhealth_adherence.local_day(now - 60))
+    return results
+
+
+def compare(results: Dict[str, Metrics], baseline: Dict[str, Metrics], tolerance: float) -> List[tuple]:
+    """(size, metric, baseline, current, change, regressed) for metrics in both runs
+
+    change is the relative worsening of the median: positive = worse, whichever
+    way is better. A metric regresses only if it is worse by more than the
+    tolerance, by more than its unit's noise floor, and even its best round is
+    worse than the worst baseline round (results without rounds count as one).
+    """
+    rows = []
+    for size, metrics in results.items():
+        for name, metric in metrics.items():
+            base = baseline.get(size, {}).get(name)
+            if not base or not base["value"]:
+                continue
+            if metric["better"] == "lower":
+                change = metric["value"] / base["value"] - 1
+            else:
+                change = base["value"] / metric["value"] - 1
+            noise_floor = NOISE_FLOORS.get(metric["unit"], 0.0)
+            runs, base_runs = metric.get("runs", [metric["value"]]), base.get("runs", [base["value"]])
+            if metric["better"] == "lower":
+                separated = min(runs) > max(base_runs)
+            else:
+                separated = max(runs) < min(base_runs)
+            regressed = change > tolerance and abs(metric["value"] - base["value"]) > noise_floor and separated
+            rows.append((size, name, base["value"], metric["value"], change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MedHealth hot-path benchmark suite")
+    parser.add_argument("--sizes", default=",".join(SIZES),
+                        help=f"comma-separated database sizes from {', '.join(SIZES)} (default all)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against (skipped if missing)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative slowdown before a metric fails (default 0.3 = 30%%)")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help="seconds per latency metric")
+    parser.add_argument("--db-dir", help="keep generated databases here and reuse them on later runs")
+    args = parser.parse_args()
+
+    sizes = [size.strip().lower() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s) {', '.join(unknown)}; choose from {', '.join(SIZES)}")
+
+    temp_dir = None
+    if args.db_dir:
+        os.makedirs(args.db_dir, exist_ok=True)
+        db_dir = args.db_dir
+    else:
+        temp_dir = tempfile.TemporaryDirectory()
+        db_dir = temp_dir.name
+
+    results = {}
+    for size in sizes:
+        print(f"\n📊 {size} medication_logs rows")
+        results[size] = run_size(fixture_path(db_dir, size), args.min_time)
+        print(f"  {'Metric':<26} {'Median':>12} {'p95':>12}")
+        for name, metric in results[size].items():
+            p95 = f"{metric['p95']:.3f}" if "p95" in metric else "-"
+            print(f"  {name:<26} {metric['value']:>12.3f} {p95:>12}  {metric['unit']}")
+    if temp_dir:
+        temp_dir.cleanup()
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+    if not args.baseline:
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\n⚠ No baseline at {args.baseline}; skipping comparison")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    rows = compare(results, baseline, args.tolerance)
+    print(f"\n{'Size':<5} {'Metric':<26} {'Baseline':>12} {'Current':>12} {'Change':>8}")
+    for size, name, base, current, change, regressed in rows:
+        print(f"{size:<5} {name:<26} {base:>12.3f} {current:>12.3f} {change:>+7.0%} {'❌' if regressed else '✓'}")
+    regressions = [row for row in rows if row[5]]
+    if regressions:
+        print(f"\n❌ {len(regressions)} metric(s) more than {args.tolerance:.0%} worse than the baseline")
+        sys.exit(1)
+    print(f"\n✓ No metric more than {args.tolerance:.0%} worse than the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Single-worker actuator engine for the MedHealth LEDs and buzzer
+
+Alerts submit declarative patterns instead of spawning threads that toggle
+pins. One worker thread plays the highest-priority active pattern, preempts
+lower-priority ones (they resume if still running when it ends) and writes
+a pin only when its level changes.
+"""
+
+import itertools
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Dict, Iterable, Optional
+
+# steps: ((frozenset of channels on, seconds), ...) played in a loop
+# priority: higher preempts lower; duration: seconds, or None until stopped
+Pattern = namedtuple("Pattern", ["steps", "priority", "duration"])
+
+
+def blink(channels: Iterable, on_time: float, off_time: float, priority: int = 0,
+          duration: Optional[float] = None) -> Pattern:
+    """Channels on for on_time, then off for off_time, repeated"""
+    return Pattern(((frozenset(channels), on_time), (frozenset(), off_time)), priority, duration)
+
+
+def solid(channels: Iterable, priority: int = 0, duration: Optional[float] = None) -> Pattern:
+    """Channels held on"""
+    return Pattern(((frozenset(channels), 1.0),), priority, duration)
+
+
+class _Playback:
+    __slots__ = ("pattern", "seq", "started_at", "ends_at", "cycle")
+
+    def __init__(self, pattern: Pattern, seq: int, started_at: float, duration: Optional[float]):
+        self.pattern = pattern
+        self.seq = seq
+        self.started_at = started_at
+        self.ends_at = None if duration is None else started_at + duration
+        self.cycle = sum(seconds for _, seconds in pattern.steps)
+
+
+class ActuatorWorker:
+    """Plays patterns on output channels from one lazily started thread"""
+
+    def __init__(self, set_output: Callable[[object, bool], None], channels: Iterable):
+        self._set_output = set_output
+        self._channels = list(channels)
+        self._levels: Dict[object, bool] = {}
+        self._playing: Dict[str, _Playback] = {}  # key -> playback
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = True
+
+    def play(self, key: str, pattern: Pattern, duration: Optional[float] = None):
+        """Start (or restart) pattern under key; duration overrides pattern.duration"""
+        with self._cond:
+            self._start(key, pattern, pattern.duration if duration is None else duration)
+
+    def extend(self, key: str, pattern: Pattern, duration: Optional[float] = None):
+        """Keep key playing for at least duration more seconds without restarting its cycle
+
+        Repeated alerts (e.g. a reading that stays abnormal) use this so they
+        neither pile up nor restart the pattern from its first step.
+        """
+        duration = pattern.duration if duration is None else duration
+        with self._cond:
+            playback = self._playing.get(key)
+            if playback is None or playback.pattern != pattern:
+                self._start(key, pattern, duration)
+            elif playback.ends_at is not None:
+                playback.ends_at = None if duration is None else max(playback.ends_at,
+                                                                     time.monotonic() + duration)
+                self._cond.notify_all()
+
+    def stop(self, key: str):
+        """Stop the pattern playing under key (no-op if none)"""
+        with self._cond:
+            if self._playing.pop(key, None) is not None:
+                self._cond.notify_all()
+
+    def stop_all(self):
+        with self._cond:
+            self._playing.clear()
+            self._cond.notify_all()
+
+    def is_playing(self, key: str) -> bool:
+        with self._cond:
+            playback = self._playing.get(key)
+            return playback is not None and (playback.ends_at is None or playback.ends_at > time.monotonic())
+
+    def wait(self, key: str, timeout: Optional[float] = None) -> bool:
+        """Block until key has finished playing; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while key in self._playing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def shutdown(self, timeout: float = 1.0):
+        """Stop every pattern, switch all channels off and end the worker"""
+        with self._cond:
+            self._running = False
+            self._playing.clear()
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _start(self, key: str, pattern: Pattern, duration: Optional[float]):
+        if not self._running:
+            return
+        self._playing[key] = _Playback(pattern, next(self._seq), time.monotonic(), duration)
+        self._ensure_thread()
+        self._cond.notify_all()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="actuators", daemon=True)
+            self._thread.start()
+
+    def _apply(self, on_channels):
+        for channel in self._channels:
+            level = channel in on_channels
+            if self._levels.get(channel) != level:
+                try:
+                    self._set_output(channel, level)
+                except Exception:
+                    continue  # Retry on the next step
+                self._levels[channel] = level
+
+    def _run(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                # Drop finished patterns and wake anyone waiting on them
+                finished = [key for key, playback in self._playing.items()
+                            if playback.ends_at is not None and playback.ends_at <= now]
+                for key in finished:
+                    del self._playing[key]
+                if finished:
+                    self._cond.notify_all()
+
+                if not self._playing:
+                    self._apply(())
+                    if not self._running:
+                        return
+                    self._cond.wait()
+                    continue
+
+                # Highest priority wins; the most recent submission breaks ties
+                current = max(self._playing.values(), key=lambda p: (p.pattern.priority, p.seq))
+                position = (now - current.started_at) % current.cycle if current.cycle else 0.0
+                for on_channels, seconds in current.pattern.steps:
+                    if position < seconds:
+                        break
+                    position -= seconds
+                self._apply(on_channels)
+
+                wait = seconds - position
+                if current.ends_at is not None:
+                    wait = min(wait, current.ends_at - now)
+                self._cond.wait(max(wait, 0.001))
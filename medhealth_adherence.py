@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Daily adherence rollup for medhealth.db
+
+daily_adherence holds one row per medication per local day: doses
+scheduled, taken and missed, the summed delay of taken doses and how many
+came with vitals. log_medication() adds each dose in the same transaction
+as its medication_logs row, so a year of adherence is ~365 rows per
+medication to read; rebuild() recomputes it for logs written any other way.
+
+Usage:
+    python medhealth_adherence.py report [--days N] [--medication ID] [db_file]
+    python medhealth_adherence.py rebuild [--days N] [db_file]
+"""
+
+import argparse
+import datetime
+import sqlite3
+import time
+from collections import namedtuple
+from typing import List, Optional, Tuple
+
+# One chart point; mean_delay is seconds late (negative = early), None without taken doses
+DayAdherence = namedtuple("DayAdherence", ["day", "scheduled", "taken", "missed", "mean_delay", "with_vitals"])
+
+UPSERT_SQL = """INSERT INTO daily_adherence
+                (medication_id, day, scheduled, taken, missed, delay_total, with_vitals)
+                VALUES (?, ?, 1, ?, ?, ?, ?)
+                ON CONFLICT (medication_id, day) DO UPDATE SET
+                    scheduled = scheduled + 1,
+                    taken = taken + excluded.taken,
+                    missed = missed + excluded.missed,
+                    delay_total = delay_total + excluded.delay_total,
+                    with_vitals = with_vitals + excluded.with_vitals"""
+
+# Same aggregation as migration 0011; doses are logged within a day of being due
+REBUILD_SQL = """INSERT INTO daily_adherence
+                 (medication_id, day, scheduled, taken, missed, delay_total, with_vitals)
+                 SELECT medication_id,
+                        date(COALESCE(scheduled_epoch, created_epoch), 'unixepoch', 'localtime') AS log_day,
+                        COUNT(*), SUM(status = 'taken'), SUM(status = 'missed'),
+                        COALESCE(SUM(CASE WHEN status = 'taken' THEN actual_epoch - scheduled_epoch END), 0),
+                        SUM(temperature IS NOT NULL OR heart_rate IS NOT NULL)
+                 FROM medication_logs
+                 WHERE medication_id IS NOT NULL AND created_epoch >= :since_epoch - 86400
+                   AND COALESCE(scheduled_epoch, created_epoch) IS NOT NULL
+                 GROUP BY medication_id, log_day
+                 HAVING log_day >= :since"""
+
+
+def local_day(epoch: float) -> str:
+    """Local calendar date of an epoch time as 'YYYY-MM-DD'"""
+    return time.strftime("%Y-%m-%d", time.localtime(epoch))
+
+
+def first_day(days: int, now: Optional[float] = None) -> str:
+    """Local date that starts a window of the last `days` days (today included)"""
+    today = datetime.date.fromtimestamp(time.time() if now is None else now)
+    return (today - datetime.timedelta(days=days - 1)).isoformat()
+
+
+def dose_statement(medication_id: int, scheduled_at: float, actual_at: float, status: str,
+                   with_vitals: bool) -> Tuple[str, tuple]:
+    """The daily_adherence update for one logged dose, to commit with its log row"""
+    taken = status == "taken"
+    delay = int(actual_at) - int(scheduled_at) if taken else 0
+    return UPSERT_SQL, (medication_id, local_day(scheduled_at), int(taken), int(status == "missed"),
+                        delay, int(with_vitals))
+
+
+def rebuild(conn: sqlite3.Connection, since: Optional[str] = None) -> int:
+    """Recompute daily_adherence from medication_logs for days >= since (default all); returns rows"""
+    if since is None:
+        since, since_epoch = "0000-01-01", 0
+    else:
+        since_epoch = int(datetime.datetime.strptime(since, "%Y-%m-%d").timestamp())
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM daily_adherence WHERE day >= ?", (since,))
+        rows = conn.execute(REBUILD_SQL, {"since": since, "since_epoch": since_epoch}).rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return rows
+
+
+def daily(conn: sqlite3.Connection, days: int = 365,
+          medication_id: Optional[int] = None) -> List[DayAdherence]:
+    """Adherence per day over the last `days` days, for one medication or all of them"""
+    sql = """SELECT day, SUM(scheduled), SUM(taken), SUM(missed), SUM(delay_total), SUM(with_vitals)
+             FROM daily_adherence WHERE day >= ?"""
+    params = [first_day(days)]
+    if medication_id is not None:
+        sql += " AND medication_id = ?"
+        params.append(medication_id)
+    rows = conn.execute(sql + " GROUP BY day ORDER BY day", params).fetchall()
+    return [DayAdherence(day, scheduled, taken, missed, delay_total / taken if taken else None, with_vitals)
+            for day, scheduled, taken, missed, delay_total, with_vitals in rows]
+
+
+def summary(conn: sqlite3.Connection, days: int = 30,
+            medication_id: Optional[int] = None) -> DayAdherence:
+    """Totals over the last `days` days (day is the first date of the window)"""
+    points = daily(conn, days, medication_id)
+    taken = sum(point.taken for point in points)
+    delay_total = sum(point.mean_delay * point.taken for point in points if point.taken)
+    return DayAdherence(first_day(days), sum(point.scheduled for point in points), taken,
+                        sum(point.missed for point in points), delay_total / taken if taken else None,
+                        sum(point.with_vitals for point in points))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daily medication adherence from medhealth.db")
+    parser.add_argument("command", choices=["report", "rebuild"])
+    parser.add_argument("db_file", nargs="?", default="medhealth.db")
+    parser.add_argument("--days", type=int, default=None,
+                        help="report: window length (default 30); rebuild: only the last N days (default all)")
+    parser.add_argument("--medication", type=int, default=None, help="report one medication id")
+    args = parser.parse_intermixed_args()
+
+    conn = sqlite3.connect(args.db_file, timeout=30)
+    if args.command == "rebuild":
+        start = time.perf_counter()
+        rows = rebuild(conn, first_day(args.days) if args.days else None)
+        print(f"✓ Rebuilt {rows} daily adherence rows in {time.perf_counter() - start:.2f} s")
+        return
+
+    days = args.days or 30
+    print(f"{'Day':<12} {'Scheduled':>9} {'Taken':>6} {'Missed':>7} {'Mean delay':>11} {'Vitals':>7}")
+    print("─" * 57)
+    for point in daily(conn, days, args.medication):
+        delay = f"{point.mean_delay / 60:.1f} min" if point.mean_delay is not None else "-"
+        print(f"{point.day:<12} {point.scheduled:>9} {point.taken:>6} {point.missed:>7} "
+              f"{delay:>11} {point.with_vitals:>7}")
+    total = summary(conn, days, args.medication)
+    if total.scheduled:
+        print(f"\n📊 Last {days} days: {total.taken}/{total.scheduled} taken "
+              f"({total.taken / total.scheduled:.0%}), {total.missed} missed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Local control socket for the headless MedHealth daemon
+
+The daemon (python -m medhealth_system daemon) listens on a Unix-domain
+socket. A request is one line of JSON, {"cmd": "status", ...arguments},
+and gets one line back: {"ok": true, "result": ...} or {"ok": false,
+"error": "..."}. A connection carries any number of requests, so a
+client (the interactive menu) keeps one open and each command costs a
+single round trip. Access control is the socket file's permissions.
+
+Usage:
+    python medhealth_control.py [--socket medhealth.sock] status
+    python medhealth_control.py add name=Aspirin schedule_time=08:00
+    python medhealth_control.py remove id=3
+"""
+
+import argparse
+import json
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+CONTROL_SOCKET = "medhealth.sock"  # Next to medhealth.db; systemd units usually pass /run/medhealth/control.sock
+SOCKET_MODE = 0o660  # Owner and group may send commands
+CLIENT_TIMEOUT = 30.0  # seconds; a manual vitals measurement takes up to ~15 s
+MAX_REQUEST_BYTES = 1 << 20  # Longer request lines are refused; clients split schedule imports into chunks
+
+# Command name -> handler(**arguments) returning a JSON-serialisable result
+Handlers = Dict[str, Callable[..., object]]
+
+
+def encode(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def dispatch(handlers: Handlers, line: bytes) -> dict:
+    """Response for one request line; handler errors are returned, never raised"""
+    try:
+        request = json.loads(line)
+        command = request.pop("cmd")
+    except (ValueError, TypeError, AttributeError, KeyError):
+        return {"ok": False, "error": "malformed request; expected {\"cmd\": ..., ...} on one line"}
+    handler = handlers.get(command)
+    if handler is None:
+        return {"ok": False, "error": f"unknown command {command!r}; one of {', '.join(sorted(handlers))}"}
+    try:
+        return {"ok": True, "result": handler(**request)}
+    except Exception as e:
+        return {"ok": False, "error": f"{command}: {e}"}
+
+
+def serve(handlers: Handlers, path: str = CONTROL_SOCKET, on_disconnect: Optional[Callable[[], None]] = None):
+    """Answer requests on a Unix socket from daemon threads; returns the server
+
+    Each client connection gets its own thread; on_disconnect runs on that
+    thread after the client has gone (e.g. to close its database
+    connections). A stale socket file left by a crashed daemon is replaced;
+    raises OSError if another daemon is still listening on path. Stop with
+    shutdown(server, path).
+    """
+    import socket
+    import socketserver  # Only the daemon serves (and socket is slow to import for the CLI)
+
+    class ControlHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            while True:
+                line = self.rfile.readline(MAX_REQUEST_BYTES + 1)
+                if not line:
+                    return
+                if len(line) > MAX_REQUEST_BYTES:
+                    self.wfile.write(encode({"ok": False, "error": "request too long"}))
+                    return
+                self.wfile.write(encode(dispatch(handlers, line)))
+
+        def finish(self):
+            try:
+                super().finish()
+            finally:
+                if on_disconnect is not None:
+                    on_disconnect()
+
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)  # Nobody listening
+        else:
+            raise OSError(f"a daemon is already listening on {path}")
+        finally:
+            probe.close()
+
+    server = socketserver.ThreadingUnixStreamServer(path, ControlHandler)
+    server.daemon_threads = True
+    os.chmod(path, SOCKET_MODE)
+    threading.Thread(target=server.serve_forever, name="control-socket", daemon=True).start()
+    return server
+
+
+def shutdown(server, path: str = CONTROL_SOCKET):
+    """Stop serving and remove the socket file"""
+    server.shutdown()
+    server.server_close()
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class ControlClient:
+    """One persistent connection to the daemon; reconnects on the next request after an error
+
+    Safe to share between threads (requests are serialised).
+    """
+
+    def __init__(self, path: str = CONTROL_SOCKET, timeout: float = CLIENT_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None  # socket.socket once connected
+        self._reader = None
+
+    def request(self, command: str, **arguments):
+        """Run a command on the daemon and return its result
+
+        Raises ValueError with the daemon's message if the command failed,
+        OSError if the daemon cannot be reached.
+        """
+        message = encode({"cmd": command, **arguments})
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                self._sock.sendall(message)
+                line = self._reader.readline()
+                if not line:
+                    raise ConnectionError("the daemon closed the connection")
+            except OSError:
+                self._close()
+                raise
+        response = json.loads(line)
+        if not response["ok"]:
+            raise ValueError(response["error"])
+        return response["result"]
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _connect(self):
+        import socket  # Not needed by importers that never connect
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(self.timeout)
+        self._sock.connect(self.path)
+        self._reader = self._sock.makefile("rb")
+
+    def _close(self):
+        if self._reader is not None:
+            self._reader.close()
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = self._reader = None
+
+
+def parse_argument(text: str):
+    """key=value from the command line; the value as JSON if it parses, else a string"""
+    key, separator, value = text.partition("=")
+    if not separator or not key:
+        raise argparse.ArgumentTypeError(f"expected key=value, got {text!r}")
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a command to a running MedHealth daemon")
+    parser.add_argument("command", help="status, medications, add, remove, vitals, flush or ping")
+    parser.add_argument("arguments", nargs="*", type=parse_argument, metavar="key=value")
+    parser.add_argument("--socket", default=CONTROL_SOCKET, help=f"control socket (default {CONTROL_SOCKET})")
+    args = parser.parse_intermixed_args()
+
+    client = ControlClient(args.socket)
+    try:
+        result = client.request(args.command, **dict(args.arguments))
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    finally:
+        client.close()
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
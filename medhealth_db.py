@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Shared SQLite connection manager for the MedHealth device runtime
+
+Every thread gets its own long-lived connection to each database file, so the
+alarm, dashboard and menu threads no longer pay connect/close costs (and the
+SD card page-cache misses that come with them) on every query. Also home to
+the schedule cache, the write-behind log queue and the batched vitals writer
+built on those connections.
+"""
+
+import bisect
+import collections
+import itertools
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from medhealth_metrics import REGISTRY
+from medhealth_scheduler import format_minute_of_day
+
+# Connection tuning
+BUSY_TIMEOUT_MS = 5000  # Wait up to 5 s for the Rust backend / other writers
+STATEMENT_CACHE_SIZE = 256  # Prepared statements kept per connection
+
+_local = threading.local()
+_registry_lock = threading.Lock()
+_registry: List[sqlite3.Connection] = []  # Every connection opened, for close_all_connections()
+_generation = 0  # Bumped by close_all_connections() so threads drop stale handles
+
+DB_QUERY_SECONDS = REGISTRY.histogram("medhealth_db_query_seconds", "SQLite query or commit duration", ["query"])
+SCHEDULE_RELOAD_SECONDS = DB_QUERY_SECONDS.labels("schedule_reload")
+LOG_COMMIT_SECONDS = DB_QUERY_SECONDS.labels("log_commit")
+SCHEDULE_CACHE_LOOKUPS = REGISTRY.counter("medhealth_schedule_cache_lookups_total",
+                                          "Schedule cache lookups by result (a miss reloads the medications table)",
+                                          ["result"])
+SCHEDULE_CACHE_HITS = SCHEDULE_CACHE_LOOKUPS.labels("hit")
+SCHEDULE_CACHE_MISSES = SCHEDULE_CACHE_LOOKUPS.labels("miss")
+
+
+def configure_connection(conn: sqlite3.Connection):
+    """Apply the runtime PRAGMAs to a freshly opened connection"""
+    conn.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer
+    conn.execute("PRAGMA synchronous=NORMAL")  # fsync on checkpoint only (safe with WAL)
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+
+def open_connection(db_file: str) -> sqlite3.Connection:
+    """Open and configure a new connection (not cached)"""
+    conn = sqlite3.connect(db_file,
+                           timeout=BUSY_TIMEOUT_MS / 1000.0,
+                           cached_statements=STATEMENT_CACHE_SIZE,
+                           check_same_thread=False)  # Only the owner thread uses it; lets close_all_connections() run anywhere
+    configure_connection(conn)
+    return conn
+
+
+def get_connection(db_file: str) -> sqlite3.Connection:
+    """Get the calling thread's persistent connection to db_file"""
+    connections: Dict[str, sqlite3.Connection] = getattr(_local, "connections", None)
+    if connections is None or _local.generation != _generation:
+        connections = _local.connections = {}
+        _local.generation = _generation
+
+    conn = connections.get(db_file)
+    if conn is None:
+        conn = open_connection(db_file)
+        connections[db_file] = conn
+        with _registry_lock:
+            _registry.append(conn)
+    return conn
+
+
+def open_shared_connection(db_file: str) -> sqlite3.Connection:
+    """Open a registered connection that the caller shares between threads under its own lock"""
+    conn = open_connection(db_file)
+    with _registry_lock:
+        _registry.append(conn)
+    return conn
+
+
+def close_thread_connections():
+    """Close the calling thread's connections (call before a worker thread exits)"""
+    connections = getattr(_local, "connections", None)
+    if not connections:
+        return
+    with _registry_lock:
+        for conn in connections.values():
+            if conn in _registry:
+                _registry.remove(conn)
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+    connections.clear()
+
+
+def close_all_connections():
+    """Close every connection opened by any thread (used at shutdown)"""
+    global _generation
+    with _registry_lock:
+        _generation += 1
+        for conn in _registry:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _registry.clear()
+
+
+def connection_count() -> int:
+    """Number of connections currently held open"""
+    with _registry_lock:
+        return len(_registry)
+
+
+class ScheduleCache:
+    """Process-wide, write-through cache of the active medication schedule
+
+    Loaded once and kept sorted by schedule_minute (minutes after local
+    midnight; rows with an invalid time have none and are left out).
+    add()/remove() write to the
+    database through the cache's own connection and update memory in place;
+    changes committed by any other connection (the alarm thread, the Rust
+    backend) bump PRAGMA data_version on that connection, which triggers a
+    reload. The version is checked at most every validate_interval seconds.
+    """
+
+    def __init__(self, validate_interval: float = 1.0):
+        self.validate_interval = validate_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db_file: Optional[str] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._generation = -1
+        self._data_version: Optional[int] = None
+        self._validated_at = 0.0
+        self._entries: List[Tuple[int, int, str]] = []  # (schedule_minute, id, name), sorted
+
+    def medications(self, db_file: str) -> List[Tuple[int, str, int]]:
+        """Active medications as [(id, name, schedule_minute)] sorted by schedule time"""
+        with self._lock:
+            self._ensure_fresh(db_file)
+            return [(med_id, name, schedule_minute) for schedule_minute, med_id, name in self._entries]
+
+    def add(self, db_file: str, name: str, schedule_minute: int) -> int:
+        """Insert a medication and return its id"""
+        with self._lock:
+            self._ensure_fresh(db_file)
+            c = self._conn.execute("""INSERT INTO medications (name, schedule_time, schedule_minute)
+                                      VALUES (?, ?, ?)""",
+                                   (name, format_minute_of_day(schedule_minute), schedule_minute))
+            self._conn.commit()
+            med_id = c.lastrowid
+            bisect.insort(self._entries, (schedule_minute, med_id, name))
+            return med_id
+
+    def add_many(self, db_file: str, medications: List[Tuple[str, int]]) -> List[int]:
+        """Insert [(name, schedule_minute)] in one transaction and return their ids in order"""
+        with self._lock:
+            self._ensure_fresh(db_file)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Under the write lock new AUTOINCREMENT ids follow the current maximum
+                last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM medications").fetchone()[0]
+                self._conn.executemany("""INSERT INTO medications (name, schedule_time, schedule_minute)
+                                          VALUES (?, ?, ?)""",
+                                       [(name, format_minute_of_day(schedule_minute), schedule_minute)
+                                        for name, schedule_minute in medications])
+                ids = [med_id for (med_id,) in self._conn.execute(
+                    "SELECT id FROM medications WHERE id > ? ORDER BY id", (last_id,))]
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            self._entries = sorted(self._entries + [(schedule_minute, med_id, name)
+                                                    for med_id, (name, schedule_minute) in zip(ids, medications)])
+            return ids
+
+    def remove(self, db_file: str, med_id: int) -> Optional[Tuple[str, Optional[int]]]:
+        """Deactivate a medication; returns (name, schedule_minute) or None if not found"""
+        with self._lock:
+            self._ensure_fresh(db_file)
+            row = self._conn.execute("SELECT name, schedule_minute FROM medications WHERE id = ?",
+                                     (med_id,)).fetchone()
+            if not row:
+                return None
+            self._conn.execute("UPDATE medications SET active = 0 WHERE id = ?", (med_id,))
+            self._conn.commit()
+            self._entries = [entry for entry in self._entries if entry[1] != med_id]
+            return row[0], row[1]
+
+    def invalidate(self):
+        """Force a reload on next access"""
+        with self._lock:
+            self._data_version = None
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters (a miss is a reload of the medications table)"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def _ensure_fresh(self, db_file: str):
+        if db_file != self._db_file or self._generation != _generation:
+            self._conn = open_shared_connection(db_file)
+            self._db_file = db_file
+            self._generation = _generation
+            self._data_version = None
+
+        now = time.monotonic()
+        if self._data_version is not None and now - self._validated_at < self.validate_interval:
+            self.hits += 1
+            SCHEDULE_CACHE_HITS.inc()
+            return
+        self._validated_at = now
+
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            self.hits += 1
+            SCHEDULE_CACHE_HITS.inc()
+            return
+
+        self.misses += 1
+        SCHEDULE_CACHE_MISSES.inc()
+        with SCHEDULE_RELOAD_SECONDS.time():
+            rows = self._conn.execute("""SELECT id, name, schedule_minute FROM medications
+                                         WHERE active = 1 AND schedule_minute IS NOT NULL""").fetchall()
+        self._entries = sorted((schedule_minute, med_id, name) for med_id, name, schedule_minute in rows)
+        self._data_version = data_version
+
+
+def sqlite_timestamp(epoch: float) -> str:
+    """Epoch seconds as a UTC 'YYYY-MM-DD HH:MM:SS' string, the format CURRENT_TIMESTAMP uses"""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(epoch))
+
+
+# A statement group: [(sql, params), ...] committed atomically; a list of
+# parameter rows runs the statement as executemany()
+Statements = Sequence[Tuple[str, object]]
+
+
+def execute_statements(conn: sqlite3.Connection, statements: Statements):
+    """Run a statement group on conn (inside the caller's transaction)"""
+    for sql, params in statements:
+        if isinstance(params, list):
+            conn.executemany(sql, params)
+        else:
+            conn.execute(sql, params)
+
+
+def is_busy_error(error: sqlite3.Error) -> bool:
+    """True for SQLITE_BUSY / SQLITE_LOCKED, the errors worth retrying"""
+    code = getattr(error, "sqlite_errorcode", None)  # Python 3.11+
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error)
+    return "locked" in message or "busy" in message
+
+
+class WriteBehindQueue:
+    """Write-behind queue with group commit for log inserts
+
+    Callers submit statement groups and return immediately; one writer
+    thread commits queued groups in submission order, up to max_batch per
+    transaction, once max_delay has passed since the oldest was queued (or
+    straight away when someone is waiting in flush()). Its connections use
+    synchronous=FULL, so a group is on disk once flush() returns for it; the
+    fsync is paid once per batch instead of once per row. Busy/locked errors
+    are retried without dropping anything; a group SQLite rejects for any
+    other reason (missing table, constraint, ...) is dropped on its own.
+    """
+
+    def __init__(self, max_batch: int = 256, max_delay: float = 0.2, retry_delay: float = 0.5):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+        self.rows = 0  # Statement groups committed
+        self.commits = 0
+        self.failed = 0  # Groups dropped because SQLite rejected them outright
+        self._cond = threading.Condition()
+        self._queue = collections.deque()  # (seq, db_file, statements, queued_at)
+        self._seq = itertools.count(1)
+        self._submitted = 0
+        self._committed = 0  # Every group with seq <= this is committed (or dropped)
+        self._flushing = 0  # Threads blocked in flush()
+        self._running = True
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, db_file: str, sql: str, params=()) -> int:
+        """Queue one statement; returns its ticket for wait()"""
+        return self.submit_group(db_file, [(sql, params)])
+
+    def submit_group(self, db_file: str, statements: Statements) -> int:
+        """Queue statements to commit together; returns their ticket for wait()"""
+        with self._cond:
+            if self._running:
+                seq = next(self._seq)
+                self._queue.append((seq, db_file, statements, time.monotonic()))
+                self._submitted = seq
+                self._ensure_thread()
+                self._cond.notify_all()
+                return seq
+        # Closed (shutting down): write synchronously so late records are not lost
+        conn = get_connection(db_file)
+        with conn:
+            execute_statements(conn, statements)
+        return 0
+
+    def wait(self, ticket: int, timeout: Optional[float] = None) -> bool:
+        """Block until the group with this ticket (and all before it) is committed"""
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: self._committed >= ticket, timeout)
+            finally:
+                self._flushing -= 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything submitted so far is committed; False on timeout"""
+        with self._cond:
+            ticket = self._submitted
+            if self._committed >= ticket:
+                return True
+        return self.wait(ticket, timeout)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def close(self, timeout: Optional[float] = 5.0) -> bool:
+        """Flush, then stop the writer thread; later submits are written synchronously"""
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return flushed
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self):
+        """Wait for a due batch: consecutive groups for one database file, oldest first"""
+        with self._cond:
+            while True:
+                if self._queue:
+                    due_at = self._queue[0][3] + self.max_delay
+                    wait = due_at - time.monotonic()
+                    if (wait <= 0 or self._flushing or not self._running
+                            or len(self._queue) >= self.max_batch):
+                        db_file = self._queue[0][1]
+                        batch = list(itertools.takewhile(lambda item: item[1] == db_file,
+                                                         itertools.islice(self._queue, self.max_batch)))
+                        return db_file, batch
+                    self._cond.wait(wait)
+                elif not self._running:
+                    return None, []
+                else:
+                    self._cond.wait()
+
+    def _run(self):
+        try:
+            while True:
+                db_file, batch = self._next_batch()
+                if not batch:
+                    return
+                try:
+                    self._commit(db_file, batch)
+                except sqlite3.Error as e:
+                    if is_busy_error(e):
+                        # Another writer holds the lock: keep the batch queued and try again
+                        print(f"Log writer error (will retry): {e}")
+                        time.sleep(self.retry_delay)
+                        continue
+                    # Isolate the bad group so the rest of the batch is still written
+                    for item in batch:
+                        try:
+                            self._commit(db_file, [item])
+                        except sqlite3.Error as e:
+                            if is_busy_error(e):
+                                break
+                            print(f"Log writer dropped a record: {e}")
+                            self._done([item], failed=True)
+                    continue
+        finally:
+            close_thread_connections()
+
+    def _commit(self, db_file: str, batch):
+        conn = get_connection(db_file)
+        conn.execute("PRAGMA synchronous=FULL")
+        with LOG_COMMIT_SECONDS.time(), conn:
+            for _, _, statements, _ in batch:
+                execute_statements(conn, statements)
+        self._done(batch)
+
+    def _done(self, batch, failed: bool = False):
+        with self._cond:
+            for _ in batch:
+                self._queue.popleft()
+            self._committed = batch[-1][0]
+            if failed:
+                self.failed += len(batch)
+            else:
+                self.rows += len(batch)
+                self.commits += 1
+            self._cond.notify_all()
+
+
+class VitalsWriter:
+    """Buffered, downsampling writer for vitals_logs
+
+    Readings are held in memory and inserted in one transaction once the
+    oldest is flush_interval seconds old (or max_batch are waiting), so the
+    SD card sees one write burst per interval instead of one per reading;
+    at most flush_interval seconds of readings are lost on a power cut.
+    Raw rows older than raw_retention are replaced by rollup_seconds means
+    (samples = number of readings averaged; NULL marks a raw reading).
+    Given a WriteBehindQueue, batches are handed to it instead of written
+    from the calling thread.
+    """
+
+    def __init__(self, flush_interval: float = 60.0, max_batch: int = 256,
+                 raw_retention: float = 3600.0, rollup_seconds: int = 60,
+                 compact_interval: float = 600.0, queue: Optional[WriteBehindQueue] = None):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.raw_retention = raw_retention
+        self.rollup_seconds = rollup_seconds
+        self.compact_interval = compact_interval
+        self.queue = queue
+        self.rows_written = 0
+        self.commits = 0
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[Optional[float], Optional[int], str, str, int]] = []
+        self._oldest: Optional[float] = None
+        self._compacted_at: Optional[float] = None
+        self._db_file: Optional[str] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._generation = -1
+
+    def record(self, db_file: str, temperature: Optional[float], heart_rate: Optional[int],
+               status: str, at: Optional[float] = None):
+        """Buffer one reading taken at epoch time `at` (default now); flushes when a batch is due"""
+        at = time.time() if at is None else at
+        with self._lock:
+            self._pending.append((temperature, heart_rate, status, sqlite_timestamp(at), int(at)))
+            if self._oldest is None:
+                self._oldest = at
+            due = len(self._pending) >= self.max_batch or at - self._oldest >= self.flush_interval
+        if due:
+            self.flush(db_file, now=at)
+
+    def flush(self, db_file: str, now: Optional[float] = None) -> int:
+        """Write buffered readings (and run a due rollup) in one transaction; returns rows written"""
+        now = time.time() if now is None else now
+        with self._lock:
+            batch, self._pending, self._oldest = self._pending, [], None
+            compact = self._compacted_at is None or now - self._compacted_at >= self.compact_interval
+            if not batch and not compact:
+                return 0
+            statements = []
+            if batch:
+                statements.append(("""INSERT INTO vitals_logs
+                                      (temperature, heart_rate, status, created_at, created_epoch)
+                                      VALUES (?, ?, ?, ?, ?)""", batch))
+            if compact:
+                statements.extend(self._roll_up_statements(now))
+                self._compacted_at = now
+
+            if self.queue is not None:
+                self.queue.submit_group(db_file, statements)
+            else:
+                self._ensure_connection(db_file)
+                with self._conn:
+                    execute_statements(self._conn, statements)
+            self.rows_written += len(batch)
+            self.commits += 1
+            return len(batch)
+
+    def pending(self) -> int:
+        """Readings buffered but not yet written"""
+        with self._lock:
+            return len(self._pending)
+
+    def _roll_up_statements(self, now: float) -> List[Tuple[str, object]]:
+        # Only whole buckets before the cutoff, so a bucket is never rolled up twice
+        cutoff = int((now - self.raw_retention) // self.rollup_seconds * self.rollup_seconds)
+        return [("""INSERT INTO vitals_logs (temperature, heart_rate, status, samples, created_at, created_epoch)
+                    SELECT ROUND(AVG(temperature), 1), CAST(ROUND(AVG(heart_rate)) AS INTEGER),
+                           CASE WHEN SUM(status = 'abnormal') > 0 THEN 'abnormal' ELSE 'normal' END,
+                           COUNT(*), datetime(bucket, 'unixepoch'), bucket
+                    FROM (SELECT temperature, heart_rate, status, created_epoch / :size * :size AS bucket
+                          FROM vitals_logs
+                          WHERE created_epoch < :cutoff AND samples IS NULL)
+                    GROUP BY bucket""",
+                 {"size": self.rollup_seconds, "cutoff": cutoff}),
+                ("DELETE FROM vitals_logs WHERE created_epoch < ? AND samples IS NULL", (cutoff,))]
+
+    def _ensure_connection(self, db_file: str):
+        if db_file != self._db_file or self._generation != _generation:
+            self._conn = open_shared_connection(db_file)
+            self._db_file = db_file
+            self._generation = _generation
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Streaming export of medhealth.db logs to CSV or JSON Lines
+
+Rows are read with fetchmany() in batches of EXPORT_BATCH_ROWS and written
+as they arrive, so memory stays flat however large the table is. Times are
+exported as ISO 8601 UTC ('2024-01-13T08:05:00Z'), formatted by SQLite.
+The export reads one snapshot (a single read transaction), which in WAL
+mode does not block the device's log writes.
+
+Usage:
+    python medhealth_export.py medication_logs|vitals_logs [--format csv|jsonl] [--gzip]
+                               [--since YYYY-MM-DD] [--until YYYY-MM-DD] [-o FILE] [db_file]
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import sqlite3
+import sys
+import time
+from typing import Iterator, Optional, TextIO, Tuple
+
+from medhealth_history import local_midnight
+
+EXPORT_BATCH_ROWS = 1000  # Rows per fetchmany(); bounds memory, not the export size
+EXPORT_FORMATS = ("csv", "jsonl")
+
+ISO_UTC = "strftime('%Y-%m-%dT%H:%M:%SZ', {}, 'unixepoch')"
+
+# Exported columns per table as (name, SQL expression); rows are ordered by
+# created_epoch, which both tables index
+EXPORT_COLUMNS = {
+    "medication_logs": [
+        ("id", "id"),
+        ("medication_id", "medication_id"),
+        ("medication_name", "medication_name"),
+        ("status", "status"),
+        ("scheduled_at", ISO_UTC.format("scheduled_epoch")),
+        ("actual_at", ISO_UTC.format("actual_epoch")),
+        ("temperature", "temperature"),
+        ("heart_rate", "heart_rate"),
+        ("logged_at", ISO_UTC.format("created_epoch")),
+    ],
+    "vitals_logs": [
+        ("id", "id"),
+        ("temperature", "temperature"),
+        ("heart_rate", "heart_rate"),
+        ("status", "status"),
+        ("samples", "samples"),
+        ("logged_at", ISO_UTC.format("created_epoch")),
+    ],
+}
+
+
+def column_names(table: str) -> list:
+    return [name for name, _ in EXPORT_COLUMNS[table]]
+
+
+def iter_rows(conn: sqlite3.Connection, table: str, since: Optional[str] = None,
+              until: Optional[str] = None, batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[tuple]:
+    """Rows of table in time order, optionally within local dates since..until (inclusive)"""
+    if table not in EXPORT_COLUMNS:
+        raise ValueError(f"Cannot export {table!r}; choose one of {', '.join(EXPORT_COLUMNS)}")
+    conditions, params = [], []
+    if since is not None:
+        conditions.append("created_epoch >= ?")
+        params.append(local_midnight(since))
+    if until is not None:
+        conditions.append("created_epoch < ?")
+        params.append(local_midnight(until, 1))
+    cursor = conn.execute(f"""SELECT {', '.join(sql for _, sql in EXPORT_COLUMNS[table])}
+                              FROM {table} {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+                              ORDER BY created_epoch, id""", params)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def write_csv(rows: Iterator[tuple], columns: list, out: TextIO) -> int:
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows: Iterator[tuple], columns: list, out: TextIO) -> int:
+    count = 0
+    for row in rows:
+        out.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        out.write("\n")
+        count += 1
+    return count
+
+
+def export(conn: sqlite3.Connection, table: str, out: TextIO, fmt: str = "csv",
+           since: Optional[str] = None, until: Optional[str] = None) -> int:
+    """Stream table to an open text stream; returns the number of rows written"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; choose one of {', '.join(EXPORT_FORMATS)}")
+    rows = iter_rows(conn, table, since, until)
+    writer = write_csv if fmt == "csv" else write_jsonl
+    return writer(rows, column_names(table), out)
+
+
+def export_file(db_file: str, table: str, path: str, fmt: Optional[str] = None, compress: Optional[bool] = None,
+                since: Optional[str] = None, until: Optional[str] = None) -> Tuple[int, float]:
+    """Export to path ('-' = stdout); format and gzip default from its suffix
+
+    Returns (rows, seconds).
+    """
+    suffixes = path.lower().split(".")[1:]
+    compress = (suffixes[-1:] == ["gz"]) if compress is None else compress
+    if fmt is None:
+        fmt = next((suffix for suffix in reversed(suffixes) if suffix in EXPORT_FORMATS), "csv")
+    start = time.perf_counter()
+    conn = sqlite3.connect(db_file, timeout=30)
+    try:
+        if path == "-":
+            if compress:
+                with gzip.open(sys.stdout.buffer, "wt", encoding="utf-8", newline="") as out:
+                    rows = export(conn, table, out, fmt, since, until)
+            else:
+                rows = export(conn, table, sys.stdout, fmt, since, until)
+        else:
+            opener = gzip.open if compress else open
+            with opener(path, "wt", encoding="utf-8", newline="") as out:
+                rows = export(conn, table, out, fmt, since, until)
+    finally:
+        conn.close()
+    return rows, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export medication or vitals logs from medhealth.db")
+    parser.add_argument("table", choices=sorted(EXPORT_COLUMNS))
+    parser.add_argument("db_file", nargs="?", default="medhealth.db")
+    parser.add_argument("-o", "--output", default="-", help="output file, '-' for stdout (default)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=None,
+                        help="default: from the output file suffix, else csv")
+    parser.add_argument("--gzip", action="store_true", default=None,
+                        help="gzip the output (implied by a .gz output file)")
+    parser.add_argument("--since", help="first local date to include (YYYY-MM-DD)")
+    parser.add_argument("--until", help="last local date to include (YYYY-MM-DD)")
+    args = parser.parse_intermixed_args()
+
+    rows, seconds = export_file(args.db_file, args.table, args.output, args.format, args.gzip,
+                                args.since, args.until)
+    if args.output != "-":
+        print(f"✓ Exported {rows} {args.table} rows to {args.output} in {seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
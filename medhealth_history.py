@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Paginated medication history for medhealth.db
+
+Pages run newest first with keyset pagination on (created_epoch, id): each
+page starts below the last row of the previous one, so page 1000 reads the
+same ~20 index entries as page 1 instead of skipping 20,000 rows. Every
+filter maps onto an index range (medication, status and with-vitals each
+have a (…, created_epoch) index; dates bound created_epoch).
+"""
+
+import datetime
+import sqlite3
+from collections import namedtuple
+from typing import Optional, Tuple
+
+# Filters are ANDed; None leaves one out. since/until are local dates
+# 'YYYY-MM-DD', both inclusive.
+HistoryFilter = namedtuple("HistoryFilter", ["medication_id", "status", "since", "until", "with_vitals"],
+                           defaults=(None, None, None, None, False))
+HistoryEntry = namedtuple("HistoryEntry", ["id", "medication_id", "medication_name", "scheduled_epoch",
+                                           "actual_epoch", "status", "temperature", "heart_rate",
+                                           "created_epoch"])
+# next_cursor is None on the last page
+HistoryPage = namedtuple("HistoryPage", ["entries", "next_cursor"])
+
+Cursor = Tuple[int, int]  # (created_epoch, id) of the last row shown
+
+# Same predicate as the partial index idx_medication_logs_vitals_epoch,
+# which SQLite only uses when the query repeats it word for word
+WITH_VITALS_SQL = "(temperature IS NOT NULL OR heart_rate IS NOT NULL)"
+
+
+def local_midnight(day: str, days_after: int = 0) -> int:
+    """Epoch of local midnight starting 'YYYY-MM-DD' (plus days_after days)"""
+    date = datetime.datetime.strptime(day, "%Y-%m-%d") + datetime.timedelta(days=days_after)
+    return int(date.timestamp())
+
+
+def where_clause(filters: HistoryFilter) -> Tuple[str, list]:
+    """SQL conditions and parameters for a filter ('' when it has none)"""
+    conditions, params = [], []
+    if filters.medication_id is not None:
+        conditions.append("medication_id = ?")
+        params.append(filters.medication_id)
+    if filters.status is not None:
+        conditions.append("status = ?")
+        params.append(filters.status)
+    if filters.since is not None:
+        conditions.append("created_epoch >= ?")
+        params.append(local_midnight(filters.since))
+    if filters.until is not None:
+        conditions.append("created_epoch < ?")
+        params.append(local_midnight(filters.until, 1))
+    if filters.with_vitals:
+        conditions.append(WITH_VITALS_SQL)
+    return " AND ".join(conditions), params
+
+
+def page(conn: sqlite3.Connection, filters: HistoryFilter = HistoryFilter(),
+         cursor: Optional[Cursor] = None, size: int = 20) -> HistoryPage:
+    """One page of logs, newest first, starting after cursor (None = first page)"""
+    conditions, params = where_clause(filters)
+    if cursor is not None:
+        conditions = " AND ".join(filter(None, ["(created_epoch, id) < (?, ?)", conditions]))
+        params = list(cursor) + params
+    sql = f"""SELECT id, medication_id, medication_name, scheduled_epoch, actual_epoch,
+                     status, temperature, heart_rate, created_epoch
+              FROM medication_logs {'WHERE ' + conditions if conditions else ''}
+              ORDER BY created_epoch DESC, id DESC LIMIT ?"""
+    # One extra row tells whether another page follows
+    rows = [HistoryEntry(*row) for row in conn.execute(sql, params + [size + 1])]
+    entries = rows[:size]
+    next_cursor = (entries[-1].created_epoch, entries[-1].id) if len(rows) > size else None
+    return HistoryPage(entries, next_cursor)
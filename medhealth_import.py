@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Bulk medication schedule import for medhealth.db
+
+Reads a schedule file, validates every row before touching the database
+and inserts them all in one transaction (one executemany, one commit), so
+a patient's regimen or a whole ward goes in at once or not at all.
+
+Accepted files (columns/keys "name" and "schedule_time" as HH:MM):
+    .csv          header row, then one medication per line
+    .json/.jsonl  an array of objects, or one object per line
+
+Usage:
+    python medhealth_import.py [--dry-run] schedule_file [db_file]
+"""
+
+import argparse
+import csv
+import json
+import time
+from collections import namedtuple
+from typing import List, Tuple
+
+from medhealth_db import ScheduleCache
+from medhealth_scheduler import schedule_minute_of_day
+
+ScheduleRow = namedtuple("ScheduleRow", ["line", "name", "schedule_minute"])
+ImportIssue = namedtuple("ImportIssue", ["line", "message"])  # line is 1-based in the file
+
+MAX_NAME_LENGTH = 200
+SCHEDULE_FILE_SUFFIXES = (".csv", ".json", ".jsonl")
+
+
+def validate_row(line: int, name, schedule_time) -> Tuple[List[ScheduleRow], List[ImportIssue]]:
+    """([row], []) for a valid entry, ([], [issues]) otherwise"""
+    issues = []
+    name = name.strip() if isinstance(name, str) else ""
+    if not name:
+        issues.append(ImportIssue(line, "missing medication name"))
+    elif len(name) > MAX_NAME_LENGTH:
+        issues.append(ImportIssue(line, f"name longer than {MAX_NAME_LENGTH} characters"))
+    try:
+        schedule_minute = schedule_minute_of_day(str(schedule_time).strip())
+    except ValueError:
+        issues.append(ImportIssue(line, f"invalid schedule time {schedule_time!r} (expected HH:MM)"))
+    if issues:
+        return [], issues
+    return [ScheduleRow(line, name, schedule_minute)], []
+
+
+def parse_csv(text: str) -> Tuple[List[ScheduleRow], List[ImportIssue]]:
+    reader = csv.DictReader(text.splitlines())
+    missing = {"name", "schedule_time"} - set(reader.fieldnames or [])
+    if missing:
+        return [], [ImportIssue(1, f"header must include {', '.join(sorted(missing))}")]
+    rows, issues = [], []
+    for record in reader:
+        valid, problems = validate_row(reader.line_num, record["name"], record["schedule_time"])
+        rows += valid
+        issues += problems
+    return rows, issues
+
+
+def parse_json(text: str) -> Tuple[List[ScheduleRow], List[ImportIssue]]:
+    """A JSON array of objects or JSON Lines, decoded object by object to keep line numbers"""
+    decoder = json.JSONDecoder()
+    rows, issues = [], []
+    position, line = 0, 1
+    in_array = text.lstrip().startswith("[")
+    if in_array:
+        position = text.index("[") + 1
+    while True:
+        start = position
+        while position < len(text) and text[position] in " \t\r\n,":
+            position += 1
+        line += text.count("\n", start, position)
+        if position >= len(text) or (in_array and text[position] == "]"):
+            break
+        try:
+            record, end = decoder.raw_decode(text, position)
+        except json.JSONDecodeError as e:
+            issues.append(ImportIssue(e.lineno, f"invalid JSON: {e.msg}"))
+            break
+        if isinstance(record, dict):
+            valid, problems = validate_row(line, record.get("name"), record.get("schedule_time"))
+            rows += valid
+            issues += problems
+        else:
+            issues.append(ImportIssue(line, "expected an object with name and schedule_time"))
+        line += text.count("\n", position, end)
+        position = end
+    return rows, issues
+
+
+def parse_schedule_file(path: str) -> Tuple[List[ScheduleRow], List[ImportIssue]]:
+    """All valid rows and every problem found; nothing is written"""
+    with open(path, encoding="utf-8-sig") as f:
+        text = f.read()
+    if path.lower().endswith((".json", ".jsonl")):
+        return parse_json(text)
+    return parse_csv(text)
+
+
+def import_rows(cache: ScheduleCache, db_file: str, rows: List[ScheduleRow]) -> List[int]:
+    """Insert validated rows in one transaction; returns their new medication ids"""
+    return cache.add_many(db_file, [(row.name, row.schedule_minute) for row in rows])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a medication schedule file into medhealth.db")
+    parser.add_argument("schedule_file")
+    parser.add_argument("db_file", nargs="?", default="medhealth.db")
+    parser.add_argument("--dry-run", action="store_true", help="validate only; change nothing")
+    args = parser.parse_intermixed_args()
+
+    start = time.perf_counter()
+    rows, issues = parse_schedule_file(args.schedule_file)
+    for issue in issues:
+        print(f"  ✗ line {issue.line}: {issue.message}")
+    if issues:
+        print(f"❌ {len(issues)} problem(s) in {args.schedule_file}; nothing imported")
+        raise SystemExit(1)
+    if args.dry_run:
+        print(f"✓ {len(rows)} medications valid ({time.perf_counter() - start:.2f} s); nothing imported")
+        return
+    ids = import_rows(ScheduleCache(), args.db_file, rows)
+    print(f"✓ Imported {len(ids)} medications in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
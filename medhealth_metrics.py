@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+In-process metrics for the MedHealth device runtime
+
+Counters, gauges and fixed-bucket histograms cheap enough for the sensor,
+alarm and database hot paths. Counters and histograms take no lock when
+recording: each thread adds into its own list of slots (a thread-local
+lookup, a bisect and two item adds, ~0.3-0.5 µs on CPython; see
+benchmark.py metrics) and a scrape sums the lists. The registry
+renders everything in the Prometheus text exposition format (0.0.4),
+served on a local HTTP endpoint by serve() or written to a file by
+write_file() (e.g. for node_exporter's textfile collector).
+
+Usage:
+    python medhealth_metrics.py [--port 9105]     # scrape a running device: curl localhost:9105/metrics
+"""
+
+import argparse
+import bisect
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+METRICS_HOST = "127.0.0.1"  # Local only; put a reverse proxy in front to scrape remotely
+METRICS_PORT = 9105
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Default histogram buckets in seconds: 100 µs (a cached SQLite read) to 10 s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (sample name suffix, label pairs, value)
+Sample = Tuple[str, Tuple[Tuple[str, str], ...], float]
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class ThreadCells:
+    """Per-thread slot lists: each thread only ever writes its own, so no lock
+
+    Lists of threads that have exited are folded into `retired` when the
+    totals are read, so short-lived workers do not pile up.
+    """
+
+    def __init__(self, width: int):
+        self.width = width
+        self.local = threading.local()  # .cell once the thread has recorded; hot paths read it directly
+        self._lock = threading.Lock()
+        self._cells: List[Tuple[threading.Thread, list]] = []
+        self._retired = [0] * width
+
+    def cell(self) -> list:
+        """The calling thread's slot list"""
+        try:
+            return self.local.cell
+        except AttributeError:
+            cell = self.local.cell = [0] * self.width
+            with self._lock:
+                self._cells.append((threading.current_thread(), cell))
+            return cell
+
+    def totals(self) -> list:
+        """Slot-wise sums over every thread (live writers may be one add behind)"""
+        with self._lock:
+            live = []
+            for thread, cell in self._cells:
+                if thread.is_alive():
+                    live.append((thread, cell))
+                else:
+                    self._retired = [a + b for a, b in zip(self._retired, cell)]
+            self._cells = live
+            totals = list(self._retired)
+            for _, cell in live:
+                totals = [a + b for a, b in zip(totals, cell)]
+        return totals
+
+
+class Metric:
+    """A metric family; with labelnames, labels(...) returns one series per label set"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.labelpairs: Tuple[Tuple[str, str], ...] = ()  # Set on series returned by labels()
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], "Metric"] = {}
+
+    def labels(self, *values) -> "Metric":
+        """The series for these label values, created on first use
+
+        Look children up once and keep them (e.g. in a module constant)
+        where it matters; the lookup costs about as much as the record.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._child()
+                    child.labelpairs = tuple(zip(self.labelnames, map(str, values)))
+                    self._children[values] = child
+        return child
+
+    def _child(self) -> "Metric":
+        return type(self)(self.name, self.help)
+
+    def series(self) -> List["Metric"]:
+        """Every series in the family (the family itself when it has no labels)"""
+        if not self.labelnames:
+            return [self]
+        with self._lock:
+            return list(self._children.values())
+
+    def samples(self) -> Iterator[Sample]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for series in self.series():
+            for suffix, extra, value in series.samples():
+                pairs = series.labelpairs + extra
+                labels = ",".join(f'{key}="{escape_label(val)}"' for key, val in pairs)
+                lines.append(f"{self.name}{suffix}{{{labels}}} {format_value(value)}" if labels
+                             else f"{self.name}{suffix} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    """Monotonically increasing count (events, errors)"""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cells = ThreadCells(1)
+        self._local = self._cells.local
+
+    def inc(self, amount: float = 1):
+        """Add amount (>= 0; not checked, this is the hot path)"""
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._cells.cell()
+        cell[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+    def samples(self) -> Iterator[Sample]:
+        yield "", (), self.value
+
+
+class Gauge(Metric):
+    """A value that goes up and down, or is computed at scrape time by set_function()"""
+
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value  # A single store; no lock needed
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]):
+        """Report function() when scraped (thread alive flags, queue depths)"""
+        self._function = function
+
+    def samples(self) -> Iterator[Sample]:
+        value = self.value
+        if self._function is not None:
+            try:
+                value = float(self._function())
+            except Exception:
+                value = math.nan
+        yield "", (), value
+
+
+class Timer:
+    """with histogram.time(): observes the block's duration in seconds"""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: "Histogram"):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram(Metric):
+    """Distribution over fixed upper bounds (le), plus sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets if bound != math.inf))
+        if not self.buckets:
+            raise ValueError(f"{name} needs at least one finite bucket")
+        # Per-thread slots: a count per bucket, then +Inf, then the sum
+        self._cells = ThreadCells(len(self.buckets) + 2)
+        self._local = self._cells.local
+
+    def _child(self) -> "Histogram":
+        return Histogram(self.name, self.help, buckets=self.buckets)
+
+    def observe(self, value: float):
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._cells.cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def time(self) -> Timer:
+        return Timer(self)
+
+    @property
+    def count(self) -> int:
+        return sum(self._cells.totals()[:-1])
+
+    @property
+    def sum(self) -> float:
+        return self._cells.totals()[-1]
+
+    def samples(self) -> Iterator[Sample]:
+        totals = self._cells.totals()
+        counts, total = totals[:-1], totals[-1]
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            yield "_bucket", (("le", format_value(bound)),), cumulative
+        yield "_sum", (), total
+        yield "_count", (), cumulative
+
+
+class Registry:
+    """Named metric families, rendered together"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """Add metric; an existing family of the same name and type is returned instead"""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+        if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+            raise ValueError(f"metric {metric.name} already registered as a different {existing.kind}")
+        return existing
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets=buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Every family in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+    def write_file(self, path: str):
+        """Write render() to path atomically (readers never see a half-written file)"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(temp_path, path)
+
+
+REGISTRY = Registry()  # The runtime's metrics; modules register theirs at import
+
+
+def handler_for(registry: Registry):
+    from http.server import BaseHTTPRequestHandler  # ~25 ms to import; only the endpoint needs it
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every 15 s would drown the console
+
+    return MetricsHandler
+
+
+def serve(registry: Registry = REGISTRY, host: str = METRICS_HOST, port: int = METRICS_PORT):
+    """Serve GET /metrics from a daemon thread; returns the ThreadingHTTPServer (shutdown() stops it)
+
+    Raises OSError if the port is taken.
+    """
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), handler_for(registry))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the metrics of a running MedHealth device")
+    parser.add_argument("--host", default=METRICS_HOST)
+    parser.add_argument("--port", type=int, default=METRICS_PORT)
+    args = parser.parse_args()
+
+    from urllib.request import urlopen
+    with urlopen(f"http://{args.host}:{args.port}/metrics", timeout=5) as response:
+        print(response.read().decode("utf-8"), end="")
+
+
+if __name__ == "__main__":
+    main()
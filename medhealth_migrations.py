@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for medhealth.db
+
+Applies the ordered SQL steps in backend/migrations/ (shared with the Rust
+backend) and records progress in PRAGMA user_version, so the device and
+the backend agree on the schema whichever of them upgrades a database.
+Each step commits in one transaction with its version bump.
+
+Usage:
+    python medhealth_migrations.py [--dry-run] [db_file]
+"""
+
+import argparse
+import math
+import os
+import re
+import sqlite3
+import time
+from collections import namedtuple
+from typing import List, Optional
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend", "migrations")
+DRY_RUN_SAMPLE_ROWS = 20000  # Rows per table copied to a scratch database to time a pending step
+
+Migration = namedtuple("Migration", ["version", "name", "statements"])
+# One pending step in a dry run; estimated_seconds is scaled from a sample
+PlannedStep = namedtuple("PlannedStep", ["version", "name", "statements", "rows", "estimated_seconds"])
+
+
+def split_statements(sql: str) -> List[str]:
+    """Statements in a migration file: split on ';' at line ends, '--' lines dropped
+
+    A CREATE TRIGGER statement runs until the line ending in 'END;'.
+    """
+    statements, current = [], []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("--"):
+            continue
+        current.append(line)
+        in_trigger = current[0].strip().upper().startswith("CREATE TRIGGER")
+        if stripped.endswith(";") and (not in_trigger or stripped.upper().endswith("END;")):
+            statements.append("\n".join(current).strip().rstrip(";"))
+            current = []
+    if current:
+        statements.append("\n".join(current).strip())
+    return statements
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Migration files NNNN_name.sql in version order"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = re.fullmatch(r"(\d+)_(\w+)\.sql", filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            migrations.append(Migration(int(match.group(1)), match.group(2), split_statements(f.read())))
+    versions = [migration.version for migration in migrations]
+    if versions != list(range(1, len(versions) + 1)):
+        raise ValueError(f"Migration versions must run 1..N without gaps: {versions}")
+    return migrations
+
+
+def latest_version(migrations: Optional[List[Migration]] = None) -> int:
+    migrations = load_migrations() if migrations is None else migrations
+    return migrations[-1].version if migrations else 0
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, migrations: Optional[List[Migration]] = None) -> List[Migration]:
+    """Apply pending migrations in order; returns the ones applied
+
+    Each step takes the write lock (BEGIN IMMEDIATE), re-checks the version
+    so a concurrent upgrade by the backend is not repeated, runs its
+    statements and bumps user_version in the same transaction.
+    """
+    migrations = load_migrations() if migrations is None else migrations
+    applied = []
+    for migration in migrations:
+        if migration.version <= current_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if migration.version <= current_version(conn):
+                conn.rollback()
+                continue
+            for statement in migration.statements:
+                try:
+                    conn.execute(statement)
+                except sqlite3.OperationalError as e:
+                    # Column added by an older release's CREATE TABLE / ALTER
+                    if "duplicate column name" not in str(e):
+                        raise
+            conn.execute(f"PRAGMA user_version = {migration.version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(migration)
+    return applied
+
+
+def _referenced_tables(statements: List[str], tables: List[str]) -> List[str]:
+    text = "\n".join(statements)
+    return [table for table in tables if re.search(rf"\b{re.escape(table)}\b", text, re.IGNORECASE)]
+
+
+def plan(conn: sqlite3.Connection, migrations: Optional[List[Migration]] = None,
+         sample_rows: int = DRY_RUN_SAMPLE_ROWS) -> List[PlannedStep]:
+    """Dry run: pending steps with estimated run times, without changing the database
+
+    The current schema and up to sample_rows rows of each table are copied
+    into a scratch database in the temp directory; each pending step is run
+    there and its time scaled by the largest table it touches (n log n in
+    actual vs sampled rows). Cache effects make it a rough lower bound.
+    """
+    migrations = load_migrations() if migrations is None else migrations
+    version = current_version(conn)
+    pending = [migration for migration in migrations if migration.version > version]
+    if not pending:
+        return []
+
+    import tempfile  # Only the dry run needs it (and it is slow to import)
+    sample_dir = tempfile.TemporaryDirectory()
+    sample = sqlite3.connect(os.path.join(sample_dir.name, "sample.db"))
+    sample.execute("PRAGMA journal_mode=WAL")
+    tables = [name for (name,) in conn.execute("""SELECT name FROM sqlite_master
+                                                  WHERE type = 'table' AND name NOT LIKE 'sqlite_%'""")]
+    row_counts = {}
+    sampled = {}
+    for (sql,) in conn.execute("""SELECT sql FROM sqlite_master
+                                  WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"""):
+        sample.execute(sql)
+    for table in tables:
+        row_counts[table] = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        rows = conn.execute(f'SELECT * FROM "{table}" LIMIT ?', (sample_rows,)).fetchall()
+        if rows:
+            placeholders = ", ".join("?" * len(rows[0]))
+            sample.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})', rows)
+        sampled[table] = len(rows)
+    # Indexes, then triggers: created after the copy so the sampled rows do not fire them
+    for object_type in ("index", "trigger"):
+        for (sql,) in conn.execute("""SELECT sql FROM sqlite_master
+                                      WHERE type = ? AND sql IS NOT NULL""", (object_type,)):
+            sample.execute(sql)
+    sample.commit()
+
+    steps = []
+    for migration in pending:
+        touched = _referenced_tables(migration.statements, tables)
+        start = time.perf_counter()
+        migrate(sample, [migration])
+        elapsed = time.perf_counter() - start
+        # Index builds sort their rows, so scale by n log n rather than n
+        scale = max([row_counts[table] * math.log(max(row_counts[table], 2))
+                     / (sampled[table] * math.log(max(sampled[table], 2)))
+                     for table in touched if sampled[table]] or [1.0])
+        rows = max([row_counts[table] for table in touched] or [0])
+        steps.append(PlannedStep(migration.version, migration.name, migration.statements,
+                                 rows, elapsed * max(scale, 1.0)))
+    sample.close()
+    sample_dir.cleanup()
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upgrade a MedHealth database to the latest schema")
+    parser.add_argument("db_file", nargs="?", default="medhealth.db")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="list pending steps with estimated run times; change nothing")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db_file, timeout=30)
+    version = current_version(conn)
+    latest = latest_version()
+    print(f"📦 {args.db_file}: schema version {version} (latest {latest})")
+    if version > latest:
+        print("⚠ Database is newer than this release's migrations; nothing to do")
+        return
+
+    if args.dry_run:
+        steps = plan(conn)
+        if not steps:
+            print("✓ Up to date")
+        for step in steps:
+            print(f"  {step.version:04d} {step.name:<44} {step.rows:>10,} rows  ~{step.estimated_seconds:.2f} s")
+        if steps:
+            print(f"  Estimated total: ~{sum(step.estimated_seconds for step in steps):.1f} s")
+        return
+
+    start = time.perf_counter()
+    applied = migrate(conn)
+    for migration in applied:
+        print(f"  ✓ {migration.version:04d} {migration.name}")
+    print(f"✓ Schema version {current_version(conn)} ({len(applied)} applied in {time.perf_counter() - start:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+MAX30102 photoplethysmography (PPG) pipeline for the MedHealth device
+
+Drains the sensor FIFO in burst reads, keeps red/IR samples in NumPy
+sliding windows and estimates heart rate with vectorized band-pass
+filtering and peak detection. Everything below the FIFO reader works on
+plain arrays, so it can be run offline against recorded or synthetic traces.
+"""
+
+import time
+from collections import namedtuple
+from typing import Optional, Tuple
+
+import numpy as np
+
+# MAX30102 registers
+MAX30102_ADDRESS = 0x57
+REG_FIFO_WR_PTR = 0x04
+REG_OVF_COUNTER = 0x05
+REG_FIFO_RD_PTR = 0x06
+REG_FIFO_DATA = 0x07
+REG_FIFO_CONFIG = 0x08
+REG_MODE_CONFIG = 0x09
+REG_SPO2_CONFIG = 0x0A
+REG_LED1_PA = 0x0C  # Red
+REG_LED2_PA = 0x0D  # IR
+
+FIFO_DEPTH = 32
+BYTES_PER_SAMPLE = 6  # 3 bytes red + 3 bytes IR in SpO2 mode
+SAMPLE_RATE = 100  # Hz, matches SPO2_CONFIG below
+
+# Pipeline defaults
+WINDOW_SECONDS = 8.0
+UPDATE_SECONDS = 1.0
+FINGER_IR_THRESHOLD = 10000  # Mean IR below this means no finger on the sensor
+BAND_HZ = (0.5, 4.0)  # 30 - 240 bpm
+MIN_PEAK_INTERVAL = 0.25  # seconds (240 bpm)
+
+# SpO2 = SPO2_A - SPO2_B * R, the usual empirical linear fit for the
+# ratio-of-ratios R; not calibrated against a reference oximeter
+SPO2_A = 110.0
+SPO2_B = 25.0
+
+# Signal quality: windows scoring below MIN_QUALITY are rejected
+MIN_QUALITY = 0.5
+PERFUSION_RANGE = (0.05, 20.0)  # IR AC/DC in %; outside this it is not a fingertip pulse
+MIN_BAND_RATIO = 0.6  # Share of AC power inside BAND_HZ; motion spreads it out of band
+MAX_INTERVAL_CV = 0.3  # Beat-to-beat interval variation that zeroes the score
+
+# Analysis of one window. bpm/spo2 are None if the window was rejected
+PpgReading = namedtuple("PpgReading", ["bpm", "spo2", "perfusion_index", "band_ratio",
+                                       "interval_cv", "quality", "motion"])
+
+
+class Max30102Fifo:
+    """Burst reader for the MAX30102 sample FIFO over a busio.I2C bus"""
+
+    def __init__(self, i2c, address: int = MAX30102_ADDRESS):
+        self.i2c = i2c
+        self.address = address
+        self.overflows = 0  # Samples lost because the FIFO filled up between drains
+        self._buffer = bytearray(FIFO_DEPTH * BYTES_PER_SAMPLE)
+
+    def configure(self):
+        """SpO2 mode, 100 samples/s, 18-bit, FIFO rollover, reset pointers"""
+        self._write(REG_FIFO_CONFIG, 0x1F)  # No averaging, rollover on, almost-full at 15
+        self._write(REG_SPO2_CONFIG, 0x27)  # 4096 nA range, 100 sps, 411 us pulses
+        self._write(REG_LED1_PA, 0x24)  # ~7 mA red
+        self._write(REG_LED2_PA, 0x24)  # ~7 mA IR
+        self._write(REG_MODE_CONFIG, 0x03)  # SpO2 mode (red + IR)
+        for register in (REG_FIFO_WR_PTR, REG_OVF_COUNTER, REG_FIFO_RD_PTR):
+            self._write(register, 0x00)
+
+    def read_samples(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Drain every sample currently in the FIFO as (red, ir) uint32 arrays"""
+        write_ptr, overflow, read_ptr = self._read(REG_FIFO_WR_PTR, 3)
+        self.overflows += overflow
+        available = FIFO_DEPTH if overflow else (write_ptr - read_ptr) % FIFO_DEPTH
+        if not available:
+            empty = np.empty(0, dtype=np.uint32)
+            return empty, empty
+
+        view = memoryview(self._buffer)[:available * BYTES_PER_SAMPLE]
+        self._read_into(REG_FIFO_DATA, view)
+        return decode_fifo(bytes(view))
+
+    def _write(self, register: int, value: int):
+        self._locked(lambda: self.i2c.writeto(self.address, bytes((register, value))))
+
+    def _read(self, register: int, length: int) -> bytearray:
+        buffer = bytearray(length)
+        self._read_into(register, buffer)
+        return buffer
+
+    def _read_into(self, register: int, buffer):
+        self._locked(lambda: self.i2c.writeto_then_readfrom(self.address, bytes((register,)), buffer))
+
+    def _locked(self, operation):
+        while not self.i2c.try_lock():
+            time.sleep(0.001)
+        try:
+            operation()
+        finally:
+            self.i2c.unlock()
+
+
+def decode_fifo(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode raw FIFO bytes into 18-bit (red, ir) sample arrays"""
+    raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 2, 3).astype(np.uint32)
+    values = ((raw[..., 0] << 16) | (raw[..., 1] << 8) | raw[..., 2]) & 0x3FFFF
+    return values[:, 0], values[:, 1]
+
+
+def bandpass(signals: np.ndarray, fs: float,
+             band: Tuple[float, float] = BAND_HZ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Zero-phase FFT band-pass filter along the last axis
+
+    Returns (filtered, dominant in-band frequency in Hz, share of AC power
+    that is pulse) so several channels can be filtered in one call. Pulse
+    power includes the first harmonic band, where a fast pulse's dicrotic
+    notch lands.
+    """
+    spectrum = np.fft.rfft(signals - signals.mean(axis=-1, keepdims=True))
+    freqs = np.fft.rfftfreq(signals.shape[-1], 1.0 / fs)
+    power = np.abs(spectrum) ** 2
+    outside = (freqs < band[0]) | (freqs > band[1])
+    total = power.sum(axis=-1)
+    pulse = power[..., (freqs >= band[0]) & (freqs <= 2 * band[1])].sum(axis=-1)
+    band_ratio = np.divide(pulse, total, out=np.zeros_like(total), where=total > 0)
+    power[..., outside] = 0
+    dominant = freqs[np.argmax(power, axis=-1)]
+    spectrum[..., outside] = 0
+    return np.fft.irfft(spectrum, n=signals.shape[-1]), dominant, band_ratio
+
+
+def detect_peaks(signal: np.ndarray, fs: float, min_interval: float = MIN_PEAK_INTERVAL) -> np.ndarray:
+    """Indices of systolic peaks: local maxima above half the window's
+    near-peak level, thinned so no two are closer than min_interval"""
+    middle = signal[1:-1]
+    threshold = 0.5 * np.percentile(signal, 98)
+    candidates = np.flatnonzero((middle > signal[:-2]) & (middle >= signal[2:]) & (middle > threshold)) + 1
+    if candidates.size < 2:
+        return candidates
+
+    min_distance = int(min_interval * fs)
+    # Greedy by height: keep a peak unless a taller one is within min_distance
+    order = candidates[np.argsort(signal[candidates])[::-1]]
+    kept = np.zeros(signal.size, dtype=bool)
+    blocked = np.zeros(signal.size + 1, dtype=np.int32)
+    for index in order:
+        if blocked[index]:
+            continue
+        kept[index] = True
+        blocked[max(index - min_distance + 1, 0):index + min_distance] = 1
+    return np.flatnonzero(kept)
+
+
+def analyze_window(red: np.ndarray, ir: np.ndarray, fs: float = SAMPLE_RATE) -> Optional[PpgReading]:
+    """Heart rate, SpO2 and signal quality for one red/IR window
+
+    Returns None without a finger on the sensor. Both channels are filtered
+    together; AC is the RMS of the band-passed signal and DC its mean.
+    """
+    if ir.size < fs * 2 or ir.mean() < FINGER_IR_THRESHOLD:
+        return None
+    signals = np.stack((red, ir)).astype(np.float64)
+    dc = signals.mean(axis=1)
+    filtered, dominant, band_ratio = bandpass(signals, fs)
+    ac = filtered.std(axis=1)
+    perfusion_index = float(100.0 * ac[1] / dc[1])
+
+    # The PPG dips as blood volume rises; invert so beats are maxima.
+    # Refractory period of half a beat at the dominant rate rejects dicrotic notches
+    min_interval = max(MIN_PEAK_INTERVAL, 0.5 / dominant[1]) if dominant[1] else MIN_PEAK_INTERVAL
+    peaks = detect_peaks(-filtered[1], fs, min_interval)
+    if peaks.size >= 3:
+        intervals = np.diff(peaks)
+        bpm = float(60.0 * fs / np.median(intervals))
+        interval_cv = float(intervals.std() / intervals.mean())
+    else:
+        bpm = None
+        interval_cv = float("inf")
+
+    ir_band_ratio = float(band_ratio[1])
+    motion = ir_band_ratio < MIN_BAND_RATIO or interval_cv > MAX_INTERVAL_CV
+    if PERFUSION_RANGE[0] <= perfusion_index <= PERFUSION_RANGE[1]:
+        quality = ir_band_ratio * max(0.0, 1.0 - interval_cv / MAX_INTERVAL_CV)
+    else:
+        quality = 0.0
+
+    spo2 = None
+    if dc[0] > 0 and ac[1] > 0:
+        ratio = (ac[0] / dc[0]) / (ac[1] / dc[1])
+        spo2 = float(min(SPO2_A - SPO2_B * ratio, 100.0))
+
+    if quality < MIN_QUALITY or motion or bpm is None or not 30 <= bpm <= 240:
+        bpm = spo2 = None
+    return PpgReading(bpm, spo2, perfusion_index, ir_band_ratio, interval_cv, quality, motion)
+
+
+class SlidingWindow:
+    """Fixed-length NumPy window of the most recent samples"""
+
+    def __init__(self, length: int, dtype=np.float64):
+        self.data = np.zeros(length, dtype=dtype)
+        self.filled = 0
+
+    def extend(self, samples: np.ndarray):
+        n = samples.size
+        if n >= self.data.size:
+            self.data[:] = samples[-self.data.size:]
+        elif n:
+            self.data[:-n] = self.data[n:]
+            self.data[-n:] = samples
+        self.filled = min(self.filled + n, self.data.size)
+
+    def values(self) -> np.ndarray:
+        return self.data[self.data.size - self.filled:]
+
+    def clear(self):
+        self.filled = 0
+
+
+class HeartRatePipeline:
+    """Buffers red/IR samples and re-analyses the window every update_seconds
+
+    Memory is fixed by the window length. Low-quality windows clear
+    bpm/spo2 so a stale or artefact-driven value never reaches the alerts.
+    """
+
+    def __init__(self, fs: float = SAMPLE_RATE, window_seconds: float = WINDOW_SECONDS,
+                 update_seconds: float = UPDATE_SECONDS):
+        self.fs = fs
+        self.red = SlidingWindow(int(fs * window_seconds))
+        self.ir = SlidingWindow(int(fs * window_seconds))
+        self.update_samples = int(fs * update_seconds)
+        self.reading: Optional[PpgReading] = None
+        self.rejected = 0  # Windows with a finger present but too poor to use
+        self._pending = 0
+
+    @property
+    def bpm(self) -> Optional[float]:
+        return self.reading.bpm if self.reading else None
+
+    @property
+    def spo2(self) -> Optional[float]:
+        return self.reading.spo2 if self.reading else None
+
+    def feed(self, red: np.ndarray, ir: np.ndarray) -> Optional[float]:
+        """Append samples; returns the current BPM (updated once per update interval)"""
+        self.red.extend(red)
+        self.ir.extend(ir)
+        self._pending += ir.size
+        if self._pending >= self.update_samples:
+            self._pending = 0
+            self.reading = analyze_window(self.red.values(), self.ir.values(), self.fs)
+            if self.reading is not None and self.reading.bpm is None:
+                self.rejected += 1
+        return self.bpm
+
+    def reset(self):
+        """Drop buffered samples (e.g. after a FIFO overflow left a gap)"""
+        self.red.clear()
+        self.ir.clear()
+        self._pending = 0
+        self.reading = None
+
+
+def synthetic_ppg(bpm: float, seconds: float, fs: float = SAMPLE_RATE, noise: float = 0.2,
+                  spo2: float = 97.0, motion: float = 0.0, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Red/IR traces for offline tests
+
+    A pulse at bpm with respiration drift and sensor noise; the red
+    amplitude is set so the ratio-of-ratios matches spo2. motion > 0 adds
+    random arm-movement artefacts of that amplitude (relative to the pulse).
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * fs)) / fs
+    phase = 2 * np.pi * bpm / 60.0 * t
+    # Sharp systolic upstroke plus dicrotic notch harmonic
+    pulse = np.sin(phase) + 0.4 * np.sin(2 * phase + 0.8)
+    drift = 0.5 * np.sin(2 * np.pi * 0.25 * t)
+    shape = pulse + drift + noise * rng.standard_normal(t.size)
+    ratio = (SPO2_A - spo2) / SPO2_B
+    ir = 100000 - 1500 * shape
+    red = 60000 - 60000 * ratio * 1500 / 100000 * shape
+    if motion:
+        # Jerky movement: smoothed random steps moving both channels together
+        kernel = np.ones(int(fs * 0.2)) / int(fs * 0.2)
+        jerk = np.convolve(rng.standard_normal(t.size) * (rng.random(t.size) < 0.02), kernel, "same")
+        artefact = motion * 1500 * np.cumsum(jerk) / np.sqrt(fs)
+        ir = ir + artefact
+        red = red + artefact * 0.6
+    return red.astype(np.uint32), ir.astype(np.uint32)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Event-driven dose scheduler for the MedHealth device runtime
+
+Keeps a min-heap of next due times so the alarm thread sleeps exactly until
+the next dose (or until the schedule changes) instead of polling SQLite.
+Updates are O(log n); superseded heap entries are discarded lazily.
+"""
+
+import datetime
+import heapq
+import itertools
+import re
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# A dose that has come due; lateness is seconds between due_at and hand-off
+DueEvent = namedtuple("DueEvent", ["key", "due_at", "payload", "lateness"])
+
+SCHEDULE_TIME_PATTERN = re.compile(r"([01][0-9]|2[0-3]):([0-5][0-9])")  # Two-digit 00:00-23:59
+
+
+def parse_schedule_time(schedule_time: str) -> Tuple[int, int]:
+    """Parse 'HH:MM' into (hour, minute), raising ValueError if invalid"""
+    match = SCHEDULE_TIME_PATTERN.fullmatch(schedule_time)
+    if not match:
+        raise ValueError(f"Invalid schedule time: {schedule_time}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def schedule_minute_of_day(schedule_time: str) -> int:
+    """Parse 'HH:MM' into minutes after midnight (0-1439), raising ValueError if invalid"""
+    hour, minute = parse_schedule_time(schedule_time)
+    return hour * 60 + minute
+
+
+def format_minute_of_day(minute_of_day: int) -> str:
+    """Minutes after midnight as 'HH:MM'"""
+    return "%02d:%02d" % divmod(minute_of_day, 60)
+
+
+def local_day_bounds(epoch: float) -> Tuple[int, int]:
+    """Half-open [start, end) epoch bounds of the local calendar day containing epoch"""
+    day = datetime.date.fromtimestamp(epoch)
+    start = datetime.datetime.combine(day, datetime.time())
+    end = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time())
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def next_daily_occurrence(schedule_minute: int, after: float, grace: float = 0.0) -> float:
+    """Epoch time of the next daily occurrence of a minute-of-day at or after (after - grace)"""
+    hour, minute = divmod(schedule_minute, 60)
+    reference = datetime.datetime.fromtimestamp(after - grace)
+    due = reference.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if due < reference:
+        # Rebuild from the date (not +24 h) so DST changes keep the wall-clock time
+        due = datetime.datetime.combine(due.date() + datetime.timedelta(days=1), due.time())
+    return due.timestamp()
+
+
+class DoseScheduler:
+    """Thread-safe min-heap of (due time, key) with blocking wait_for_due()"""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._entries: Dict[Hashable, Tuple[int, float, object]] = {}  # key -> (seq, due_at, payload)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._woken = False
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries)
+
+    def schedule(self, key: Hashable, due_at: float, payload=None):
+        """Add or move key to fire at due_at (epoch seconds)"""
+        with self._cond:
+            seq = next(self._seq)
+            self._entries[key] = (seq, due_at, payload)
+            heapq.heappush(self._heap, (due_at, seq, key))
+            self._compact()
+            # The waiter recomputes its sleep from the new heap top
+            self._cond.notify_all()
+
+    def remove(self, key: Hashable) -> bool:
+        """Remove key; its heap entry is dropped lazily when it reaches the top"""
+        with self._cond:
+            removed = self._entries.pop(key, None) is not None
+            if removed:
+                self._compact()
+            return removed
+
+    def keys(self) -> List[Hashable]:
+        """Currently scheduled keys"""
+        with self._cond:
+            return list(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, object]]:
+        """(due_at, payload) for key, or None if not scheduled"""
+        with self._cond:
+            entry = self._entries.get(key)
+            return (entry[1], entry[2]) if entry else None
+
+    def next_due(self) -> Optional[float]:
+        """Earliest due time, or None if nothing is scheduled"""
+        with self._cond:
+            self._discard_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def wake(self):
+        """Interrupt a blocked wait_for_due() (e.g. on shutdown)"""
+        with self._cond:
+            self._woken = True
+            self._cond.notify_all()
+
+    def wait_for_due(self, timeout: Optional[float] = None) -> List[DueEvent]:
+        """Block until at least one entry is due, wake() is called or timeout expires
+
+        Due entries are removed from the scheduler and returned in due order;
+        callers re-schedule recurring keys. Returns [] on wake/timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._discard_stale()
+                now = time.time()
+                if self._heap and self._heap[0][0] <= now:
+                    return self._pop_due(now)
+                if self._woken:
+                    self._woken = False
+                    return []
+
+                wait = None if not self._heap else self._heap[0][0] - now
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return []
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+
+    def _pop_due(self, now: float) -> List[DueEvent]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, seq, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != seq:
+                continue  # Superseded or removed
+            del self._entries[key]
+            due.append(DueEvent(key, due_at, entry[2], now - due_at))
+        return due
+
+    def _discard_stale(self):
+        while self._heap:
+            _, seq, key = self._heap[0]
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == seq:
+                return
+            heapq.heappop(self._heap)
+
+    def _compact(self):
+        # Rebuild once stale entries dominate so memory stays O(live entries)
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(due_at, seq, key) for key, (seq, due_at, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+
+# Dose alarm states
+PENDING = "pending"  # Due, not yet announced
+RINGING = "ringing"  # Buzzer/LED active, waiting for the button
+CONFIRMED = "confirmed"  # Button pressed while ringing
+MISSED = "missed"  # Ring timeout expired without a press
+
+
+class DoseAlarm:
+    """One due dose moving through pending -> ringing -> confirmed/missed"""
+
+    __slots__ = ("med_id", "name", "schedule_minute", "due_at", "state", "rang_at", "deadline", "resolved_at")
+
+    def __init__(self, med_id: int, name: str, schedule_minute: int, due_at: float):
+        self.med_id = med_id
+        self.name = name
+        self.schedule_minute = schedule_minute
+        self.due_at = due_at
+        self.state = PENDING
+        self.rang_at: Optional[float] = None
+        self.deadline: Optional[float] = None
+        self.resolved_at: Optional[float] = None
+
+    def __repr__(self):
+        return f"DoseAlarm({self.med_id}, {self.name!r}, {format_minute_of_day(self.schedule_minute)}, {self.state})"
+
+
+class AlarmStateMachine:
+    """Tracks every outstanding dose alarm without blocking on user input
+
+    The scheduling loop adds due doses, starts them ringing and expires
+    them; a button handler confirms everything ringing as one group.
+    Resolved alarms are handed back to the caller and forgotten.
+    """
+
+    def __init__(self, ring_timeout: float = 60.0):
+        self.ring_timeout = ring_timeout
+        self._lock = threading.Lock()
+        self._alarms: Dict[Tuple[int, float], DoseAlarm] = {}  # (med_id, due_at) -> alarm
+
+    def add(self, med_id: int, name: str, schedule_minute: int, due_at: float) -> Optional[DoseAlarm]:
+        """Register a due dose as pending; None if that dose is already outstanding"""
+        with self._lock:
+            if any(alarm.med_id == med_id for alarm in self._alarms.values()):
+                return None
+            alarm = DoseAlarm(med_id, name, schedule_minute, due_at)
+            self._alarms[(med_id, due_at)] = alarm
+            return alarm
+
+    def start_ringing(self, now: Optional[float] = None) -> List[DoseAlarm]:
+        """Move every pending alarm to ringing and return them"""
+        now = time.time() if now is None else now
+        started = []
+        with self._lock:
+            for alarm in self._alarms.values():
+                if alarm.state == PENDING:
+                    alarm.state = RINGING
+                    alarm.rang_at = now
+                    alarm.deadline = now + self.ring_timeout
+                    started.append(alarm)
+        return started
+
+    def confirm_ringing(self, now: Optional[float] = None) -> List[DoseAlarm]:
+        """Confirm every ringing alarm as one group (a single button press)"""
+        return self._resolve(lambda alarm, _: alarm.state == RINGING, CONFIRMED, now)
+
+    def expire(self, now: Optional[float] = None) -> List[DoseAlarm]:
+        """Mark ringing alarms past their deadline as missed"""
+        return self._resolve(lambda alarm, t: alarm.state == RINGING and alarm.deadline <= t, MISSED, now)
+
+    def is_ringing(self) -> bool:
+        with self._lock:
+            return any(alarm.state == RINGING for alarm in self._alarms.values())
+
+    def outstanding(self) -> List[DoseAlarm]:
+        """Pending and ringing alarms, oldest due first"""
+        with self._lock:
+            return sorted(self._alarms.values(), key=lambda alarm: (alarm.due_at, alarm.med_id))
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest ring timeout among ringing alarms"""
+        with self._lock:
+            deadlines = [alarm.deadline for alarm in self._alarms.values() if alarm.state == RINGING]
+            return min(deadlines) if deadlines else None
+
+    def _resolve(self, predicate, state: str, now: Optional[float]) -> List[DoseAlarm]:
+        now = time.time() if now is None else now
+        with self._lock:
+            resolved = [alarm for alarm in self._alarms.values() if predicate(alarm, now)]
+            for alarm in resolved:
+                alarm.state = state
+                alarm.resolved_at = now
+                del self._alarms[(alarm.med_id, alarm.due_at)]
+        resolved.sort(key=lambda alarm: (alarm.due_at, alarm.med_id))
+        return resolved
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Background sensor sampling for the MedHealth device runtime
+
+Each sensor gets a sampler thread that reads it at a fixed interval into a
+fixed-size, array-backed ring buffer. Consumers (health checks, manual
+vitals, dashboards) read the latest value or a recent window in O(1)
+without touching the I2C / 1-wire bus and without taking a lock.
+"""
+
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+from medhealth_metrics import REGISTRY
+
+SENSOR_READ_SECONDS = REGISTRY.histogram("medhealth_sensor_read_seconds", "Sensor read duration", ["sensor"])
+SENSOR_READ_ERRORS = REGISTRY.counter("medhealth_sensor_read_errors_total",
+                                      "Sensor reads that failed or returned nothing", ["sensor"])
+
+
+class RingBuffer:
+    """Single-writer ring of (timestamp, value) samples backed by two arrays
+
+    The writer fills a slot and only then publishes it by bumping `count`
+    (an atomic int store under the GIL), so readers never see a half-written
+    latest sample. Window reads re-check `count` and retry if the writer
+    lapped the slots being copied.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._times = array('d', bytes(8 * capacity))
+        self._values = array('d', bytes(8 * capacity))
+        self.count = 0  # Total samples ever written
+
+    def append(self, timestamp: float, value: float):
+        slot = self.count % self.capacity
+        self._times[slot] = timestamp
+        self._values[slot] = value
+        self.count += 1
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        """(timestamp, value) of the newest sample, or None if empty"""
+        count = self.count
+        if not count:
+            return None
+        slot = (count - 1) % self.capacity
+        return self._times[slot], self._values[slot]
+
+    def window(self, seconds: float, now: Optional[float] = None) -> List[Tuple[float, float]]:
+        """Samples from the last `seconds`, oldest first"""
+        now = time.monotonic() if now is None else now
+        while True:
+            count = self.count
+            samples = []
+            for index in range(count - 1, max(count - self.capacity, 0) - 1, -1):
+                slot = index % self.capacity
+                timestamp = self._times[slot]
+                if now - timestamp > seconds:
+                    break
+                samples.append((timestamp, self._values[slot]))
+            # Retry if the writer overwrote any slot we looked at
+            if self.count - count <= self.capacity - len(samples):
+                samples.reverse()
+                return samples
+
+
+class SensorChannel:
+    """One sensor read in its own thread into a RingBuffer"""
+
+    def __init__(self, name: str, read: Callable[[], Optional[float]], interval: float,
+                 capacity: int = 600):
+        self.name = name
+        self.read = read
+        self.interval = interval
+        self.buffer = RingBuffer(capacity)
+        self.errors = 0
+        self._read_seconds = SENSOR_READ_SECONDS.labels(name)
+        self._read_errors = SENSOR_READ_ERRORS.labels(name)
+        self._new_sample = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"sampler-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def latest(self, max_age: Optional[float] = None) -> Optional[float]:
+        """Newest value, or None if there is none (or it is older than max_age seconds)"""
+        sample = self.buffer.latest()
+        if sample is None:
+            return None
+        timestamp, value = sample
+        if max_age is not None and time.monotonic() - timestamp > max_age:
+            return None
+        return value
+
+    def wait_for_sample(self, timeout: float) -> Optional[float]:
+        """Block until the next sample is written and return it (None on timeout)"""
+        with self._new_sample:
+            count = self.buffer.count
+            if not self._new_sample.wait_for(lambda: self.buffer.count != count, timeout):
+                return None
+        return self.latest()
+
+    def _run(self):
+        next_read = time.monotonic()
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            try:
+                value = self.read()
+            except Exception:
+                value = None
+            self._read_seconds.observe(time.perf_counter() - started)
+            if value is None:
+                self.errors += 1
+                self._read_errors.inc()
+            else:
+                self.buffer.append(time.monotonic(), float(value))
+                with self._new_sample:
+                    self._new_sample.notify_all()
+            # Fixed cadence; if a read overran, start the next one straight away
+            next_read = max(next_read + self.interval, time.monotonic())
+            self._stop.wait(next_read - time.monotonic())
+
+
+class SensorSampler:
+    """The set of sensor channels, started and stopped together"""
+
+    def __init__(self, channels: List[SensorChannel]):
+        self.channels: Dict[str, SensorChannel] = {channel.name: channel for channel in channels}
+
+    def __getitem__(self, name: str) -> SensorChannel:
+        return self.channels[name]
+
+    @property
+    def running(self) -> bool:
+        return any(channel.running for channel in self.channels.values())
+
+    def start(self):
+        for channel in self.channels.values():
+            channel.start()
+
+    def stop(self):
+        for channel in self.channels.values():
+            channel.stop()
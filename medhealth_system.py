@@ -13,37 +13,69 @@ import sys
 from typing import Optional, Tuple, List
 import json
 import os
+import queue
 try:
     import select
 except ImportError:
     # Windows doesn't have select module, use alternative
     select = None
 
-# GPIO imports
-try:
-    import RPi.GPIO as GPIO
-except ImportError:
-    print("Warning: RPi.GPIO not available. Using mock mode.")
-    GPIO = None
+import medhealth_adherence
+import medhealth_history
+import medhealth_import
+import medhealth_control
+import medhealth_metrics
+import medhealth_migrations
+from medhealth_tracing import DoseTracer
+from medhealth_db import (get_connection, close_all_connections, close_thread_connections, sqlite_timestamp,
+                          ScheduleCache, VitalsWriter, WriteBehindQueue, DB_QUERY_SECONDS)
+from medhealth_scheduler import (DoseScheduler, AlarmStateMachine, next_daily_occurrence,
+                                 schedule_minute_of_day, format_minute_of_day, local_day_bounds)
+from medhealth_actuators import ActuatorWorker, Pattern, blink, solid
+from medhealth_sensors import SensorChannel, SensorSampler
 
-# Sensor imports
-try:
-    import board
-    import busio
-    import adafruit_max30102
-    import adafruit_mlx90614
-except ImportError:
-    print("Warning: Sensor libraries not available. Using mock mode.")
-    board = None
-    busio = None
-    adafruit_max30102 = None
-    adafruit_mlx90614 = None
+# Hardware libraries, imported by load_hardware() on first use so the CLI
+# and tools importing this module never pay for (or touch) GPIO, I2C or numpy
+GPIO = None  # RPi.GPIO
+board = None
+busio = None
+adafruit_max30102 = None
+adafruit_mlx90614 = None
+medhealth_ppg = None  # MAX30102 FIFO/PPG pipeline (needs numpy)
+W1ThermSensor = None  # For DS18B20 temperature sensor (1-wire)
+hardware_loaded = False
 
-# For DS18B20 temperature sensor (1-wire)
-try:
-    from w1thermsensor import W1ThermSensor
-except ImportError:
-    W1ThermSensor = None
+def load_hardware():
+    """Import the GPIO and sensor libraries (once); missing ones leave mock mode"""
+    global GPIO, board, busio, adafruit_max30102, adafruit_mlx90614, medhealth_ppg, W1ThermSensor
+    global hardware_loaded
+    if hardware_loaded:
+        return
+    hardware_loaded = True
+
+    try:
+        import RPi.GPIO as GPIO
+    except ImportError:
+        print("Warning: RPi.GPIO not available. Using mock mode.")
+
+    try:
+        import board
+        import busio
+        import adafruit_max30102
+        import adafruit_mlx90614
+    except ImportError:
+        print("Warning: Sensor libraries not available. Using mock mode.")
+        board = busio = adafruit_max30102 = adafruit_mlx90614 = None
+
+    try:
+        import medhealth_ppg
+    except ImportError:
+        medhealth_ppg = None
+
+    try:
+        from w1thermsensor import W1ThermSensor
+    except ImportError:
+        W1ThermSensor = None
 
 # Pin Definitions (Physical Pin Numbers on Raspberry Pi 3)
 BUZZER_PIN = 11  # Physical Pin 11 (GPIO 17)
@@ -52,68 +84,156 @@ LED_HEART_PIN = 15  # Physical Pin 15 (GPIO 22) - Near heart sensor
 LED_TEMP_PIN = 16  # Physical Pin 16 (GPIO 23) - Near temp sensor
 LED_BUTTON_PIN = 18  # Physical Pin 18 (GPIO 24) - Near button
 
+# Actuator pattern priorities (higher preempts lower)
+PRIORITY_TEST = 10
+PRIORITY_HEALTH_ALERT = 20
+PRIORITY_MEDICATION_ALARM = 30
+PRIORITY_CONFIRMATION = 40
+
+# Medication alarm: 4 quick beeps with the button LED, then a short pause
+MEDICATION_ALARM_PATTERN = Pattern(
+    steps=((frozenset((LED_BUTTON_PIN, BUZZER_PIN)), 0.15), (frozenset(), 0.05)) * 4 + ((frozenset(), 0.2),),
+    priority=PRIORITY_MEDICATION_ALARM, duration=None)
+# Dose confirmed: solid button LED and tone
+CONFIRMATION_PATTERN = solid((LED_BUTTON_PIN, BUZZER_PIN), priority=PRIORITY_CONFIRMATION, duration=2.0)
+
+def health_alert_pattern(led_pin) -> Pattern:
+    """Abnormal vital sign: sensor LED blinks at 0.3 s with two short beeps per flash"""
+    return Pattern(steps=((frozenset((led_pin, BUZZER_PIN)), 0.1), (frozenset((led_pin,)), 0.1),
+                          (frozenset((led_pin, BUZZER_PIN)), 0.1), (frozenset(), 0.3)),
+                   priority=PRIORITY_HEALTH_ALERT, duration=5.0)
+
+TEMP_ALERT_PATTERN = health_alert_pattern(LED_TEMP_PIN)
+HR_ALERT_PATTERN = health_alert_pattern(LED_HEART_PIN)
+
+# Background sensor sampling
+TEMP_SAMPLE_INTERVAL = 2.0  # seconds (a DS18B20 conversion takes ~750 ms)
+HR_SAMPLE_INTERVAL = 1.0  # seconds
+PPG_DRAIN_INTERVAL = 0.25  # seconds; the 32-sample FIFO holds 0.32 s at 100 sps
+HR_MEASURE_TIMEOUT = 10  # seconds to wait for a PPG estimate on a direct read
+VITALS_MAX_AGE = 15.0  # Samples older than this count as "no reading"
+
+# Vitals persistence (vitals_logs)
+VITALS_FLUSH_SECONDS = 60  # Batch readings into one commit per minute
+VITALS_RAW_RETENTION = 3600  # Keep every reading for an hour...
+VITALS_ROLLUP_SECONDS = 60  # ...then 1-minute means
+
+# Write-behind log queue (medication_logs and vitals_logs inserts)
+LOG_MAX_BATCH = 256  # Rows per group commit
+LOG_MAX_DELAY = 0.2  # seconds a row may wait for others to share its commit
+LOG_READ_FLUSH_TIMEOUT = 2.0  # Readers wait this long for queued logs to land
+
+# Bulk schedule import
+IMPORT_ISSUES_SHOWN = 20  # Validation problems listed before "… and N more"
+IMPORT_CHUNK_ROWS = 400  # Rows per "add" request to the daemon; even 200-character names of
+                         # astral characters (12 bytes escaped) stay under MAX_REQUEST_BYTES
+
+# Medication history
+HISTORY_PAGE_SIZE = 20  # Log entries per history page
+HISTORY_SUMMARY_DAYS = 30  # Adherence totals window (from daily_adherence)
+
+# Button edge detection
+BUTTON_BOUNCE_MS = 50  # Debounce window for edge callbacks
+button_events = queue.Queue()  # (pressed, monotonic time) pushed by on_button_edge()
+button_interrupts = False  # True once edge detection is registered; otherwise poll
+
 # Sensor thresholds
 TEMP_MIN = 18.0  # °C
 TEMP_MAX = 30.0  # °C
 HR_MIN = 60  # bpm
 HR_MAX = 120  # bpm
+HEALTH_CHECK_INTERVAL = 10  # seconds between vitals checks while monitoring
 
 # Global variables
 monitoring_active = False
 alarm_active = False
 system_running = True
 heart_rate_sensor = None
+ppg_fifo = None  # MAX30102 FIFO burst reader (medhealth_ppg)
+ppg_pipeline = None  # Sliding-window BPM estimator fed from ppg_fifo
 temp_sensor = None
 pwm_buzzer = None  # PWM object for buzzer
 alarm_monitoring_active = False  # Independent alarm monitoring thread
 alarm_monitoring_thread = None  # Thread for independent alarm monitoring
-alarm_monitoring_active = False  # Independent alarm monitoring thread
-alarm_monitoring_thread = None  # Thread for independent alarm monitoring
+health_monitoring_thread = None  # Vitals checks (abnormal-vitals alerts and vitals_logs)
+
+# Alarm scheduling
+ALARM_GRACE_SECONDS = 30  # Doses this far overdue when first scheduled still ring
+ALARM_RING_SECONDS = 60  # A ringing dose is logged as missed after this long
+SCHEDULE_RESYNC_SECONDS = 60  # Re-read the medications table at least this often
+dose_scheduler = DoseScheduler()
+dose_alarms = AlarmStateMachine(ring_timeout=ALARM_RING_SECONDS)
+dose_tracer = DoseTracer()  # Stage times per ringing dose, persisted to dose_traces with its log
+alarm_button_thread = None  # Confirms ringing doses on button press
+schedule_cache = ScheduleCache()  # Active medications, shared by menu, dashboard and alarms
+log_queue = WriteBehindQueue(max_batch=LOG_MAX_BATCH, max_delay=LOG_MAX_DELAY)  # medication/vitals log writer
+vitals_writer = VitalsWriter(flush_interval=VITALS_FLUSH_SECONDS,  # Batched vitals_logs inserts
+                             raw_retention=VITALS_RAW_RETENTION, rollup_seconds=VITALS_ROLLUP_SECONDS,
+                             queue=log_queue)
 
 # Database setup
 DB_FILE = "medhealth.db"
 
+# Metrics (Prometheus text on http://METRICS_HOST:METRICS_PORT/metrics; SIGUSR1 or exit dumps to METRICS_FILE)
+METRICS_HOST = medhealth_metrics.METRICS_HOST
+METRICS_PORT = medhealth_metrics.METRICS_PORT
+METRICS_FILE = "medhealth_metrics.prom"
+metrics = medhealth_metrics.REGISTRY
+ALARM_LATENESS = metrics.histogram("medhealth_alarm_lateness_seconds", "Scheduled dose time to buzzer on",
+                                   buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+BUTTON_RESPONSE = metrics.histogram("medhealth_button_response_seconds",
+                                    "Button press to confirmation LED/buzzer",
+                                    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+DOSES_LOGGED = metrics.counter("medhealth_doses_total", "Doses logged, by status (taken/missed)", ["status"])
+THREAD_ALIVE = metrics.gauge("medhealth_thread_alive", "1 while a runtime thread is running", ["thread"])
+ALARM_LOOP_HEARTBEAT = metrics.gauge("medhealth_alarm_loop_heartbeat_seconds",
+                                     "Unix time of the alarm loop's last pass (it wakes at least every minute)")
+LOG_QUEUE_PENDING = metrics.gauge("medhealth_log_queue_pending", "Log statement groups waiting to be committed")
+TAKEN_TODAY_QUERY = DB_QUERY_SECONDS.labels("taken_today")
+DASHBOARD_QUERY = DB_QUERY_SECONDS.labels("dashboard")
+HISTORY_PAGE_QUERY = DB_QUERY_SECONDS.labels("history_page")
+HISTORY_SUMMARY_QUERY = DB_QUERY_SECONDS.labels("history_summary")
+last_button_press = None  # time.monotonic() of the press wait_for_button() last accepted
+
+# Day-range lookups on medication_logs; both must stay seeks on
+# idx_medication_logs_med_epoch (checked in tests/test_db.py)
+TAKEN_TODAY_SQL = '''SELECT COUNT(*) FROM medication_logs
+                     WHERE medication_id = ? AND created_epoch >= ? AND created_epoch < ? AND status = 'taken' '''
+DASHBOARD_SQL = '''SELECT m.id, m.name, m.schedule_minute, l.status, l.actual_epoch,
+                          EXISTS (SELECT 1 FROM medication_logs t
+                                  WHERE t.medication_id = m.id
+                                    AND t.created_epoch >= :start AND t.created_epoch < :end
+                                    AND t.status = 'taken') AS taken_today
+                   FROM medications m
+                   LEFT JOIN medication_logs l
+                     ON l.id = (SELECT id FROM medication_logs
+                                WHERE medication_id = m.id
+                                  AND created_epoch >= :start AND created_epoch < :end
+                                ORDER BY created_epoch DESC, id DESC LIMIT 1)
+                   WHERE m.active = 1 AND m.schedule_minute IS NOT NULL
+                   ORDER BY m.schedule_minute'''
+
 def init_database():
-    """Initialize SQLite database"""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    # Medications table
-    c.execute('''CREATE TABLE IF NOT EXISTS medications
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  name TEXT NOT NULL,
-                  schedule_time TEXT NOT NULL,
-                  active INTEGER DEFAULT 1,
-                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-    
-    # Medication logs table
-    c.execute('''CREATE TABLE IF NOT EXISTS medication_logs
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  medication_id INTEGER,
-                  medication_name TEXT,
-                  scheduled_time TEXT,
-                  actual_time TEXT,
-                  status TEXT,
-                  temperature REAL,
-                  heart_rate INTEGER,
-                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                  FOREIGN KEY (medication_id) REFERENCES medications(id))''')
-    
-    # Vitals logs table
-    c.execute('''CREATE TABLE IF NOT EXISTS vitals_logs
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  temperature REAL,
-                  heart_rate INTEGER,
-                  status TEXT,
-                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-    
-    conn.commit()
-    conn.close()
+    """Initialize SQLite database
+    
+    Creates or upgrades the schema with the versioned migrations shared
+    with the Rust backend (backend/migrations, tracked in PRAGMA user_version).
+    """
+    conn = get_connection(DB_FILE)
+    for migration in medhealth_migrations.migrate(conn):
+        print(f"✓ Database migrated to schema version {migration.version} ({migration.name})")
+    if medhealth_migrations.current_version(conn) > medhealth_migrations.latest_version():
+        print("⚠ Database schema is newer than this device software; please update it")
+
+def local_time_text(epoch: Optional[float], fmt: str = "%H:%M:%S") -> str:
+    """Epoch seconds formatted in local time, '-' when missing"""
+    return time.strftime(fmt, time.localtime(epoch)) if epoch is not None else "-"
 
 def init_gpio():
     """Initialize GPIO pins and ensure all LEDs are OFF"""
     global pwm_buzzer
     
+    load_hardware()
     if GPIO is None:
         return
     
@@ -153,6 +273,7 @@ def init_gpio():
     # Button connected: One terminal to GPIO pin, other to GND
     # When pressed: GPIO reads LOW, when not pressed: GPIO reads HIGH (pull-up)
     GPIO.setup(BUTTON_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+    enable_button_interrupts()
     
     # Test button state on initialization
     button_state = GPIO.input(BUTTON_PIN)
@@ -172,7 +293,9 @@ def init_gpio():
 
 def init_sensors():
     """Initialize sensors"""
-    global heart_rate_sensor, temp_sensor
+    global heart_rate_sensor, ppg_fifo, ppg_pipeline, temp_sensor
+    
+    load_hardware()
     
     # Initialize DS18B20 temperature sensor
     try:
@@ -191,11 +314,19 @@ def init_sensors():
             i2c = busio.I2C(board.SCL, board.SDA)
             heart_rate_sensor = adafruit_max30102.MAX30102(i2c)
             print("✓ Heart rate sensor (MAX30102) initialized")
+            if medhealth_ppg:
+                # Take over the FIFO configuration for burst reads at 100 sps
+                ppg_fifo = medhealth_ppg.Max30102Fifo(i2c)
+                ppg_fifo.configure()
+                ppg_pipeline = medhealth_ppg.HeartRatePipeline()
+                sensor_sampler["heart_rate"].interval = PPG_DRAIN_INTERVAL
+                print("✓ PPG pipeline enabled (FIFO burst reads)")
         else:
             print("⚠ Heart rate sensor library not available")
     except Exception as e:
         print(f"⚠ Heart rate sensor error: {e}")
         heart_rate_sensor = None
+        ppg_fifo = ppg_pipeline = None
 
 def read_temperature() -> Optional[float]:
     """Read temperature from DS18B20 sensor"""
@@ -210,9 +341,39 @@ def read_temperature() -> Optional[float]:
         # Mock data for testing
         return round(36.5 + (time.time() % 10) * 0.1, 1)
 
+def drain_heart_rate() -> Optional[int]:
+    """Feed everything in the MAX30102 FIFO to the PPG pipeline; current BPM or None
+    
+    None also covers windows rejected for poor signal quality (motion,
+    low perfusion), so they never reach the health alerts. Must be called
+    at least every 0.32 s or the FIFO overflows; the sampler thread does
+    this at PPG_DRAIN_INTERVAL.
+    """
+    overflows = ppg_fifo.overflows
+    red, ir = ppg_fifo.read_samples()
+    if ppg_fifo.overflows != overflows:
+        # Samples were lost, so the window has a gap; start it again
+        ppg_pipeline.reset()
+    bpm = ppg_pipeline.feed(red, ir)
+    return int(round(bpm)) if bpm is not None else None
+
 def read_heart_rate() -> Optional[int]:
     """Read heart rate from MAX30102 sensor"""
-    if heart_rate_sensor:
+    if ppg_fifo:
+        try:
+            # Direct read: collect a fresh window until the pipeline has an estimate
+            ppg_pipeline.reset()
+            deadline = time.monotonic() + HR_MEASURE_TIMEOUT
+            while time.monotonic() < deadline:
+                bpm = drain_heart_rate()
+                if bpm is not None:
+                    return bpm
+                time.sleep(PPG_DRAIN_INTERVAL)
+            return None
+        except Exception as e:
+            print(f"Heart rate read error: {e}")
+            return None
+    elif heart_rate_sensor:
         try:
             # MAX30102 requires sampling over time
             samples = []
@@ -243,6 +404,44 @@ def read_heart_rate() -> Optional[int]:
         # Mock data for testing
         return int(70 + (time.time() % 20))
 
+# Sampler threads call the readers through lambdas so they pick up the
+# current module-level functions (sensors are initialised after import)
+sensor_sampler = SensorSampler([
+    SensorChannel("temperature", lambda: read_temperature(), TEMP_SAMPLE_INTERVAL),
+    SensorChannel("heart_rate", lambda: drain_heart_rate() if ppg_fifo else read_heart_rate(),
+                  HR_SAMPLE_INTERVAL),
+])
+
+# Thread liveness, evaluated on each scrape (the button worker and log
+# writer only run while there is work for them)
+THREAD_ALIVE.labels("alarm_monitor").set_function(
+    lambda: alarm_monitoring_thread is not None and alarm_monitoring_thread.is_alive())
+THREAD_ALIVE.labels("alarm_button").set_function(
+    lambda: alarm_button_thread is not None and alarm_button_thread.is_alive())
+for _channel in sensor_sampler.channels.values():
+    THREAD_ALIVE.labels(f"sampler_{_channel.name}").set_function(lambda channel=_channel: channel.running)
+LOG_QUEUE_PENDING.set_function(log_queue.pending)
+
+def latest_vitals(max_age: float = VITALS_MAX_AGE) -> Tuple[Optional[float], Optional[int]]:
+    """Latest temperature and heart rate from the sampler without touching the sensors
+    
+    Falls back to reading the sensors directly if the sampler is not running.
+    """
+    if not sensor_sampler.running:
+        return read_temperature(), read_heart_rate()
+    temp = sensor_sampler["temperature"].latest(max_age)
+    hr = sensor_sampler["heart_rate"].latest(max_age)
+    return (round(temp, 1) if temp is not None else None,
+            int(hr) if hr is not None else None)
+
+def sample_vital(name: str, max_age: float, timeout: float) -> Optional[float]:
+    """A sampled value no older than max_age, waiting up to timeout for a new one"""
+    channel = sensor_sampler[name]
+    value = channel.latest(max_age)
+    if value is None:
+        value = channel.wait_for_sample(timeout)
+    return value
+
 def buzzer_on():
     """Turn buzzer on - uses PWM if available, otherwise digital"""
     global pwm_buzzer
@@ -287,32 +486,34 @@ def led_off(pin):
             GPIO.setup(pin, GPIO.OUT, initial=GPIO.LOW)
             GPIO.output(pin, GPIO.LOW)
 
+def set_actuator_output(pin, on: bool):
+    """Actuator worker output hook: drive an LED or the buzzer"""
+    if pin == BUZZER_PIN:
+        buzzer_on() if on else buzzer_off()
+    else:
+        led_on(pin) if on else led_off(pin)
+
+# Single worker thread that owns the LEDs and buzzer for every alert
+actuators = ActuatorWorker(set_actuator_output, [BUZZER_PIN, LED_HEART_PIN, LED_TEMP_PIN, LED_BUTTON_PIN])
+
 def blink_led(pin, duration=1.0, blink_rate=0.5):
     """Blink LED for specified duration"""
     if GPIO:
-        end_time = time.time() + duration
-        while time.time() < end_time:
-            GPIO.output(pin, GPIO.HIGH)
-            time.sleep(blink_rate)
-            GPIO.output(pin, GPIO.LOW)
-            time.sleep(blink_rate)
+        key = f"blink:{pin}"
+        actuators.play(key, blink((pin,), blink_rate, blink_rate, PRIORITY_TEST), duration)
+        actuators.wait(key)
 
 def beep_buzzer(duration=0.5, frequency=0.01):
     """Beep buzzer for specified duration (beeping pattern)"""
     if GPIO:
-        end_time = time.time() + duration
-        while time.time() < end_time:
-            buzzer_on()
-            time.sleep(frequency)
-            buzzer_off()
-            time.sleep(frequency)
+        actuators.play("beep", blink((BUZZER_PIN,), frequency, frequency, PRIORITY_TEST), duration)
+        actuators.wait("beep")
 
 def continuous_beep(duration=2.0):
     """Continuous beep for specified duration (solid tone)"""
     if GPIO:
-        buzzer_on()
-        time.sleep(duration)
-        buzzer_off()
+        actuators.play("continuous_beep", solid((BUZZER_PIN,), PRIORITY_TEST), duration)
+        actuators.wait("continuous_beep")
 
 def button_pressed() -> bool:
     """Check if button is pressed (with immediate check)"""
@@ -325,11 +526,55 @@ def button_pressed() -> bool:
             return False
     return False
 
-def wait_for_button(timeout=5) -> bool:
-    """Wait for button press with timeout and improved debouncing"""
+def on_button_edge(channel):
+    """GPIO edge callback (runs in the RPi.GPIO thread): queue press/release events"""
+    try:
+        pressed = GPIO.input(BUTTON_PIN) == GPIO.LOW
+    except:
+        return
+    button_events.put((pressed, time.monotonic()))
+
+def enable_button_interrupts():
+    """Register edge detection on the button so waits block instead of polling"""
+    global button_interrupts
+    try:
+        GPIO.add_event_detect(BUTTON_PIN, GPIO.BOTH, callback=on_button_edge,
+                              bouncetime=BUTTON_BOUNCE_MS)
+        button_interrupts = True
+        print("✓ Button edge detection enabled")
+    except Exception as e:
+        button_interrupts = False
+        print(f"Note: Polling button (edge detection not available: {e})")
+
+def wait_for_button(timeout=5, since: Optional[float] = None) -> bool:
+    """Wait for button press with timeout
+    
+    Blocks on the edge-event queue; presses queued before `since` (a
+    time.monotonic() value, default: now) are discarded as stale.
+    """
     if GPIO is None:
         return False
-    
+    if not button_interrupts:
+        return poll_for_button(timeout)
+    
+    global last_button_press
+    since = time.monotonic() if since is None else since
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        try:
+            pressed, pressed_at = button_events.get(timeout=remaining)
+        except queue.Empty:
+            return False
+        if pressed and pressed_at >= since:
+            last_button_press = pressed_at
+            return True
+
+def poll_for_button(timeout=5) -> bool:
+    """Poll for a button press every 20 ms (fallback when edge detection is unavailable)"""
+    global last_button_press
     start_time = time.time()
     button_was_pressed = False
     press_start_time = None
@@ -351,6 +596,7 @@ def wait_for_button(timeout=5) -> bool:
                     # Wait for release to confirm
                     time.sleep(0.05)
                     if not button_pressed():
+                        last_button_press = time.monotonic()
                         return True
         else:
             # Button is not pressed - reset state
@@ -363,72 +609,86 @@ def wait_for_button(timeout=5) -> bool:
 
 def add_medication(name: str, schedule_time: str):
     """Add a new medication with confirmation"""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("INSERT INTO medications (name, schedule_time) VALUES (?, ?)",
-              (name, schedule_time))
-    conn.commit()
-    med_id = c.lastrowid
-    conn.close()
+    med = control("add", name=name, schedule_time=schedule_time)
     
     print("\n" + "=" * 70)
     print("✓ MEDICATION ADDED SUCCESSFULLY")
     print("=" * 70)
-    print(f"   ID: {med_id}")
-    print(f"   Name: {name}")
-    print(f"   Schedule Time: {schedule_time}")
+    print(f"   ID: {med['id']}")
+    print(f"   Name: {med['name']}")
+    print(f"   Schedule Time: {format_minute_of_day(med['schedule_minute'])}")
+    print("=" * 70)
+
+def import_medication_schedule(path: str) -> int:
+    """Validate a schedule file and add all its medications at once; returns how many
+    
+    As a daemon client the rows go over in IMPORT_CHUNK_ROWS requests on one
+    connection; the daemon holds them back until the last chunk and adds
+    them all in one transaction, so a failed import adds nothing.
+    """
+    try:
+        rows, issues = medhealth_import.parse_schedule_file(path)
+    except OSError as e:
+        print(f"❌ Cannot read {path}: {e}")
+        return 0
+    if issues:
+        print(f"\n❌ {len(issues)} problem(s) in {path}; nothing imported:")
+        for issue in issues[:IMPORT_ISSUES_SHOWN]:
+            print(f"   • Line {issue.line}: {issue.message}")
+        if len(issues) > IMPORT_ISSUES_SHOWN:
+            print(f"   … and {len(issues) - IMPORT_ISSUES_SHOWN} more")
+        return 0
+    
+    medications = [[row.name, format_minute_of_day(row.schedule_minute)] for row in rows]
+    if control_client is None:
+        added = control("add", medications=medications)  # One transaction
+    else:
+        # The daemon refuses oversized request lines: send chunks over the same connection
+        for start in range(0, len(medications), IMPORT_CHUNK_ROWS):
+            end = start + IMPORT_CHUNK_ROWS
+            added = control("add", medications=medications[start:end], more=end < len(medications), staged=start)
+    
+    print("\n" + "=" * 70)
+    print("✓ MEDICATION SCHEDULE IMPORTED")
     print("=" * 70)
+    print(f"   File: {path}")
+    print(f"   Medications Added: {len(added)}")
+    print("=" * 70)
+    return len(added)
+
+def print_medication_table(schedule):
+    """Active medications with today's status (rows from load_dashboard_data)"""
+    now = datetime.datetime.now()
+    current_date = now.strftime("%Y-%m-%d")
+    current_time = now.strftime("%H:%M")
+    current_minute = now.hour * 60 + now.minute
+    
+    print("\n" + "=" * 70)
+    print(" " * 20 + "📋 ACTIVE MEDICATIONS")
+    print("=" * 70)
+    print(f"\n📅 Date: {current_date}  |  🕐 Current Time: {current_time}")
+    print("─" * 70)
+    print(f"{'ID':<5} {'Medication Name':<25} {'Schedule Time':<15} {'Status':<20}")
+    print("─" * 70)
+    
+    for med_id, name, schedule_minute, status, actual_epoch, _ in schedule:
+        status_display = format_schedule_status(schedule_minute, status, actual_epoch, current_minute)
+        print(f"{med_id:<5} {name:<25} {format_minute_of_day(schedule_minute):<15} {status_display:<20}")
+    
+    print("─" * 70)
+    print(f"\nTotal Active Medications: {len(schedule)}")
 
 def view_medications():
     """View all active medications with better formatting"""
     try:
-        medications = get_active_medications()
+        schedule = control("medications")["schedule"]
         
-        if not medications:
+        if not schedule:
             print("\n📋 No active medications found.")
             input("\nPress Enter to continue...")
             return
         
-        current_date = datetime.datetime.now().strftime("%Y-%m-%d")
-        current_time = datetime.datetime.now().strftime("%H:%M")
-        
-        print("\n" + "=" * 70)
-        print(" " * 20 + "📋 ACTIVE MEDICATIONS")
-        print("=" * 70)
-        print(f"\n📅 Date: {current_date}  |  🕐 Current Time: {current_time}")
-        print("─" * 70)
-        print(f"{'ID':<5} {'Medication Name':<25} {'Schedule Time':<15} {'Status':<20}")
-        print("─" * 70)
-        
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        
-        for med_id, name, schedule_time in medications:
-            # Check if taken today
-            c.execute('''SELECT status, actual_time FROM medication_logs 
-                         WHERE medication_id = ? AND DATE(created_at) = ? 
-                         ORDER BY created_at DESC LIMIT 1''',
-                      (med_id, current_date))
-            result = c.fetchone()
-            
-            if result:
-                status, actual_time = result
-                if status == "taken":
-                    status_display = f"✓ Taken at {actual_time}"
-                else:
-                    status_display = "✗ Missed"
-            else:
-                # Check if time has passed
-                if schedule_time <= current_time:
-                    status_display = "⏰ Pending"
-                else:
-                    status_display = "⏳ Upcoming"
-            
-            print(f"{med_id:<5} {name:<25} {schedule_time:<15} {status_display:<20}")
-        
-        conn.close()
-        print("─" * 70)
-        print(f"\nTotal Active Medications: {len(medications)}")
+        print_medication_table(schedule)
         input("\nPress Enter to continue...")
     except Exception as e:
         print(f"\n❌ Error viewing medications: {e}")
@@ -436,45 +696,69 @@ def view_medications():
 
 def delete_medication(med_id: int):
     """Delete a medication with confirmation"""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
+    med = control("remove", id=med_id)
     
-    # Get medication info before deleting
-    c.execute("SELECT name, schedule_time FROM medications WHERE id = ?", (med_id,))
-    result = c.fetchone()
-    
-    if not result:
+    if not med:
         print(f"\n❌ Error: Medication ID {med_id} not found.")
-        conn.close()
         return
     
-    name, schedule_time = result
-    
-    # Delete medication
-    c.execute("UPDATE medications SET active = 0 WHERE id = ?", (med_id,))
-    conn.commit()
-    conn.close()
+    name, schedule_minute = med["name"], med["schedule_minute"]
     
     print("\n" + "=" * 70)
     print("🗑️  MEDICATION DELETED")
     print("=" * 70)
     print(f"   ID: {med_id}")
     print(f"   Name: {name}")
-    print(f"   Schedule Time: {schedule_time}")
+    print(f"   Schedule Time: {format_minute_of_day(schedule_minute) if schedule_minute is not None else '-'}")
     print("\n   This medication will no longer trigger alarms.")
     print("=" * 70)
 
-def measure_vitals_manual() -> Tuple[Optional[float], Optional[int]]:
-    """Manual vitals measurement with improved display"""
+def snapshot_vitals(wait: bool = False) -> dict:
+    """Current vitals (the control "vitals" command)
+    
+    wait=True is a manual measurement: it waits for fresh samples (up to
+    ~15 s for the heart rate) instead of returning the latest ones.
+    """
+    if not wait:
+        temp, hr = latest_vitals()
+    elif sensor_sampler.running:
+        temp = sample_vital("temperature", TEMP_SAMPLE_INTERVAL * 2, TEMP_SAMPLE_INTERVAL * 2)
+        temp = round(temp, 1) if temp is not None else None
+        # Valid heart-rate samples only exist while a finger is on the sensor,
+        # so a very recent one can be used; otherwise wait for the next
+        hr = sample_vital("heart_rate", HR_SAMPLE_INTERVAL * 2, 12)
+        hr = int(hr) if hr is not None else None
+    else:
+        time.sleep(1)  # Let the sensors settle
+        temp, hr = read_temperature(), read_heart_rate()
+    
+    # PPG details as plain floats (the pipeline's are numpy scalars)
+    reading = ppg_pipeline.reading if ppg_pipeline else None
+    return {
+        "temperature": temp,
+        "heart_rate": hr,
+        "spo2": float(reading.spo2) if reading and reading.spo2 is not None else None,
+        "perfusion_index": float(reading.perfusion_index) if reading else None,
+        "signal_quality": float(reading.quality) if reading else None,
+        "motion": bool(reading.motion) if reading else False,
+    }
+
+def measure_vitals_manual(via_control: bool = False) -> Tuple[Optional[float], Optional[int]]:
+    """Manual vitals measurement with improved display
+    
+    via_control measures through control() (on the daemon when the menu is
+    its client); the alarm flow always measures in-process.
+    """
     print("\n" + "=" * 70)
     print(" " * 20 + "📊 MANUAL VITALS MEASUREMENT")
     print("=" * 70)
-    print("\n⏳ Please wait while sensors initialize...")
-    time.sleep(1)
+    print("\n🌡️  Measuring Temperature and 💓 Heart Rate...")
+    print("   👆 Please place finger on heart rate sensor")
+    print("   ⏳ Measuring (this may take up to 15 seconds)...")
+    vitals = control("vitals", wait=True) if via_control else snapshot_vitals(wait=True)
+    temp, hr = vitals["temperature"], vitals["heart_rate"]
     
-    # Measure temperature
-    print("\n🌡️  Measuring Temperature...")
-    temp = read_temperature()
+    print()
     if temp:
         status = "✅ NORMAL" if TEMP_MIN <= temp <= TEMP_MAX else "⚠️  ABNORMAL"
         print(f"   Temperature: {temp}°C | Status: {status}")
@@ -482,36 +766,53 @@ def measure_vitals_manual() -> Tuple[Optional[float], Optional[int]]:
     else:
         print("   ❌ Error: Could not read temperature sensor")
     
-    # Measure heart rate
-    print("\n💓 Measuring Heart Rate...")
-    print("   👆 Please place finger on heart rate sensor")
-    print("   ⏳ Measuring (this may take up to 10 seconds)...")
-    
-    hr = read_heart_rate()
     if hr:
         status = "✅ NORMAL" if HR_MIN <= hr <= HR_MAX else "⚠️  ABNORMAL"
         print(f"   Heart Rate: {hr} bpm | Status: {status}")
         print(f"   Normal Range: {HR_MIN} - {HR_MAX} bpm")
+        if vitals["spo2"] is not None:
+            print(f"   SpO2: {vitals['spo2']:.0f}% | Perfusion: {vitals['perfusion_index']:.2f}% "
+                  f"| Signal quality: {vitals['signal_quality']:.0%}")
     else:
         print("   ❌ Error: Could not read heart rate sensor")
-        print("   💡 Tip: Ensure finger is properly placed on sensor")
+        if vitals["motion"]:
+            print("   💡 Tip: Movement detected - keep your hand still on the sensor")
+        else:
+            print("   💡 Tip: Ensure finger is properly placed on sensor")
     
     print("\n" + "=" * 70)
     
     return temp, hr
 
-def log_medication(medication_id: int, medication_name: str, scheduled_time: str,
-                  actual_time: str, status: str, temperature: Optional[float] = None,
+def log_medication(medication_id: int, medication_name: str, scheduled_at: float,
+                  actual_at: float, status: str, temperature: Optional[float] = None,
                   heart_rate: Optional[int] = None):
-    """Log medication intake with detailed information"""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''INSERT INTO medication_logs 
-                 (medication_id, medication_name, scheduled_time, actual_time, status, temperature, heart_rate)
-                 VALUES (?, ?, ?, ?, ?, ?, ?)''',
-              (medication_id, medication_name, scheduled_time, actual_time, status, temperature, heart_rate))
-    conn.commit()
-    conn.close()
+    """Log medication intake with detailed information
+    
+    scheduled_at/actual_at are epoch seconds. The row and its daily_adherence
+    update are queued as one group on the write-behind log queue and
+    committed together by its writer thread; created_at is stamped now, not
+    at commit time. The text time columns are kept for the backend API as
+    local datetimes; the device reads the *_epoch columns.
+    """
+    created_at = time.time()
+    trace = dose_tracer.finish(medication_id, scheduled_at, actual_at, created_at)
+    log_queue.submit_group(DB_FILE, [
+        ('''INSERT INTO medication_logs 
+           (medication_id, medication_name, scheduled_time, actual_time, status,
+            temperature, heart_rate, created_at,
+            scheduled_epoch, actual_epoch, created_epoch)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+         (medication_id, medication_name,
+          local_time_text(scheduled_at, "%Y-%m-%d %H:%M:%S"),
+          local_time_text(actual_at, "%Y-%m-%d %H:%M:%S"), status,
+          temperature, heart_rate, sqlite_timestamp(created_at),
+          int(scheduled_at), int(actual_at), int(created_at))),
+        *([trace.statement()] if trace else []),
+        medhealth_adherence.dose_statement(medication_id, scheduled_at, actual_at, status,
+                                           temperature is not None or heart_rate is not None),
+    ])
+    DOSES_LOGGED.labels(status).inc()
     
     status_emoji = "✓" if status == "taken" else "✗"
     
@@ -519,7 +820,7 @@ def log_medication(medication_id: int, medication_name: str, scheduled_time: str
     print(f" {status_emoji} MEDICATION LOGGED")
     print("=" * 70)
     print(f"   Medication: {medication_name}")
-    print(f"   Scheduled: {scheduled_time} | Actual: {actual_time}")
+    print(f"   Scheduled: {local_time_text(scheduled_at, '%H:%M')} | Actual: {local_time_text(actual_at)}")
     print(f"   Status: {status.upper()}")
     
     if temperature or heart_rate:
@@ -533,70 +834,116 @@ def log_medication(medication_id: int, medication_name: str, scheduled_time: str
     
     print("=" * 70)
 
-def view_history():
-    """View medication history with improved formatting"""
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute('''SELECT medication_name, scheduled_time, actual_time, status, 
-                     temperature, heart_rate, created_at
-                     FROM medication_logs 
-                     ORDER BY created_at DESC LIMIT 20''')
-        logs = c.fetchall()
-        conn.close()
+def describe_history_filter(filters: medhealth_history.HistoryFilter) -> str:
+    """One-line summary of the active history filters"""
+    parts = []
+    if filters.medication_id is not None:
+        parts.append(f"medication #{filters.medication_id}")
+    if filters.status is not None:
+        parts.append(filters.status)
+    if filters.since or filters.until:
+        parts.append(f"{filters.since or '…'} to {filters.until or '…'}")
+    if filters.with_vitals:
+        parts.append("with vitals")
+    return ", ".join(parts) or "all entries"
+
+def prompt_history_filter() -> medhealth_history.HistoryFilter:
+    """Ask for history filters; Enter skips each one"""
+    print("\n🔎 Filter history (press Enter to skip a filter)")
+    medication = input("   Medication ID: ").strip()
+    status = input("   Status (taken/missed): ").strip().lower()
+    since = input("   From date (YYYY-MM-DD): ").strip()
+    until = input("   To date (YYYY-MM-DD): ").strip()
+    with_vitals = input("   Only doses with vitals? (y/N): ").strip().lower() == "y"
+    filters = medhealth_history.HistoryFilter(int(medication) if medication else None,
+                                              status or None, since or None, until or None, with_vitals)
+    medhealth_history.where_clause(filters)  # Raises ValueError on a malformed date
+    return filters
+
+def print_history_entries(entries):
+    """History table (medhealth_history.HistoryEntry rows) with its column header"""
+    print(f"{'Medication':<20} {'Scheduled':<12} {'Actual':<12} {'Status':<10} {'Vitals':<25} {'Date/Time':<20}")
+    print("─" * 85)
+    
+    if not entries:
+        print("   No entries match these filters.")
+    for entry in entries:
+        status_emoji = "✓" if entry.status == "taken" else "✗"
+        status_display = f"{status_emoji} {entry.status.upper()}"
+        temp, hr = entry.temperature, entry.heart_rate
         
-        if not logs:
-            print("\n📈 No medication history found.")
-            input("\nPress Enter to continue...")
-            return
+        # Format vitals
+        vitals = ""
+        if temp and hr:
+            vitals = f"T:{temp}°C HR:{hr}bpm"
+        elif temp:
+            vitals = f"T:{temp}°C"
+        elif hr:
+            vitals = f"HR:{hr}bpm"
+        else:
+            vitals = "-"
         
-        print("\n" + "=" * 85)
-        print(" " * 20 + "📈 MEDICATION HISTORY")
-        print(" " * 12 + "(Last 20 Entries)")
-        print("=" * 85)
-        print(f"{'Medication':<20} {'Scheduled':<12} {'Actual':<12} {'Status':<10} {'Vitals':<25} {'Date/Time':<20}")
-        print("─" * 85)
+        sched_time = local_time_text(entry.scheduled_epoch, "%H:%M")
+        actual_time = local_time_text(entry.actual_epoch)
+        datetime_display = local_time_text(entry.created_epoch, "%Y-%m-%d %H:%M:%S")
         
-        for name, sched_time, actual_time, status, temp, hr, created_at in logs:
-            status_emoji = "✓" if status == "taken" else "✗"
-            status_display = f"{status_emoji} {status.upper()}"
+        print(f"{entry.medication_name:<20} {sched_time:<12} {actual_time:<12} {status_display:<10} {vitals:<25} {datetime_display:<20}")
+        print("─" * 85)
+
+def print_adherence_stats(stats, days: int):
+    """Totals from medhealth_adherence.summary() under a history page"""
+    print(f"\n📊 Statistics (last {days} days):")
+    print(f"   • Doses Logged: {stats.scheduled}")
+    print(f"   • Taken: {stats.taken} | Missed: {stats.missed}"
+          + (f" | Adherence: {stats.taken / stats.scheduled:.0%}" if stats.scheduled else ""))
+    if stats.mean_delay is not None:
+        print(f"   • Mean Delay: {stats.mean_delay / 60:.1f} min")
+    print(f"   • With Vital Signs: {stats.with_vitals}")
+    print("=" * 85)
+
+def view_history():
+    """Browse medication history page by page, newest first, with filters"""
+    control("flush")  # Include doses logged a moment ago
+    try:
+        conn = get_connection(DB_FILE)
+        filters = medhealth_history.HistoryFilter()
+        cursors = [None]  # Start cursor of each page visited; the last is the current page
+        while True:
+            with HISTORY_PAGE_QUERY.time():
+                page = medhealth_history.page(conn, filters, cursors[-1], HISTORY_PAGE_SIZE)
             
-            # Format vitals
-            vitals = ""
-            if temp and hr:
-                vitals = f"T:{temp}°C HR:{hr}bpm"
-            elif temp:
-                vitals = f"T:{temp}°C"
-            elif hr:
-                vitals = f"HR:{hr}bpm"
-            else:
-                vitals = "-"
+            if not page.entries and len(cursors) == 1 and filters == medhealth_history.HistoryFilter():
+                print("\n📈 No medication history found.")
+                input("\nPress Enter to continue...")
+                return
             
-            # Format date/time
-            try:
-                dt = datetime.datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-                date_str = dt.strftime("%Y-%m-%d")
-                time_str = dt.strftime("%H:%M:%S")
-                datetime_display = f"{date_str} {time_str}"
-            except:
-                datetime_display = str(created_at)[:19] if created_at else "-"
+            print("\n" + "=" * 85)
+            print(" " * 20 + "📈 MEDICATION HISTORY")
+            print(" " * 12 + f"(Page {len(cursors)}, {describe_history_filter(filters)})")
+            print("=" * 85)
+            print_history_entries(page.entries)
+            print("=" * 85)
             
-            print(f"{name:<20} {sched_time:<12} {actual_time:<12} {status_display:<10} {vitals:<25} {datetime_display:<20}")
-            print("─" * 85)
-        
-        print("=" * 85)
-        
-        # Statistics
-        taken_count = sum(1 for _, _, _, status, _, _, _ in logs if status == "taken")
-        missed_count = sum(1 for _, _, _, status, _, _, _ in logs if status == "missed")
-        with_vitals = sum(1 for _, _, _, _, temp, hr, _ in logs if temp or hr)
-        
-        print(f"\n📊 Statistics:")
-        print(f"   • Total Entries: {len(logs)}")
-        print(f"   • Taken: {taken_count} | Missed: {missed_count}")
-        print(f"   • With Vital Signs: {with_vitals}")
-        print("=" * 85)
-        input("\nPress Enter to continue...")
+            # Statistics from the daily adherence rollup (all logs, not just the rows shown)
+            with HISTORY_SUMMARY_QUERY.time():
+                stats = medhealth_adherence.summary(conn, HISTORY_SUMMARY_DAYS, filters.medication_id)
+            
+            print_adherence_stats(stats, HISTORY_SUMMARY_DAYS)
+            
+            choices = (["[N]ext"] if page.next_cursor else []) + (["[P]revious"] if len(cursors) > 1 else [])
+            choice = input(f"\n{'  '.join(choices + ['[F]ilter', '[Q]uit'])}: ").strip().lower()
+            if choice == "n" and page.next_cursor:
+                cursors.append(page.next_cursor)
+            elif choice == "p" and len(cursors) > 1:
+                cursors.pop()
+            elif choice == "f":
+                try:
+                    filters = prompt_history_filter()
+                    cursors = [None]
+                except ValueError as e:
+                    print(f"❌ Invalid filter: {e}")
+            elif choice == "q":
+                return
     except Exception as e:
         print(f"\n❌ Error viewing history: {e}")
         import traceback
@@ -619,14 +966,10 @@ def test_alarm():
     print("\n🔔 TESTING NOW...")
     
     # Blink all LEDs and sound buzzer
-    thread = threading.Thread(target=lambda: (
-        blink_led(LED_HEART_PIN, 3, 0.2),
-        blink_led(LED_TEMP_PIN, 3, 0.2),
-        blink_led(LED_BUTTON_PIN, 3, 0.2),
-        beep_buzzer(3, 0.1)
-    ))
-    thread.start()
-    thread.join()
+    blink_led(LED_HEART_PIN, 3, 0.2)
+    blink_led(LED_TEMP_PIN, 3, 0.2)
+    blink_led(LED_BUTTON_PIN, 3, 0.2)
+    beep_buzzer(3, 0.1)
     
     print("\n✓ Alarm test complete!")
     print("   If you saw LEDs blink and heard buzzer, all components are working.")
@@ -669,8 +1012,16 @@ def test_button():
     print("   (Press Ctrl+C to exit)")
     try:
         while True:
-            # Check if button is pressed (LOW = pressed, HIGH = not pressed)
-            current_state = button_pressed()
+            if button_interrupts:
+                # Block until the next press/release edge
+                try:
+                    current_state, _ = button_events.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+            else:
+                # Check if button is pressed (LOW = pressed, HIGH = not pressed)
+                current_state = button_pressed()
+                time.sleep(0.02)  # Check every 20ms for better responsiveness
             
             if current_state != last_state:
                 current_time = time.time()
@@ -691,8 +1042,6 @@ def test_button():
                     buzzer_off()
                 last_state = current_state
             
-            time.sleep(0.02)  # Check every 20ms for better responsiveness
-            
     except KeyboardInterrupt:
         pass
     finally:
@@ -706,41 +1055,52 @@ def test_button():
         input("\nPress Enter to continue...")
 
 def get_active_medications():
-    """Get all active medications sorted by schedule time"""
-    conn = sqlite3.connect(DB_FILE)
+    """Get all active medications sorted by schedule time (served from schedule_cache)"""
+    return schedule_cache.medications(DB_FILE)
+
+def load_dashboard_data(now: Optional[datetime.datetime] = None):
+    """Load today's schedule status and upcoming doses in a single query
+    
+    Returns (schedule, upcoming):
+      schedule - [(id, name, schedule_minute, last_status, last_actual_epoch, taken_today)]
+                 for every active medication, ordered by schedule time; last_status
+                 and last_actual_epoch are None when nothing was logged today
+      upcoming - [(id, name, schedule_minute)] for the next (up to 5) doses due later
+                 today that have not been taken yet
+    """
+    now = now or datetime.datetime.now()
+    current_minute = now.hour * 60 + now.minute
+    today_range = local_day_bounds(now.timestamp())
+    
+    log_queue.flush(LOG_READ_FLUSH_TIMEOUT)  # Include doses logged a moment ago
+    conn = get_connection(DB_FILE)
     c = conn.cursor()
-    c.execute('''SELECT id, name, schedule_time FROM medications 
-                 WHERE active = 1 ORDER BY schedule_time''')
-    medications = c.fetchall()
-    conn.close()
-    return medications
+    started = time.perf_counter()
+    c.execute(DASHBOARD_SQL, {"start": today_range[0], "end": today_range[1]})
+    schedule = c.fetchall()
+    DASHBOARD_QUERY.observe(time.perf_counter() - started)
+    
+    upcoming = [(med_id, name, schedule_minute)
+                for med_id, name, schedule_minute, _, _, taken_today in schedule
+                if schedule_minute >= current_minute and not taken_today][:5]
+    return schedule, upcoming
+
+def format_schedule_status(schedule_minute: int, status: Optional[str],
+                           actual_epoch: Optional[int], current_minute: int) -> str:
+    """Status column text for a schedule row (minutes after midnight)"""
+    if status == "taken":
+        return f"✓ Taken at {local_time_text(actual_epoch)}"
+    if status:
+        return "✗ Missed"
+    # Nothing logged today - check if time has passed
+    if schedule_minute <= current_minute:
+        return "⏰ Pending"
+    return "⏳ Upcoming"
 
 def get_upcoming_medications():
     """Get upcoming medications for today"""
-    current_time = datetime.datetime.now().strftime("%H:%M")
-    current_date = datetime.datetime.now().strftime("%Y-%m-%d")
-    
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    # Get all active medications scheduled after current time
-    c.execute('''SELECT id, name, schedule_time FROM medications 
-                 WHERE active = 1 AND schedule_time >= ? 
-                 ORDER BY schedule_time LIMIT 5''', (current_time,))
-    upcoming = c.fetchall()
-    
-    # Filter out already taken today
-    filtered = []
-    for med_id, name, schedule_time in upcoming:
-        c.execute('''SELECT COUNT(*) FROM medication_logs 
-                     WHERE medication_id = ? AND DATE(created_at) = ? AND status = 'taken' ''',
-                  (med_id, current_date))
-        already_taken = c.fetchone()[0] > 0
-        if not already_taken:
-            filtered.append((med_id, name, schedule_time))
-    
-    conn.close()
-    return filtered
+    _, upcoming = load_dashboard_data()
+    return upcoming
 
 def display_monitoring_dashboard():
     """Display organized monitoring dashboard"""
@@ -749,9 +1109,10 @@ def display_monitoring_dashboard():
     except:
         pass  # If screen clear fails, just continue
     
-    current_time = datetime.datetime.now().strftime("%H:%M:%S")
-    current_date = datetime.datetime.now().strftime("%Y-%m-%d")
-    current_time_short = datetime.datetime.now().strftime("%H:%M")
+    now = datetime.datetime.now()
+    current_time = now.strftime("%H:%M:%S")
+    current_date = now.strftime("%Y-%m-%d")
+    current_minute = now.hour * 60 + now.minute
     
     print("\n" + "=" * 70)
     print(" " * 15 + "💊 MEDHEALTH MONITORING DASHBOARD")
@@ -762,400 +1123,292 @@ def display_monitoring_dashboard():
     print("-" * 70)
     
     # Active medication schedule
-    medications = get_active_medications()
-    if medications:
+    schedule, upcoming = load_dashboard_data()
+    if schedule:
         print("\n📋 ACTIVE MEDICATION SCHEDULE")
         print("─" * 70)
         print(f"{'Medication':<25} {'Schedule Time':<15} {'Status':<20}")
         print("─" * 70)
         
-        for med_id, name, schedule_time in medications:
-            # Check if taken today
-            conn = sqlite3.connect(DB_FILE)
-            c = conn.cursor()
-            c.execute('''SELECT status, actual_time FROM medication_logs 
-                         WHERE medication_id = ? AND DATE(created_at) = ? 
-                         ORDER BY created_at DESC LIMIT 1''',
-                      (med_id, current_date))
-            result = c.fetchone()
-            conn.close()
-            
-            if result:
-                status, actual_time = result
-                if status == "taken":
-                    status_display = f"✓ Taken at {actual_time}"
-                else:
-                    status_display = "✗ Missed"
-            else:
-                # Check if time has passed
-                if schedule_time <= current_time_short:
-                    status_display = "⏰ Pending"
-                else:
-                    status_display = "⏳ Upcoming"
-            
-            print(f"{name:<25} {schedule_time:<15} {status_display:<20}")
+        for med_id, name, schedule_minute, status, actual_epoch, _ in schedule:
+            status_display = format_schedule_status(schedule_minute, status, actual_epoch, current_minute)
+            print(f"{name:<25} {format_minute_of_day(schedule_minute):<15} {status_display:<20}")
         print("─" * 70)
     else:
         print("\n📋 No active medications scheduled")
     
     # Upcoming medications (next 3)
-    upcoming = get_upcoming_medications()
     if upcoming:
         print("\n⏰ NEXT UPCOMING MEDICATIONS")
         print("─" * 70)
-        for i, (med_id, name, schedule_time) in enumerate(upcoming[:3], 1):
+        seconds_now = now.hour * 3600 + now.minute * 60 + now.second
+        for i, (med_id, name, schedule_minute) in enumerate(upcoming[:3], 1):
             # Calculate time until
-            now = datetime.datetime.now()
-            scheduled = datetime.datetime.strptime(f"{current_date} {schedule_time}", "%Y-%m-%d %H:%M")
-            time_diff = scheduled - now
-            if time_diff.total_seconds() > 0:
-                hours = int(time_diff.total_seconds() // 3600)
-                minutes = int((time_diff.total_seconds() % 3600) // 60)
+            seconds_until = schedule_minute * 60 - seconds_now
+            if seconds_until > 0:
+                hours = seconds_until // 3600
+                minutes = (seconds_until % 3600) // 60
                 if hours > 0:
                     time_until = f"{hours}h {minutes}m"
                 else:
                     time_until = f"{minutes}m"
-                print(f"  {i}. {name} at {schedule_time} (in {time_until})")
+                print(f"  {i}. {name} at {format_minute_of_day(schedule_minute)} (in {time_until})")
         print("─" * 70)
     
     print("\n" + "=" * 70)
 
 def check_health_monitoring():
-    """Check health parameters and trigger alarms if abnormal"""
-    global alarm_active
+    """Check health parameters and trigger alarms if abnormal
     
+    Alerts go to the actuator worker; a reading that stays abnormal extends
+    the running pattern instead of starting another one.
+    """
     if not monitoring_active:
         return
     
-    temp = read_temperature()
-    hr = read_heart_rate()
+    temp, hr = latest_vitals()
     
     # Check temperature
     temp_alert = False
     if temp:
         if temp < TEMP_MIN or temp > TEMP_MAX:
-            if not alarm_active:
-                alarm_active = True
-                temp_alert = True
-                print(f"\n" + "!" * 70)
-                print(f"⚠️  ALERT: Abnormal Temperature: {temp}°C (Normal: {TEMP_MIN}°C - {TEMP_MAX}°C)")
-                print("!" * 70)
-                # Blink temp LED and sound buzzer
-                threading.Thread(target=lambda: (
-                    blink_led(LED_TEMP_PIN, 5, 0.3),
-                    beep_buzzer(5, 0.1)
-                ), daemon=True).start()
-            alarm_active = False
+            temp_alert = True
+            print(f"\n" + "!" * 70)
+            print(f"⚠️  ALERT: Abnormal Temperature: {temp}°C (Normal: {TEMP_MIN}°C - {TEMP_MAX}°C)")
+            print("!" * 70)
+            # Blink temp LED and sound buzzer
+            actuators.extend("temp_alert", TEMP_ALERT_PATTERN)
     
     # Check heart rate
     hr_alert = False
     if hr:
         if hr < HR_MIN or hr > HR_MAX:
-            if not alarm_active:
-                alarm_active = True
-                hr_alert = True
-                print(f"\n" + "!" * 70)
-                print(f"⚠️  ALERT: Abnormal Heart Rate: {hr} bpm (Normal: {HR_MIN} - {HR_MAX} bpm)")
-                print("!" * 70)
-                # Blink heart LED and sound buzzer
-                threading.Thread(target=lambda: (
-                    blink_led(LED_HEART_PIN, 5, 0.3),
-                    beep_buzzer(5, 0.1)
-                ), daemon=True).start()
-            alarm_active = False
-    
-    # Normal readings display
-    if temp and hr:
+            hr_alert = True
+            print(f"\n" + "!" * 70)
+            print(f"⚠️  ALERT: Abnormal Heart Rate: {hr} bpm (Normal: {HR_MIN} - {HR_MAX} bpm)")
+            print("!" * 70)
+            # Blink heart LED and sound buzzer
+            actuators.extend("hr_alert", HR_ALERT_PATTERN)
+    
+    if temp is not None or hr is not None:
+        vitals_writer.record(DB_FILE, temp, hr, "abnormal" if temp_alert or hr_alert else "normal")
+    
+    # Live readings line (not in the daemon's journal)
+    if temp and hr and sys.stdout.isatty():
         status = "✅ NORMAL"
         if temp_alert or hr_alert:
             status = "⚠️  ALERT"
         print(f"\r📊 Vital Signs: Temp={temp}°C | HR={hr} bpm | Status: {status}", end='', flush=True)
 
+def schedule_medication(med_id: int, name: str, schedule_minute: int,
+                        after: Optional[float] = None, grace: float = ALARM_GRACE_SECONDS):
+    """Queue the next daily occurrence of a medication in the dose scheduler"""
+    due_at = next_daily_occurrence(schedule_minute, after if after is not None else time.time(), grace)
+    dose_scheduler.schedule(med_id, due_at, (name, schedule_minute))
+
+def sync_dose_schedule():
+    """Bring the dose scheduler in line with the active medications table"""
+    active_ids = set()
+    for med_id, name, schedule_minute in get_active_medications():
+        active_ids.add(med_id)
+        current = dose_scheduler.get(med_id)
+        # Keep unchanged entries so a dose that already fired is not re-armed
+        if current is None or current[1] != (name, schedule_minute):
+            schedule_medication(med_id, name, schedule_minute)
+    for med_id in dose_scheduler.keys():
+        if med_id not in active_ids:
+            dose_scheduler.remove(med_id)
+
+def medication_taken_today(med_id: int) -> bool:
+    """True if a 'taken' log exists for med_id today"""
+    log_queue.flush(LOG_READ_FLUSH_TIMEOUT)
+    conn = get_connection(DB_FILE)
+    c = conn.cursor()
+    started = time.perf_counter()
+    c.execute(TAKEN_TODAY_SQL, (med_id, *local_day_bounds(time.time())))
+    taken = c.fetchone()[0] > 0
+    TAKEN_TODAY_QUERY.observe(time.perf_counter() - started)
+    return taken
+
+def announce_ringing_doses(alarms):
+    """Print the reminder banner for doses that just started ringing"""
+    now = datetime.datetime.now()
+    print("\n" + "🔔" * 35)
+    print(f"⚠️  MEDICATION REMINDER")
+    for alarm in alarms:
+        print(f"💊 {alarm.name}  |  ⏰ Scheduled Time: {format_minute_of_day(alarm.schedule_minute)}")
+    print(f"🕐 Current Time: {now.strftime('%H:%M:%S')}")
+    print(f"📅 {now.strftime('%Y-%m-%d')}")
+    print("🔔" * 35)
+    print("\n👉 Press button to confirm medication intake (one press confirms all ringing doses)...")
+    print(f"⏳ Waiting up to {ALARM_RING_SECONDS} seconds...")
+    print("🔊 ALARM ACTIVATED - Buzzer should be beeping now!")
+
+def sound_medication_alarm():
+    """Start the alarm buzzer/LED pattern unless it is already playing"""
+    global alarm_active
+    alarm_active = True
+    if not actuators.is_playing("medication_alarm"):
+        actuators.play("medication_alarm", MEDICATION_ALARM_PATTERN)
+        print("✓ Alarm pattern started - Buzzer and LED should be active")
+
+def silence_medication_alarm():
+    """Stop the alarm buzzer/LED once no dose is ringing any more"""
+    global alarm_active
+    if not dose_alarms.is_ringing():
+        alarm_active = False
+        actuators.stop("medication_alarm")
+
+def log_missed_doses(alarms):
+    """Log expired alarms as missed"""
+    for alarm in alarms:
+        print("\n" + "✗" * 35)
+        print(f"✗ Medication '{alarm.name}' was not confirmed")
+        print(f"   Scheduled: {format_minute_of_day(alarm.schedule_minute)} | Status: MISSED")
+        print("✗" * 35)
+        
+        log_medication(alarm.med_id, alarm.name, alarm.due_at, alarm.resolved_at, "missed")
+
+def confirm_ringing_doses() -> int:
+    """Confirm every ringing dose as one group, then offer vitals and log them
+    
+    Called from the button worker; returns the number of doses confirmed.
+    """
+    global last_button_press
+    confirmed = dose_alarms.confirm_ringing()
+    if not confirmed:
+        return 0
+    silence_medication_alarm()
+    
+    print(f"\n✓ {len(confirmed)} medication(s) confirmed! Processing...")
+    
+    # Continuous beep and Blue LED on for 2 seconds (indicates medicine taken)
+    print("🔵 Blue LED ON + Continuous beep for 2 seconds...")
+    actuators.play("confirmation", CONFIRMATION_PATTERN)
+    if last_button_press is not None:
+        since_press = time.monotonic() - last_button_press
+        BUTTON_RESPONSE.observe(since_press)
+        for alarm in confirmed:
+            dose_tracer.mark(alarm.med_id, alarm.due_at, "pressed_at", time.time() - since_press)
+        last_button_press = None
+    actuators.wait("confirmation")
+    
+    # Ask about vitals
+    print("\n" + "─" * 70)
+    print("📊 OPTIONAL: Measure vital signs now?")
+    print("   Press button within 5 seconds to measure temperature & heart rate")
+    print("   Or wait 5 seconds to skip vitals measurement")
+    print("─" * 70)
+    measure_vitals = wait_for_button(5)
+    
+    temp = None
+    hr = None
+    if measure_vitals:
+        print("\n📊 Measuring vital signs...")
+        temp, hr = measure_vitals_manual()
+    else:
+        print("\n⏭️  Skipping vital signs measurement")
+    
+    # Log every dose in the group with the same confirmation time and vitals
+    for alarm in confirmed:
+        log_medication(alarm.med_id, alarm.name, alarm.due_at, alarm.resolved_at, "taken", temp, hr)
+    
+    print("\n✓ Medication intake logged successfully!")
+    print("─" * 70)
+    return len(confirmed)
+
+def alarm_button_worker():
+    """Wait for button presses while any dose is ringing (runs off the scheduling loop)"""
+    since = time.monotonic()
+    while alarm_monitoring_active and system_running and dose_alarms.is_ringing():
+        # Short waits so the worker exits soon after the last alarm resolves;
+        # `since` keeps presses that land between two waits
+        if wait_for_button(1, since=since):
+            confirm_ringing_doses()
+            since = time.monotonic()
+
+def start_alarm_button_worker():
+    """Start the button worker unless it is already running"""
+    global alarm_button_thread
+    if GPIO is None:
+        return  # No button in mock mode; ringing doses expire as missed
+    if alarm_button_thread is None or not alarm_button_thread.is_alive():
+        alarm_button_thread = threading.Thread(target=alarm_button_worker, daemon=True)
+        alarm_button_thread.start()
+
 def medication_alarm_monitoring():
-    """Independent medication alarm monitoring - runs continuously"""
-    global alarm_active, alarm_monitoring_active
+    """Independent medication alarm monitoring - runs continuously
+    
+    Sleeps in the dose scheduler until the next medication is due, a ringing
+    dose times out or the schedule changes. Due doses go through the
+    dose_alarms state machine, so any number can ring at once and the loop
+    never blocks on the button or on vitals measurement.
+    """
+    global alarm_monitoring_active
+    
+    sync_dose_schedule()
+    last_sync = time.monotonic()
     
     while alarm_monitoring_active and system_running:
+        ALARM_LOOP_HEARTBEAT.set(time.time())
         try:
-            now = datetime.datetime.now()
-            current_time = now.strftime("%H:%M")
-            current_time_full = now.strftime("%H:%M:%S")
-            current_date = now.strftime("%Y-%m-%d")
+            timeout = SCHEDULE_RESYNC_SECONDS
+            deadline = dose_alarms.next_deadline()
+            if deadline is not None:
+                timeout = max(0.0, min(timeout, deadline - time.time()))
+            due = dose_scheduler.wait_for_due(timeout=timeout)
+            woke_at = time.time()
             
-            conn = sqlite3.connect(DB_FILE)
-            c = conn.cursor()
+            # Re-arm every due medication for tomorrow, then queue today's alarm
+            for event in due:
+                name, schedule_minute = event.payload
+                schedule_medication(event.key, name, schedule_minute, after=event.due_at + 1, grace=0)
+                if not medication_taken_today(event.key):
+                    if dose_alarms.add(event.key, name, schedule_minute, event.due_at):
+                        dose_tracer.start(event.key, event.due_at, woke_at)
             
-            # Get ALL active medications (not just exact match)
-            c.execute('''SELECT id, name, schedule_time FROM medications 
-                         WHERE active = 1''')
-            all_medications = c.fetchall()
+            started = dose_alarms.start_ringing()
+            if started:
+                sound_medication_alarm()
+                buzzer_on_at = time.time()
+                for alarm in started:
+                    ALARM_LATENESS.observe(max(0.0, buzzer_on_at - alarm.due_at))
+                    dose_tracer.mark(alarm.med_id, alarm.due_at, "buzzer_on_at", buzzer_on_at)
+                announce_ringing_doses(started)
+                start_alarm_button_worker()
             
-            # Check each medication to see if it's time
-            for med_id, name, schedule_time in all_medications:
-                # Parse scheduled time
-                try:
-                    scheduled_hour, scheduled_min = map(int, schedule_time.split(':'))
-                    scheduled_datetime = now.replace(hour=scheduled_hour, minute=scheduled_min, second=0, microsecond=0)
-                    
-                    # Calculate time difference
-                    time_diff = abs((now - scheduled_datetime).total_seconds())
-                    
-                    # Trigger alarm if within 30 seconds of scheduled time (before or after)
-                    # This ensures we catch the alarm even if check happens slightly before/after
-                    if time_diff <= 30:  # Within 30 seconds window
-                        # Check if already logged today
-                        c.execute('''SELECT COUNT(*) FROM medication_logs 
-                                     WHERE medication_id = ? AND DATE(created_at) = ? AND status = 'taken' ''',
-                                  (med_id, current_date))
-                        already_logged = c.fetchone()[0] > 0
-                        
-                        if not already_logged:
-                            # Display alert banner
-                            print("\n" + "🔔" * 35)
-                            print(f"⚠️  MEDICATION REMINDER")
-                            print(f"💊 {name}")
-                            print(f"⏰ Scheduled Time: {schedule_time}")
-                            print(f"🕐 Current Time: {current_time_full}")
-                            print(f"📅 {current_date}")
-                            print("🔔" * 35)
-                            print("\n👉 Press button to confirm medication intake...")
-                            print("⏳ Waiting up to 60 seconds...")
-                            print("🔊 ALARM ACTIVATED - Buzzer should be beeping now!")
-                            
-                            # Trigger alarm
-                            alarm_active = True
-                            
-                            # Blink button LED and sound buzzer
-                            alarm_thread = threading.Thread(target=medication_alarm, args=(60,), daemon=True)
-                            alarm_thread.start()
-                            print("✓ Alarm thread started - Buzzer and LED should be active")
-                            
-                            # Wait for button press (up to 60 seconds)
-                            button_pressed_flag = wait_for_button(60)
-                    
-                            if button_pressed_flag:
-                                # Stop alarm
-                                alarm_active = False
-                                buzzer_off()
-                                led_off(LED_BUTTON_PIN)
-                                
-                                # Confirm medication taken
-                                actual_time = datetime.datetime.now().strftime("%H:%M:%S")
-                                
-                                print("\n✓ Medication confirmed! Processing...")
-                                
-                                # Continuous beep and Blue LED on for 2 seconds (indicates medicine taken)
-                                print("🔵 Blue LED ON + Continuous beep for 2 seconds...")
-                                led_on(LED_BUTTON_PIN)  # Blue LED near button
-                                continuous_beep(2.0)  # Continuous beep for 2 seconds
-                                led_off(LED_BUTTON_PIN)
-                                
-                                # Ask about vitals
-                                print("\n" + "─" * 70)
-                                print("📊 OPTIONAL: Measure vital signs now?")
-                                print("   Press button within 5 seconds to measure temperature & heart rate")
-                                print("   Or wait 5 seconds to skip vitals measurement")
-                                print("─" * 70)
-                                measure_vitals = wait_for_button(5)
-                                
-                                temp = None
-                                hr = None
-                                if measure_vitals:
-                                    print("\n📊 Measuring vital signs...")
-                                    temp, hr = measure_vitals_manual()
-                                else:
-                                    print("\n⏭️  Skipping vital signs measurement")
-                                
-                                # Log medication
-                                log_medication(med_id, name, schedule_time, actual_time, "taken", temp, hr)
-                                
-                                print("\n✓ Medication intake logged successfully!")
-                                print("─" * 70)
-                            else:
-                                # Medication missed
-                                alarm_active = False
-                                buzzer_off()
-                                led_off(LED_BUTTON_PIN)
-                                actual_time = datetime.datetime.now().strftime("%H:%M:%S")
-                                
-                                print("\n" + "✗" * 35)
-                                print(f"✗ Medication '{name}' was not confirmed")
-                                print(f"   Scheduled: {schedule_time} | Status: MISSED")
-                                print("✗" * 35)
-                                
-                                log_medication(med_id, name, schedule_time, actual_time, "missed")
-                            
-                            # Break out of loop after handling one medication alarm
-                            # This prevents multiple alarms from triggering simultaneously
-                            break
-                except (ValueError, AttributeError) as e:
-                    # Skip medications with invalid time format
-                    continue
+            missed = dose_alarms.expire()
+            if missed:
+                silence_medication_alarm()
+                log_missed_doses(missed)
             
-            conn.close()
-            time.sleep(5)  # Check every 5 seconds for better accuracy
+            # Pick up changes made outside this process (e.g. the web backend)
+            if time.monotonic() - last_sync >= SCHEDULE_RESYNC_SECONDS:
+                sync_dose_schedule()
+                last_sync = time.monotonic()
             
         except Exception as e:
             print(f"Error in medication alarm monitoring: {e}")
             time.sleep(5)
 
-def medication_monitoring():
-    """Monitor medication schedule - DEPRECATED: Now handled by medication_alarm_monitoring"""
-    # This function is kept for compatibility but medication alarms now run independently
-    pass
-    
-    while monitoring_active and system_running:
-        try:
-            now = datetime.datetime.now()
-            current_time = now.strftime("%H:%M")
-            current_time_full = now.strftime("%H:%M:%S")
-            current_date = now.strftime("%Y-%m-%d")
-            
-            conn = sqlite3.connect(DB_FILE)
-            c = conn.cursor()
-            
-            # Get ALL active medications (not just exact match)
-            c.execute('''SELECT id, name, schedule_time FROM medications 
-                         WHERE active = 1''')
-            all_medications = c.fetchall()
-            
-            # Check each medication to see if it's time
-            for med_id, name, schedule_time in all_medications:
-                # Parse scheduled time
-                try:
-                    scheduled_hour, scheduled_min = map(int, schedule_time.split(':'))
-                    scheduled_datetime = now.replace(hour=scheduled_hour, minute=scheduled_min, second=0, microsecond=0)
-                    
-                    # Calculate time difference
-                    time_diff = abs((now - scheduled_datetime).total_seconds())
-                    
-                    # Trigger alarm if within 30 seconds of scheduled time (before or after)
-                    # This ensures we catch the alarm even if check happens slightly before/after
-                    if time_diff <= 30:  # Within 30 seconds window
-                        # Check if already logged today
-                        c.execute('''SELECT COUNT(*) FROM medication_logs 
-                                     WHERE medication_id = ? AND DATE(created_at) = ? AND status = 'taken' ''',
-                                  (med_id, current_date))
-                        already_logged = c.fetchone()[0] > 0
-                        
-                        if not already_logged:
-                            # Display alert banner
-                            print("\n" + "🔔" * 35)
-                            print(f"⚠️  MEDICATION REMINDER")
-                            print(f"💊 {name}")
-                            print(f"⏰ Scheduled Time: {schedule_time}")
-                            print(f"🕐 Current Time: {current_time_full}")
-                            print(f"📅 {current_date}")
-                            print("🔔" * 35)
-                            print("\n👉 Press button to confirm medication intake...")
-                            print("⏳ Waiting up to 60 seconds...")
-                            print("🔊 ALARM ACTIVATED - Buzzer should be beeping now!")
-                            
-                            # Trigger alarm
-                            alarm_active = True
-                            
-                            # Blink button LED and sound buzzer
-                            alarm_thread = threading.Thread(target=medication_alarm, args=(60,), daemon=True)
-                            alarm_thread.start()
-                            print("✓ Alarm thread started - Buzzer and LED should be active")
-                            
-                            # Wait for button press (up to 60 seconds)
-                            button_pressed_flag = wait_for_button(60)
-                    
-                            if button_pressed_flag:
-                                # Stop alarm
-                                alarm_active = False
-                                buzzer_off()
-                                led_off(LED_BUTTON_PIN)
-                                
-                                # Confirm medication taken
-                                actual_time = datetime.datetime.now().strftime("%H:%M:%S")
-                                
-                                print("\n✓ Medication confirmed! Processing...")
-                                
-                                # Continuous beep and Blue LED on for 2 seconds (indicates medicine taken)
-                                print("🔵 Blue LED ON + Continuous beep for 2 seconds...")
-                                led_on(LED_BUTTON_PIN)  # Blue LED near button
-                                continuous_beep(2.0)  # Continuous beep for 2 seconds
-                                led_off(LED_BUTTON_PIN)
-                                
-                                # Ask about vitals
-                                print("\n" + "─" * 70)
-                                print("📊 OPTIONAL: Measure vital signs now?")
-                                print("   Press button within 5 seconds to measure temperature & heart rate")
-                                print("   Or wait 5 seconds to skip vitals measurement")
-                                print("─" * 70)
-                                measure_vitals = wait_for_button(5)
-                                
-                                temp = None
-                                hr = None
-                                if measure_vitals:
-                                    print("\n📊 Measuring vital signs...")
-                                    temp, hr = measure_vitals_manual()
-                                else:
-                                    print("\n⏭️  Skipping vital signs measurement")
-                                
-                                # Log medication
-                                log_medication(med_id, name, schedule_time, actual_time, "taken", temp, hr)
-                                
-                                print("\n✓ Medication intake logged successfully!")
-                                print("─" * 70)
-                                
-                                # Update dashboard after a moment
-                                time.sleep(2)
-                                display_monitoring_dashboard()
-                            else:
-                                # Medication missed
-                                alarm_active = False
-                                buzzer_off()
-                                led_off(LED_BUTTON_PIN)
-                                actual_time = datetime.datetime.now().strftime("%H:%M:%S")
-                                
-                                print("\n" + "✗" * 35)
-                                print(f"✗ Medication '{name}' was not confirmed")
-                                print(f"   Scheduled: {schedule_time} | Status: MISSED")
-                                print("✗" * 35)
-                                
-                                log_medication(med_id, name, schedule_time, actual_time, "missed")
-                                
-                                # Update dashboard after a moment
-                                time.sleep(2)
-                                display_monitoring_dashboard()
-                            
-                            # Break out of loop after handling one medication alarm
-                            # This prevents multiple alarms from triggering simultaneously
-                            break
-                except (ValueError, AttributeError) as e:
-                    # Skip medications with invalid time format
-                    continue
-            
-            conn.close()
-            time.sleep(5)  # Check every 5 seconds for better accuracy
-            
-        except Exception as e:
-            print(f"Error in medication monitoring: {e}")
-            time.sleep(30)
-
 def medication_alarm(duration=60):
-    """Medication alarm with LED blink and buzzer - loud and clear beeping pattern"""
-    end_time = time.time() + duration
-    while time.time() < end_time and alarm_active:
-        # Fast, loud beeping pattern for maximum audibility
-        for _ in range(4):  # 4 quick beeps per cycle
-            led_on(LED_BUTTON_PIN)
-            buzzer_on()
-            time.sleep(0.15)  # On time for clear beep
-            led_off(LED_BUTTON_PIN)
-            buzzer_off()
-            time.sleep(0.05)  # Very short pause between beeps
-        # Short pause between beep groups
-        time.sleep(0.2)
+    """Medication alarm with LED blink and buzzer - loud and clear beeping pattern
+    
+    Plays on the actuator worker until alarm_active is cleared, or for at
+    most duration seconds (None = no limit).
+    """
+    actuators.play("medication_alarm", MEDICATION_ALARM_PATTERN, duration)
+    while alarm_active and not actuators.wait("medication_alarm", timeout=0.2):
+        pass
+    actuators.stop("medication_alarm")
 
 def health_monitoring():
     """Continuous health monitoring"""
+    if sensor_sampler.running:
+        sample_vital("temperature", VITALS_MAX_AGE, VITALS_MAX_AGE)  # First reading in before the first check
     while monitoring_active and system_running:
         check_health_monitoring()
-        time.sleep(10)  # Check every 10 seconds
+        time.sleep(HEALTH_CHECK_INTERVAL)
 
 def monitoring_status_updater():
     """Update monitoring dashboard every minute"""
@@ -1186,13 +1439,26 @@ def start_alarm_monitoring():
 
 def stop_alarm_monitoring():
     """Stop independent medication alarm monitoring"""
-    global alarm_monitoring_active
+    global alarm_monitoring_active, alarm_active
     alarm_monitoring_active = False
     alarm_active = False
+    dose_scheduler.wake()
+
+def start_health_monitoring():
+    """Start the vitals checks without the dashboard (the daemon's health monitoring)"""
+    global monitoring_active, health_monitoring_thread
+    
+    if monitoring_active:
+        return  # Already running
+    
+    monitoring_active = True
+    health_monitoring_thread = threading.Thread(target=health_monitoring, name="health-monitoring", daemon=True)
+    health_monitoring_thread.start()
+    print(f"✓ Health monitoring started (every {HEALTH_CHECK_INTERVAL} seconds)")
 
 def start_monitoring():
     """Start continuous health monitoring (vitals only) - Alarm works independently"""
-    global monitoring_active
+    global monitoring_active, health_monitoring_thread
     
     if monitoring_active:
         print("\n⚠️  Monitoring is already active!")
@@ -1205,7 +1471,7 @@ def start_monitoring():
     print("\n" + "─" * 70)
     print("🚀 HEALTH MONITORING ACTIVATED")
     print("─" * 70)
-    print("  • Health monitoring: Every 10 seconds (temperature & heart rate)")
+    print(f"  • Health monitoring: Every {HEALTH_CHECK_INTERVAL} seconds (temperature & heart rate)")
     print("  • Dashboard updates: Every 30 seconds")
     print("  • Medication alarms: Running independently (not affected by this)")
     print("  • Press Ctrl+C to stop monitoring")
@@ -1213,10 +1479,10 @@ def start_monitoring():
     print("\n⏳ Starting health monitoring...\n")
     
     # Start only health monitoring threads (alarm monitoring runs independently)
-    health_thread = threading.Thread(target=health_monitoring, daemon=True)
+    health_monitoring_thread = threading.Thread(target=health_monitoring, name="health-monitoring", daemon=True)
     dashboard_thread = threading.Thread(target=monitoring_status_updater, daemon=True)
     
-    health_thread.start()
+    health_monitoring_thread.start()
     dashboard_thread.start()
     
     # Give threads a moment to start
@@ -1233,11 +1499,11 @@ def stop_monitoring():
     global monitoring_active
     monitoring_active = False
     # Note: We don't stop alarm_active here because alarm monitoring is independent
-    # Only turn off health monitoring LEDs/buzzer if they were on
-    buzzer_off()
-    led_off(LED_HEART_PIN)
-    led_off(LED_TEMP_PIN)
-    # Don't turn off LED_BUTTON_PIN as it might be used by alarm
+    # Only stop the health monitoring alert patterns; a ringing medication
+    # alarm keeps the button LED and buzzer
+    actuators.stop("temp_alert")
+    actuators.stop("hr_alert")
+    vitals_writer.flush(DB_FILE)
     print("\n✓ Health monitoring stopped (medication alarms continue independently)")
 
 def cleanup():
@@ -1245,6 +1511,8 @@ def cleanup():
     global system_running, pwm_buzzer
     system_running = False
     stop_monitoring()
+    sensor_sampler.stop()
+    actuators.shutdown()
     
     # Stop PWM buzzer if it exists
     if pwm_buzzer:
@@ -1273,6 +1541,12 @@ def cleanup():
             except:
                 pass
     
+    # Commit queued medication/vitals logs before the connections go away
+    if not log_queue.close():
+        print("⚠ Some log records could not be written before shutdown")
+    close_all_connections()
+    dump_metrics()
+    
     print("\n👋 System shutdown complete. All LEDs turned OFF. Goodbye!")
 
 def signal_handler(sig, frame):
@@ -1280,6 +1554,166 @@ def signal_handler(sig, frame):
     cleanup()
     sys.exit(0)
 
+def dump_metrics(sig=None, frame=None):
+    """Write current metrics to METRICS_FILE (also the SIGUSR1 handler)"""
+    try:
+        metrics.write_file(METRICS_FILE)
+    except OSError as e:
+        print(f"⚠ Could not write metrics to {METRICS_FILE}: {e}")
+
+def start_metrics_endpoint():
+    """Serve /metrics locally; the device runs on without it if the port is taken"""
+    try:
+        medhealth_metrics.serve(metrics, METRICS_HOST, METRICS_PORT)
+        print(f"✓ Metrics at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    except OSError as e:
+        print(f"⚠ Metrics endpoint not started: {e}")
+
+# Control commands: the daemon serves these on its socket (medhealth_control),
+# and the menu runs everything that changes state through control()
+control_client = None  # medhealth_control.ControlClient while the menu is a client of the daemon
+started_at = time.time()
+staged_adds = threading.local()  # rows of a chunked "add" until its last chunk; control connections have a thread each
+
+def medication_dict(med_id: int, name: str, schedule_minute: Optional[int]) -> dict:
+    return {"id": med_id, "name": name, "schedule_minute": schedule_minute}
+
+def control_add(name: Optional[str] = None, schedule_time: Optional[str] = None, medications=None,
+                more: bool = False, staged: int = 0):
+    """One medication, or medications=[[name, "HH:MM"], ...] in one transaction
+    
+    A list too long for one request goes in chunks over one connection:
+    each chunk but the last with more=True is only held back (returns []),
+    and every chunk passes staged=the number of rows sent before it. The
+    last chunk adds all of them; any error drops the held rows.
+    """
+    if medications is None:
+        schedule_minute = schedule_minute_of_day(schedule_time)
+        med_id = schedule_cache.add(DB_FILE, name, schedule_minute)
+        schedule_medication(med_id, name, schedule_minute)
+        return medication_dict(med_id, name, schedule_minute)
+    held, staged_adds.rows = getattr(staged_adds, "rows", []), []
+    if len(held) != staged:
+        raise ValueError(f"{staged} rows sent before this chunk but {len(held)} held "
+                         f"(connection lost?); nothing added")
+    rows = held + [(name, schedule_minute_of_day(schedule_time)) for name, schedule_time in medications]
+    if more:
+        staged_adds.rows = rows
+        return []
+    added = []
+    for med_id, (name, schedule_minute) in zip(schedule_cache.add_many(DB_FILE, rows), rows):
+        schedule_medication(med_id, name, schedule_minute)
+        added.append(medication_dict(med_id, name, schedule_minute))
+    return added
+
+def control_remove(id: int):
+    """The removed medication, or None if there is no such id"""
+    result = schedule_cache.remove(DB_FILE, int(id))
+    if not result:
+        return None
+    dose_scheduler.remove(int(id))
+    return medication_dict(int(id), *result)
+
+def control_medications():
+    """Today's schedule and upcoming doses (load_dashboard_data rows)"""
+    schedule, upcoming = load_dashboard_data()
+    return {"schedule": schedule, "upcoming": upcoming}
+
+def control_status():
+    schedule, upcoming = load_dashboard_data()
+    return {
+        "pid": os.getpid(),
+        "uptime": round(time.time() - started_at, 1),
+        "db": os.path.abspath(DB_FILE),
+        "medications": len(schedule),
+        "taken_today": sum(1 for *_, taken_today in schedule if taken_today),
+        "next_dose": medication_dict(*upcoming[0]) if upcoming else None,
+        "alarms": [{"id": alarm.med_id, "name": alarm.name, "state": alarm.state, "due_at": alarm.due_at}
+                   for alarm in dose_alarms.outstanding()],
+        "alarm_monitoring": alarm_monitoring_thread is not None and alarm_monitoring_thread.is_alive(),
+        "health_monitoring": health_monitoring_thread is not None and health_monitoring_thread.is_alive(),
+        "sampling": sensor_sampler.running,
+        "log_queue_pending": log_queue.pending(),
+        "vitals_pending": vitals_writer.pending(),
+    }
+
+def control_flush(timeout: float = LOG_READ_FLUSH_TIMEOUT):
+    """Commit queued medication and vitals logs; flushed is False on timeout"""
+    vitals_writer.flush(DB_FILE)
+    return {"flushed": log_queue.flush(timeout), "pending": log_queue.pending()}
+
+CONTROL_HANDLERS = {
+    "ping": lambda: "pong",
+    "status": control_status,
+    "medications": control_medications,
+    "add": control_add,
+    "remove": control_remove,
+    "vitals": snapshot_vitals,
+    "flush": control_flush,
+}
+
+def control(command: str, **arguments):
+    """Run a control command: on the daemon when the menu is its client, else in-process"""
+    if control_client is not None:
+        return control_client.request(command, **arguments)
+    return CONTROL_HANDLERS[command](**arguments)
+
+def run_daemon(socket_path: str = medhealth_control.CONTROL_SOCKET):
+    """Headless device: scheduler, sensor sampler, alarms and health monitoring, driven over the control socket
+    
+    Needs no TTY (runs as a systemd service); SIGTERM or SIGINT shuts down
+    cleanly. Alarm, abnormal-vitals and status messages go to stdout (the
+    journal); vitals are logged to vitals_logs as in the menu's monitoring.
+    """
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda sig, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda sig, frame: stop.set())
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, dump_metrics)
+    
+    print("💊 MEDHEALTH DAEMON - Initializing...")
+    init_database()
+    init_gpio()
+    init_sensors()
+    sensor_sampler.start()
+    start_metrics_endpoint()
+    start_alarm_monitoring()
+    start_health_monitoring()
+    try:
+        server = medhealth_control.serve(CONTROL_HANDLERS, socket_path, on_disconnect=close_thread_connections)
+    except OSError as e:
+        print(f"❌ Control socket not started: {e}")
+        cleanup()
+        raise SystemExit(1)
+    print(f"✓ Control socket at {socket_path}")
+    
+    stop.wait()
+    medhealth_control.shutdown(server, socket_path)
+    cleanup()
+
+def run_client(socket_path: str = medhealth_control.CONTROL_SOCKET):
+    """The interactive menu as a thin client of a running daemon (no hardware here)
+    
+    Changes and measurements go through the daemon; history is read from
+    its database directly.
+    """
+    global control_client, DB_FILE
+    control_client = medhealth_control.ControlClient(socket_path)
+    try:
+        DB_FILE = control("status")["db"]
+    except OSError as e:
+        print(f"❌ No MedHealth daemon on {socket_path}: {e}")
+        raise SystemExit(1)
+    try:
+        main_menu()
+    except KeyboardInterrupt:
+        print()
+    except OSError as e:
+        print(f"\n❌ Lost the connection to the daemon: {e}")
+        raise SystemExit(1)
+    finally:
+        control_client.close()
+
 def main_menu():
     """Display main menu with improved formatting"""
     while system_running:
@@ -1290,7 +1724,7 @@ def main_menu():
         print("=" * 70)
         print(f"🕐 Current Time: {current_time}")
         print("─" * 70)
-        print("1. ➕ Add Medication")
+        print("1. ➕ Add Medication / Import Schedule")
         print("2. 📋 View Medications")
         print("3. 🗑️  Delete Medication")
         print("4. 📊 Measure Vitals (Manual)")
@@ -1301,9 +1735,14 @@ def main_menu():
         print("─" * 70)
         
         # Show quick status
-        medications = get_active_medications()
-        if medications:
-            print(f"📋 Active Medications: {len(medications)}")
+        dashboard = control("medications")
+        schedule, upcoming = dashboard["schedule"], dashboard["upcoming"]
+        if schedule:
+            taken_count = sum(1 for *_, taken_today in schedule if taken_today)
+            print(f"📋 Active Medications: {len(schedule)} | Taken Today: {taken_count}/{len(schedule)}")
+            if upcoming:
+                _, next_name, next_minute = upcoming[0]
+                print(f"⏰ Next Dose: {next_name} at {format_minute_of_day(next_minute)}")
         else:
             print("📋 No active medications")
         
@@ -1312,7 +1751,10 @@ def main_menu():
         choice = input("\n👉 Select an option (1-8): ").strip()
         
         if choice == "1":
-            name = input("Enter medication name: ").strip()
+            name = input("Enter medication name (or a .csv/.json schedule file to import): ").strip()
+            if name.lower().endswith(medhealth_import.SCHEDULE_FILE_SUFFIXES) and os.path.isfile(name):
+                import_medication_schedule(name)
+                continue
             schedule_time = input("Enter schedule time (HH:MM format, e.g., 08:00): ").strip()
             try:
                 datetime.datetime.strptime(schedule_time, "%H:%M")
@@ -1332,11 +1774,14 @@ def main_menu():
                 print("⚠️  Invalid ID")
         
         elif choice == "4":
-            measure_vitals_manual()
+            measure_vitals_manual(via_control=True)
         
         elif choice == "5":
             view_history()
         
+        elif choice in ("6", "7") and control_client is not None:
+            print("⚠️  Tests and the monitoring dashboard use the hardware; run them on the device without the daemon")
+        
         elif choice == "6":
             print("\n" + "─" * 70)
             print(" " * 15 + "🧪 TEST MENU")
@@ -1360,15 +1805,19 @@ def main_menu():
             start_monitoring()
         
         elif choice == "8":
-            cleanup()
+            if control_client is None:
+                cleanup()
             break
         
         else:
             print("⚠️  Invalid option. Please select 1-8.")
 
-if __name__ == "__main__":
+def run():
+    """Start the device: GPIO, sensors, alarm monitoring and the interactive menu"""
     # Setup signal handler
     signal.signal(signal.SIGINT, signal_handler)
+    if hasattr(signal, "SIGUSR1"):  # Not on Windows
+        signal.signal(signal.SIGUSR1, dump_metrics)
     
     print("💊 MEDHEALTH SYSTEM - Initializing...")
     
@@ -1376,6 +1825,8 @@ if __name__ == "__main__":
     init_database()
     init_gpio()
     init_sensors()
+    sensor_sampler.start()
+    start_metrics_endpoint()
     
     print("✓ System ready!\n")
     
@@ -1390,3 +1841,119 @@ if __name__ == "__main__":
         print(f"\n⚠️  Error: {e}")
         cleanup()
 
+def list_command(args):
+    schedule, _ = load_dashboard_data()
+    if not schedule:
+        print("📋 No active medications found.")
+        return
+    print_medication_table(schedule)
+
+def add_command(args):
+    if args.schedule_time is None:
+        # A schedule file instead of one medication
+        if not import_medication_schedule(args.name):
+            raise SystemExit(1)
+        return
+    add_medication(args.name, args.schedule_time)
+
+def history_command(args):
+    filters = medhealth_history.HistoryFilter(args.medication, args.status, args.since, args.until,
+                                              args.with_vitals)
+    conn = get_connection(DB_FILE)
+    page = medhealth_history.page(conn, filters, None, args.limit)
+    print(f"📈 Medication history ({describe_history_filter(filters)})")
+    print("=" * 85)
+    print_history_entries(page.entries)
+    if page.next_cursor:
+        print(f"   … older entries not shown (--limit {args.limit})")
+    print_adherence_stats(medhealth_adherence.summary(conn, HISTORY_SUMMARY_DAYS, args.medication),
+                          HISTORY_SUMMARY_DAYS)
+
+def export_command(args):
+    import medhealth_export  # gzip and csv are only needed here
+    rows, seconds = medhealth_export.export_file(DB_FILE, args.table, args.output, args.format, args.gzip,
+                                                 args.since, args.until)
+    if args.output != "-":
+        print(f"✓ Exported {rows} {args.table} rows to {args.output} in {seconds:.2f} s")
+
+def stats_command(args):
+    conn = get_connection(DB_FILE)
+    print_adherence_stats(medhealth_adherence.summary(conn, args.days, args.medication), args.days)
+
+def main():
+    """Run the device, or one command
+    
+    Without a command the device runs with its menu; daemon and menu split
+    that into a headless service and its client; the other commands do one
+    job and exit without touching GPIO, I2C or the sensors.
+    """
+    global DB_FILE
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Smart medication adherence and health monitoring system")
+    parser.add_argument("--db", default=DB_FILE, help=f"database file (default {DB_FILE})")
+    commands = parser.add_subparsers(dest="command", metavar="command",
+                                     help="default: run the device with the interactive menu")
+    
+    commands.add_parser("list", help="active medications and today's status")
+    
+    add = commands.add_parser("add", help="add a medication, or every one in a schedule file")
+    add.add_argument("name", help="medication name, or a .csv/.json/.jsonl schedule file when no time is given")
+    add.add_argument("schedule_time", nargs="?", help="daily dose time HH:MM")
+    
+    history = commands.add_parser("history", help="latest medication log entries")
+    history.add_argument("--medication", type=int, help="one medication id")
+    history.add_argument("--status", choices=("taken", "missed"))
+    history.add_argument("--since", help="first local date (YYYY-MM-DD)")
+    history.add_argument("--until", help="last local date (YYYY-MM-DD), inclusive")
+    history.add_argument("--with-vitals", action="store_true", help="only doses logged with vitals")
+    history.add_argument("--limit", type=int, default=HISTORY_PAGE_SIZE,
+                         help=f"entries to show (default {HISTORY_PAGE_SIZE})")
+    
+    # Choices as in medhealth_export.EXPORT_COLUMNS / EXPORT_FORMATS, which is only imported to export
+    export = commands.add_parser("export", help="medication or vitals logs as CSV / JSON Lines")
+    export.add_argument("table", choices=("medication_logs", "vitals_logs"))
+    export.add_argument("-o", "--output", default="-", help="output file, '-' for stdout (default)")
+    export.add_argument("--format", choices=("csv", "jsonl"), default=None,
+                        help="default: from the output file suffix, else csv")
+    export.add_argument("--gzip", action="store_true", default=None,
+                        help="gzip the output (implied by a .gz output file)")
+    export.add_argument("--since", help="first local date to include (YYYY-MM-DD)")
+    export.add_argument("--until", help="last local date to include (YYYY-MM-DD)")
+    
+    stats = commands.add_parser("stats", help="adherence totals")
+    stats.add_argument("--days", type=int, default=HISTORY_SUMMARY_DAYS,
+                       help=f"window length (default {HISTORY_SUMMARY_DAYS})")
+    stats.add_argument("--medication", type=int, help="one medication id")
+    
+    daemon = commands.add_parser("daemon", help="run headless (no TTY), controlled over a Unix socket")
+    daemon.add_argument("--socket", default=medhealth_control.CONTROL_SOCKET,
+                        help=f"control socket (default {medhealth_control.CONTROL_SOCKET})")
+    menu = commands.add_parser("menu", help="the interactive menu, as a client of a running daemon")
+    menu.add_argument("--socket", default=medhealth_control.CONTROL_SOCKET,
+                      help=f"control socket (default {medhealth_control.CONTROL_SOCKET})")
+    args = parser.parse_args()
+    
+    DB_FILE = args.db
+    if args.command is None:
+        run()
+        return
+    if args.command == "daemon":
+        run_daemon(args.socket)
+        return
+    if args.command == "menu":
+        run_client(args.socket)
+        return
+    
+    init_database()
+    try:
+        {"list": list_command, "add": add_command, "history": history_command,
+         "export": export_command, "stats": stats_command}[args.command](args)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    finally:
+        close_all_connections()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Per-dose alarm latency tracing for the MedHealth device runtime
+
+Every dose the alarm loop rings for gets a trace of when each stage
+happened: due (schedule) -> detected (alarm loop woke) -> buzzer on ->
+button pressed -> resolved (confirmed or missed) -> logged
+(log_medication) -> written (in the log writer's transaction). Open
+traces stay in the tracer until the dose is logged; then they move to a
+ring buffer of recent traces and are persisted in dose_traces next to
+the medication_logs row, in the same statement group. The report gives
+p50/p95/p99 of each stage over a date range.
+
+Usage:
+    python medhealth_tracing.py [--since YYYY-MM-DD] [--until YYYY-MM-DD] [--medication ID] [db_file]
+"""
+
+import argparse
+import collections
+import math
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+from medhealth_history import local_midnight
+
+TRACE_RING_SIZE = 256  # Finished traces kept in memory
+
+# Reported stages: (name, from column, to column, what it covers)
+STAGES = [
+    ("detect", "due_at", "detected_at", "scheduler wake-up after the due time"),
+    ("alarm", "detected_at", "buzzer_on_at", "taken-today check and buzzer start"),
+    ("response", "buzzer_on_at", "pressed_at", "patient: ringing to button press"),
+    ("button", "pressed_at", "resolved_at", "press handling"),
+    ("log", "resolved_at", "logged_at", "confirmation feedback and optional vitals"),
+    ("commit", "logged_at", "written_at", "write-behind queue wait"),
+    ("total", "due_at", "written_at", "due to written"),
+]
+TRACE_TIMES = ("detected_at", "buzzer_on_at", "pressed_at", "resolved_at", "logged_at")
+
+# Runs right after the medication_logs INSERT in the same group, so
+# last_insert_rowid() is that row's id
+INSERT_SQL = """INSERT OR REPLACE INTO dose_traces
+                (log_id, medication_id, due_at, detected_at, buzzer_on_at, pressed_at, resolved_at, logged_at,
+                 written_at)
+                VALUES (last_insert_rowid(), ?, ?, ?, ?, ?, ?, ?, (julianday('now') - 2440587.5) * 86400.0)"""
+
+# Seconds; None when the dose has no samples for the stage
+StageStats = namedtuple("StageStats", ["stage", "count", "p50", "p95", "p99", "max"])
+
+
+class DoseTrace:
+    """Stage times (epoch seconds) of one dose; None until the stage happens"""
+
+    __slots__ = ("med_id", "due_at") + TRACE_TIMES
+
+    def __init__(self, med_id: int, due_at: float, detected_at: Optional[float] = None):
+        self.med_id = med_id
+        self.due_at = due_at
+        self.detected_at = detected_at
+        self.buzzer_on_at = self.pressed_at = self.resolved_at = self.logged_at = None
+
+    def statement(self) -> Tuple[str, tuple]:
+        """(sql, params) persisting this trace for the medication_logs row inserted just before"""
+        return INSERT_SQL, (self.med_id, self.due_at) + tuple(getattr(self, name) for name in TRACE_TIMES)
+
+    def __repr__(self):
+        stages = ", ".join(f"{name}=+{getattr(self, name) - self.due_at:.3f}s"
+                           for name in TRACE_TIMES if getattr(self, name) is not None)
+        return f"DoseTrace({self.med_id}, {stages})"
+
+
+class DoseTracer:
+    """Open traces keyed by (med_id, due_at), like the alarm state machine, plus a ring of finished ones"""
+
+    def __init__(self, capacity: int = TRACE_RING_SIZE):
+        self._lock = threading.Lock()
+        self._open: Dict[Tuple[int, float], DoseTrace] = {}
+        self._recent = collections.deque(maxlen=capacity)
+
+    def start(self, med_id: int, due_at: float, detected_at: Optional[float] = None) -> DoseTrace:
+        trace = DoseTrace(med_id, due_at, time.time() if detected_at is None else detected_at)
+        with self._lock:
+            self._open[(med_id, due_at)] = trace
+        return trace
+
+    def mark(self, med_id: int, due_at: float, stage: str, at: Optional[float] = None):
+        """Record the first time a stage (a TRACE_TIMES name) happened for an open trace"""
+        with self._lock:
+            trace = self._open.get((med_id, due_at))
+            if trace is not None and getattr(trace, stage) is None:
+                setattr(trace, stage, time.time() if at is None else at)
+
+    def finish(self, med_id: int, due_at: float, resolved_at: float,
+               logged_at: Optional[float] = None) -> Optional[DoseTrace]:
+        """Close the trace of a dose being logged; None if the dose was not traced"""
+        with self._lock:
+            trace = self._open.pop((med_id, due_at), None)
+            if trace is None:
+                return None
+            trace.resolved_at = trace.resolved_at or resolved_at
+            trace.logged_at = time.time() if logged_at is None else logged_at
+            self._recent.append(trace)
+        return trace
+
+    def open_traces(self) -> List[DoseTrace]:
+        with self._lock:
+            return list(self._open.values())
+
+    def recent(self) -> List[DoseTrace]:
+        """Finished traces, oldest first"""
+        with self._lock:
+            return list(self._recent)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def report(conn: sqlite3.Connection, since: Optional[str] = None, until: Optional[str] = None,
+           medication_id: Optional[int] = None) -> List[StageStats]:
+    """Stage latency percentiles for doses due between local dates since and until (inclusive)"""
+    where, params = [], []
+    if since:
+        where.append("due_at >= ?")
+        params.append(local_midnight(since))
+    if until:
+        where.append("due_at < ?")
+        params.append(local_midnight(until, days_after=1))
+    if medication_id is not None:
+        where.append("medication_id = ?")
+        params.append(medication_id)
+
+    stats = []
+    for stage, start, end, _ in STAGES:
+        conditions = where + [f"{start} IS NOT NULL", f"{end} IS NOT NULL"]
+        values = [value for (value,) in conn.execute(
+            f"SELECT {end} - {start} AS seconds FROM dose_traces WHERE {' AND '.join(conditions)} ORDER BY seconds",
+            params)]
+        if values:
+            stats.append(StageStats(stage, len(values), percentile(values, 0.50), percentile(values, 0.95),
+                                    percentile(values, 0.99), values[-1]))
+        else:
+            stats.append(StageStats(stage, 0, None, None, None, None))
+    return stats
+
+
+def format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    if abs(seconds) < 1:
+        return f"{seconds * 1000:.1f} ms"
+    return f"{seconds:.2f} s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alarm latency per stage from medhealth.db dose traces")
+    parser.add_argument("db_file", nargs="?", default="medhealth.db")
+    parser.add_argument("--since", help="first local date (YYYY-MM-DD), default all")
+    parser.add_argument("--until", help="last local date (YYYY-MM-DD), inclusive")
+    parser.add_argument("--medication", type=int, default=None, help="one medication id")
+    args = parser.parse_intermixed_args()
+
+    conn = sqlite3.connect(args.db_file, timeout=30)
+    stats = report(conn, args.since, args.until, args.medication)
+    print(f"{'Stage':<10} {'Doses':>6} {'p50':>10} {'p95':>10} {'p99':>10} {'Max':>10}  Covers")
+    print("─" * 100)
+    for row, (_, _, _, covers) in zip(stats, STAGES):
+        print(f"{row.stage:<10} {row.count:>6} {format_seconds(row.p50):>10} {format_seconds(row.p95):>10} "
+              f"{format_seconds(row.p99):>10} {format_seconds(row.max):>10}  {covers}")
+    if not stats[-1].count:
+        print("\nNo dose traces in this range (doses are traced when their alarm rings)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Shared fixtures: small databases built the same way as the benchmark fixtures
+
+Run from the repository root with python -m pytest tests.
+"""
+
+import pytest
+
+from benchmark import fixture_database
+
+
+@pytest.fixture
+def device_db():
+    """Empty migrated database that medhealth_system uses for the test"""
+    with fixture_database(0, name="medhealth.db", use=True, medications=0) as db_path:
+        yield db_path
+
+
+@pytest.fixture
+def logs_db():
+    """Migrated database with 40 medications and 2000 medication logs"""
+    with fixture_database(2000, name="logs.db") as db_path:
+        yield db_path
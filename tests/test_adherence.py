@@ -0,0 +1,34 @@
+import sqlite3
+import time
+
+import medhealth_adherence
+import medhealth_system
+from benchmark import ADHERENCE_FROM_LOGS_SQL
+
+
+def test_rollup_matches_aggregating_the_logs(logs_db):
+    conn = sqlite3.connect(logs_db)
+    since_epoch = int(time.mktime(time.strptime(medhealth_adherence.first_day(365), "%Y-%m-%d")))
+    for medication, params, medication_id in [("", (since_epoch,), None),
+                                              ("AND medication_id = ?", (since_epoch, 1), 1)]:
+        from_logs = conn.execute(ADHERENCE_FROM_LOGS_SQL.format(medication=medication), params).fetchall()
+        from_rollup = medhealth_adherence.daily(conn, 365, medication_id)
+        assert from_logs and [row[:4] for row in from_logs] == [tuple(point[:4]) for point in from_rollup]
+    conn.close()
+
+
+def test_logged_doses_update_the_rollup_like_a_rebuild(device_db):
+    now = time.time()
+    doses = [(1, now - 86400 * 2, 300, "taken", 36.6), (1, now - 86400, 0, "missed", None),
+             (2, now - 86400, -120, "taken", None), (2, now - 3600, 45, "taken", 37.1)]
+    for med_id, due, delay, status, temperature in doses:
+        medhealth_system.log_medication(med_id, f"Med {med_id}", due, due + delay, status, temperature)
+    medhealth_system.log_queue.flush()
+
+    conn = sqlite3.connect(device_db)
+    query = "SELECT * FROM daily_adherence ORDER BY medication_id, day"
+    incremental = conn.execute(query).fetchall()
+    medhealth_adherence.rebuild(conn)
+    assert incremental and conn.execute(query).fetchall() == incremental
+    assert medhealth_adherence.summary(conn, 30, 2).taken == 2
+    conn.close()
@@ -0,0 +1,28 @@
+import threading
+import time
+
+import medhealth_system
+
+
+def test_doses_due_in_the_same_minute_all_ring_and_one_press_confirms_them(device_db):
+    doses = 20
+    med_ids = [medhealth_system.schedule_cache.add(device_db, f"Dose {i}", 8 * 60) for i in range(doses)]
+    medhealth_system.alarm_monitoring_active = True
+    loop = threading.Thread(target=medhealth_system.medication_alarm_monitoring, daemon=True)
+    loop.start()
+    try:
+        due_at = time.time() + 0.2
+        for med_id in med_ids:
+            medhealth_system.dose_scheduler.schedule(med_id, due_at, (f"Dose {med_id - 1}", 8 * 60))
+        while len(medhealth_system.dose_alarms.outstanding()) < doses and time.time() < due_at + 5:
+            time.sleep(0.01)
+        ringing = len(medhealth_system.dose_alarms.outstanding())
+        confirmed = medhealth_system.confirm_ringing_doses()
+    finally:
+        medhealth_system.stop_alarm_monitoring()
+        loop.join(5)
+    medhealth_system.log_queue.flush()
+
+    taken = medhealth_system.get_connection(device_db).execute(
+        "SELECT COUNT(DISTINCT medication_id) FROM medication_logs WHERE status = 'taken'").fetchone()[0]
+    assert ringing == confirmed == taken == doses
@@ -0,0 +1,29 @@
+from benchmark_suite import compare
+
+
+def metric(value, unit="ms", better="lower", runs=None):
+    return {"value": value, "runs": runs or [value], "unit": unit, "better": better}
+
+
+def test_small_fast_paths_regress_when_much_slower():
+    baseline = {"10k": {"tiny": metric(0.01), "logs": metric(14000, "logs/s", "higher")}}
+    results = {"10k": {"tiny": metric(0.4), "logs": metric(7000, "logs/s", "higher")}}
+    assert [row[5] for row in compare(results, baseline, 0.3)] == [True, True]
+
+
+def test_large_slowdowns_regress():
+    baseline = {"10k": {"slow": metric(2.0, runs=[1.9, 2.0, 2.1]), "logs": metric(20000, "logs/s", "higher")}}
+    results = {"10k": {"slow": metric(3.0, runs=[2.8, 3.0, 3.3]), "logs": metric(10000, "logs/s", "higher")}}
+    assert [row[5] for row in compare(results, baseline, 0.3)] == [True, True]
+
+
+def test_changes_within_tolerance_do_not_regress():
+    baseline = {"10k": {"slow": metric(2.0), "logs": metric(20000, "logs/s", "higher")}}
+    results = {"10k": {"slow": metric(2.4), "logs": metric(16000, "logs/s", "higher")}}
+    assert [row[5] for row in compare(results, baseline, 0.3)] == [False, False]
+
+
+def test_timer_resolution_and_overlapping_rounds_do_not_regress():
+    baseline = {"10k": {"tiny": metric(0.004), "noisy": metric(2.0, runs=[1.8, 2.0, 3.1])}}
+    results = {"10k": {"tiny": metric(0.012), "noisy": metric(3.0, runs=[2.9, 3.0, 3.2])}}
+    assert [row[5] for row in compare(results, baseline, 0.3)] == [False, False]
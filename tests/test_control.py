@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+import medhealth_control
+import medhealth_db
+import medhealth_system
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def daemon_socket(device_db, tmp_path):
+    """Control socket served the way run_daemon() serves it"""
+    socket_path = str(tmp_path / "control.sock")
+    server = medhealth_control.serve(medhealth_system.CONTROL_HANDLERS, socket_path,
+                                     on_disconnect=medhealth_db.close_thread_connections)
+    try:
+        yield socket_path
+    finally:
+        medhealth_control.shutdown(server, socket_path)
+        for med_id in medhealth_system.dose_scheduler.keys():
+            medhealth_system.dose_scheduler.remove(med_id)
+
+
+def test_large_import_as_a_daemon_client(device_db, daemon_socket, tmp_path):
+    medications = 2000
+    name = "😀" * 199
+    schedule = tmp_path / "ward.csv"
+    schedule.write_text("name,schedule_time\n" + "".join(f"{name}{i % 10},%02d:%02d\n" % divmod(i % 1440, 60)
+                                                         for i in range(medications)), encoding="utf-8")
+    medhealth_system.control_client = medhealth_control.ControlClient(daemon_socket)
+    try:
+        assert medhealth_system.import_medication_schedule(str(schedule)) == medications
+    finally:
+        medhealth_system.control_client.close()
+        medhealth_system.control_client = None
+    assert len(medhealth_system.schedule_cache.medications(device_db)) == medications
+
+
+def test_disconnected_clients_release_their_database_connections(daemon_socket):
+    opened = medhealth_db.connection_count()
+    for _ in range(50):
+        client = medhealth_control.ControlClient(daemon_socket)
+        client.request("status")
+        client.close()
+    deadline = time.monotonic() + 5
+    while medhealth_db.connection_count() > opened and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert medhealth_db.connection_count() == opened
+
+
+def test_a_failed_chunked_import_adds_nothing(device_db, daemon_socket):
+    chunk = [["Aspirin", "08:00"]] * 3
+    client = medhealth_control.ControlClient(daemon_socket)
+    try:
+        assert client.request("add", medications=chunk, more=True, staged=0) == []
+        with pytest.raises(ValueError):
+            client.request("add", medications=[["Ibuprofen", "25:00"]], staged=3)
+        # The held rows went with the failed chunk
+        with pytest.raises(ValueError, match="nothing added"):
+            client.request("add", medications=chunk, staged=3)
+    finally:
+        client.close()
+
+    # Held rows belong to their connection: a new one cannot finish the import
+    first, second = (medhealth_control.ControlClient(daemon_socket) for _ in range(2))
+    try:
+        first.request("add", medications=chunk, more=True, staged=0)
+        with pytest.raises(ValueError, match="nothing added"):
+            second.request("add", medications=chunk, staged=3)
+    finally:
+        first.close()
+        second.close()
+    assert medhealth_system.schedule_cache.medications(device_db) == []
+
+
+def test_daemon_logs_and_checks_vitals(tmp_path):
+    db_path, socket_path = str(tmp_path / "medhealth.db"), str(tmp_path / "control.sock")
+    daemon = subprocess.Popen([sys.executable, "-m", "medhealth_system", "--db", db_path, "daemon",
+                               "--socket", socket_path], cwd=tmp_path, stdout=subprocess.DEVNULL,
+                              env={**os.environ, "PYTHONPATH": REPO})  # Metrics dump lands in tmp_path
+    client = medhealth_control.ControlClient(socket_path)
+    try:
+        deadline = time.monotonic() + 15
+        while not os.path.exists(socket_path) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert client.request("status")["health_monitoring"]
+        # Mock sensors read ~37 °C, above TEMP_MAX (an ambient-temperature limit)
+        statuses = []
+        while not statuses and time.monotonic() < deadline:
+            client.request("flush")
+            conn = sqlite3.connect(db_path)
+            statuses = [status for (status,) in conn.execute("SELECT status FROM vitals_logs")]
+            conn.close()
+            time.sleep(0.1)
+        assert statuses and set(statuses) == {"abnormal"}
+    finally:
+        client.close()
+        daemon.terminate()
+        daemon.wait(10)
@@ -0,0 +1,111 @@
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+import medhealth_system
+from benchmark import build_fixture_db
+from medhealth_db import (SCHEDULE_CACHE_HITS, SCHEDULE_CACHE_MISSES, ScheduleCache, WriteBehindQueue,
+                          is_busy_error)
+from medhealth_metrics import REGISTRY
+from medhealth_scheduler import local_day_bounds
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def plan_steps(conn, sql, params):
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def test_taken_today_is_an_index_seek(logs_db):
+    conn = sqlite3.connect(logs_db)
+    plan = plan_steps(conn, medhealth_system.TAKEN_TODAY_SQL, (1, *local_day_bounds(time.time())))
+    conn.close()
+    assert len(plan) == 1 and plan[0].startswith("SEARCH medication_logs USING INDEX idx_medication_logs_"), plan
+
+
+def test_dashboard_only_scans_medications(logs_db):
+    conn = sqlite3.connect(logs_db)
+    start, end = local_day_bounds(time.time())
+    plan = plan_steps(conn, medhealth_system.DASHBOARD_SQL, {"start": start, "end": end})
+    conn.close()
+    assert [step for step in plan if step.startswith("SCAN")] == ["SCAN m"], plan
+    assert sum("INDEX idx_medication_logs_med_epoch" in step for step in plan) == 2, plan
+
+
+# Logs doses, prints each acknowledgement only after flush() has returned
+# for it, and is SIGKILLed by the test mid-stream
+CRASH_CHILD = """
+import sys
+from medhealth_db import WriteBehindQueue
+db_path = sys.argv[1]
+log_queue = WriteBehindQueue(max_delay=0.01)
+dose = 0
+while True:
+    for _ in range(10):
+        dose += 1
+        log_queue.submit(db_path, "INSERT INTO medication_logs (medication_id, status) VALUES (?, 'taken')",
+                         (dose,))
+    log_queue.flush()
+    print(dose, flush=True)
+"""
+
+
+@pytest.mark.parametrize("kill_after", [0.3, 0.6, 0.9])
+def test_acknowledged_doses_survive_sigkill(tmp_path, kill_after):
+    db_path = str(tmp_path / "crash.db")
+    build_fixture_db(db_path, 0, medications=0)
+    child = subprocess.Popen([sys.executable, "-c", CRASH_CHILD, db_path], cwd=REPO,
+                             stdout=subprocess.PIPE, text=True)
+    time.sleep(kill_after)
+    child.send_signal(signal.SIGKILL)
+    output = child.communicate()[0].split()
+    acknowledged = int(output[-1]) if output else 0
+
+    conn = sqlite3.connect(db_path)
+    missing = conn.execute("SELECT ? - COUNT(*) FROM medication_logs WHERE medication_id <= ?",
+                           (acknowledged, acknowledged)).fetchone()[0]
+    conn.close()
+    assert acknowledged and not missing
+
+
+def test_log_queue_drops_a_rejected_group_and_commits_the_rest(logs_db):
+    log_queue = WriteBehindQueue(max_delay=10)
+    log_queue.submit(logs_db, "INSERT INTO medication_logs (medication_id, status) VALUES (-1, 'taken')")
+    log_queue.submit(logs_db, "INSERT INTO no_such_table (id) VALUES (1)")
+    log_queue.submit(logs_db, "INSERT INTO medication_logs (medication_id, status) VALUES (-2, 'taken')")
+    assert log_queue.flush(timeout=5)
+    log_queue.close()
+
+    conn = sqlite3.connect(logs_db)
+    assert conn.execute("SELECT COUNT(*) FROM medication_logs WHERE medication_id < 0").fetchone()[0] == 2
+    conn.close()
+    assert (log_queue.rows, log_queue.failed) == (2, 1)
+
+
+def test_only_busy_and_locked_errors_are_retryable(logs_db):
+    blocker = sqlite3.connect(logs_db)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        sqlite3.connect(logs_db, timeout=0).execute("INSERT INTO medication_logs (status) VALUES ('taken')")
+    except sqlite3.OperationalError as e:
+        assert is_busy_error(e)
+    else:
+        raise AssertionError("insert succeeded while the database was locked")
+    finally:
+        blocker.rollback()
+        blocker.close()
+    assert not is_busy_error(sqlite3.OperationalError("no such table: no_such_table"))
+
+
+def test_schedule_cache_lookups_are_exported(logs_db):
+    cache = ScheduleCache()
+    hits, misses = SCHEDULE_CACHE_HITS.value, SCHEDULE_CACHE_MISSES.value
+    cache.medications(logs_db)
+    cache.medications(logs_db)
+    assert (SCHEDULE_CACHE_HITS.value - hits, SCHEDULE_CACHE_MISSES.value - misses) == (1, 1)
+    assert 'medhealth_schedule_cache_lookups_total{result="hit"}' in REGISTRY.render()
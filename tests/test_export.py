@@ -0,0 +1,47 @@
+import csv
+import gzip
+import json
+import sqlite3
+import time
+
+import pytest
+
+import medhealth_export
+from medhealth_history import local_midnight
+
+
+def expected_rows(db_path, since=None):
+    conn = sqlite3.connect(db_path)
+    columns = medhealth_export.EXPORT_COLUMNS["medication_logs"]
+    rows = conn.execute(f"""SELECT {', '.join(sql for _, sql in columns)} FROM medication_logs
+                            WHERE created_epoch >= ? ORDER BY created_epoch, id""",
+                        (local_midnight(since) if since else 0,)).fetchall()
+    conn.close()
+    return rows
+
+
+@pytest.mark.parametrize("filename", ["logs.csv", "logs.jsonl", "logs.csv.gz", "logs.jsonl.gz"])
+def test_export_round_trip(logs_db, tmp_path, filename):
+    path = str(tmp_path / filename)
+    rows, _ = medhealth_export.export_file(logs_db, "medication_logs", path)
+    expected = expected_rows(logs_db)
+    assert rows == len(expected) == 2000
+
+    opener = gzip.open if filename.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        if ".csv" in filename:
+            reader = csv.reader(f)
+            assert next(reader) == medhealth_export.column_names("medication_logs")
+            assert list(reader) == [["" if value is None else str(value) for value in row] for row in expected]
+        else:
+            columns = medhealth_export.column_names("medication_logs")
+            assert [json.loads(line) for line in f] == [dict(zip(columns, row)) for row in expected]
+
+
+def test_export_since(logs_db, tmp_path):
+    conn = sqlite3.connect(logs_db)
+    last_epoch = conn.execute("SELECT MAX(created_epoch) FROM medication_logs").fetchone()[0]
+    conn.close()
+    since = time.strftime("%Y-%m-%d", time.localtime(last_epoch - 10 * 86400))
+    rows, _ = medhealth_export.export_file(logs_db, "medication_logs", str(tmp_path / "recent.csv"), since=since)
+    assert 0 < rows == len(expected_rows(logs_db, since)) < 2000
@@ -0,0 +1,33 @@
+import sqlite3
+import time
+
+import pytest
+
+import medhealth_history
+from benchmark import history_offset_page
+from medhealth_history import HistoryFilter
+
+
+def filter_sets(conn):
+    last_epoch = conn.execute("SELECT MAX(created_epoch) FROM medication_logs").fetchone()[0]
+    last_day = time.strftime("%Y-%m-%d", time.localtime(last_epoch))
+    month_ago = time.strftime("%Y-%m-%d", time.localtime(last_epoch - 30 * 86400))
+    return [HistoryFilter(), HistoryFilter(medication_id=1), HistoryFilter(status="missed"),
+            HistoryFilter(with_vitals=True), HistoryFilter(since=month_ago, until=last_day),
+            HistoryFilter(medication_id=2, status="taken", since=month_ago)]
+
+
+@pytest.mark.parametrize("filter_index", range(6))
+def test_keyset_pages_equal_offset_pages(logs_db, filter_index):
+    conn = sqlite3.connect(logs_db)
+    filters = filter_sets(conn)[filter_index]
+    cursor, number = None, 1
+    while True:
+        current = medhealth_history.page(conn, filters, cursor)
+        assert [tuple(entry) for entry in current.entries] == history_offset_page(conn, filters, number)
+        if current.next_cursor is None:
+            break
+        cursor, number = current.next_cursor, number + 1
+    assert history_offset_page(conn, filters, number + 1) == []
+    conn.close()
+    assert number > 1  # Walked across at least one cursor
@@ -0,0 +1,22 @@
+import pytest
+
+from medhealth_import import parse_csv, validate_row
+
+
+@pytest.mark.parametrize("schedule_time", ["8:0", "8:00", "08:0", "-0:30", "24:00", "23:60", " 8:00",
+                                           "08:00:00", "+8:00", "0_8:00", "٠٨:٠٠", ""])
+def test_loose_schedule_times_are_rejected(schedule_time):
+    rows, issues = validate_row(2, "Aspirin", schedule_time)
+    assert rows == [] and [issue.line for issue in issues] == [2]
+
+
+@pytest.mark.parametrize("schedule_time, minute", [("00:00", 0), ("08:05", 485), ("23:59", 1439)])
+def test_valid_schedule_times(schedule_time, minute):
+    rows, issues = validate_row(2, "Aspirin", schedule_time)
+    assert issues == [] and rows[0].schedule_minute == minute
+
+
+def test_csv_reports_the_rejected_lines():
+    rows, issues = parse_csv("name,schedule_time\nAspirin,08:00\nVitamin D,8:0\nInsulin,-0:30\n")
+    assert [row.name for row in rows] == ["Aspirin"]
+    assert [issue.line for issue in issues] == [3, 4]
@@ -0,0 +1,17 @@
+import sqlite3
+
+import medhealth_migrations
+from medhealth_migrations import Migration
+
+
+def test_dry_run_copies_triggers(tmp_path):
+    conn = sqlite3.connect(tmp_path / "medhealth.db")
+    migrations = medhealth_migrations.load_migrations()
+    medhealth_migrations.migrate(conn, migrations)
+    version = medhealth_migrations.latest_version(migrations)
+    drop_trigger = Migration(version + 1, "drop_epoch_trigger", ["DROP TRIGGER medication_logs_epoch_insert"])
+
+    steps = medhealth_migrations.plan(conn, migrations + [drop_trigger])
+    assert [step.version for step in steps] == [version + 1]
+    assert medhealth_migrations.current_version(conn) == version
+    conn.close()
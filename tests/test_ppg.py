@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import medhealth_ppg
+from benchmark import FakeMax30102I2C
+
+
+@pytest.mark.parametrize("true_bpm", [45, 60, 72, 90, 110, 140, 180])
+def test_heart_rate_through_the_fifo_reader(true_bpm):
+    red, ir = medhealth_ppg.synthetic_ppg(true_bpm, medhealth_ppg.WINDOW_SECONDS, seed=true_bpm)
+    # Replay in 25-sample bursts, one 0.25 s FIFO drain each
+    i2c = FakeMax30102I2C(red, ir)
+    fifo = medhealth_ppg.Max30102Fifo(i2c)
+    pipeline = medhealth_ppg.HeartRatePipeline()
+    bpm = None
+    while i2c.position < ir.size:
+        i2c.pending = min(25, ir.size - i2c.position)
+        bpm = pipeline.feed(*fifo.read_samples())
+    assert bpm is not None and abs(bpm - true_bpm) <= 3.0
+
+
+def test_no_estimate_without_a_finger():
+    samples = int(medhealth_ppg.SAMPLE_RATE * medhealth_ppg.WINDOW_SECONDS)
+    assert medhealth_ppg.analyze_window(*np.full((2, samples), 2000.0)) is None
+
+
+def test_decode_fifo_round_trip():
+    red, ir = medhealth_ppg.synthetic_ppg(72, 1)
+    raw = np.stack([red, ir], axis=1).astype(">u4").view(np.uint8).reshape(-1, 2, 4)[..., 1:].tobytes()
+    decoded_red, decoded_ir = medhealth_ppg.decode_fifo(raw)
+    assert np.array_equal(decoded_red, red) and np.array_equal(decoded_ir, ir)
+
+
+@pytest.mark.parametrize("spo2", [86, 90, 95, 99])
+@pytest.mark.parametrize("bpm", [55, 80, 120])
+def test_spo2_on_clean_traces(spo2, bpm):
+    reading = medhealth_ppg.analyze_window(*medhealth_ppg.synthetic_ppg(bpm, medhealth_ppg.WINDOW_SECONDS,
+                                                                        spo2=spo2, seed=bpm + spo2))
+    assert reading.quality >= medhealth_ppg.MIN_QUALITY and not reading.motion
+    assert abs(reading.spo2 - spo2) <= 1.0
+
+
+def test_motion_windows_are_rejected():
+    windows = accepted = wrong = 0
+    first_full_window = int(medhealth_ppg.WINDOW_SECONDS * medhealth_ppg.SAMPLE_RATE)
+    for seed in range(20):
+        red, ir = medhealth_ppg.synthetic_ppg(75, 20, motion=10.0, seed=seed)
+        pipeline = medhealth_ppg.HeartRatePipeline()
+        for offset in range(0, ir.size, 25):
+            previous = pipeline.reading
+            pipeline.feed(red[offset:offset + 25], ir[offset:offset + 25])
+            if pipeline.reading is previous or offset + 25 < first_full_window:
+                continue
+            windows += 1
+            if pipeline.bpm is not None:
+                accepted += 1
+                wrong += abs(pipeline.bpm - 75) > 5
+    assert wrong == 0, "motion artefacts passed the quality gate"
+    assert accepted / windows < 0.05
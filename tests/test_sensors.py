@@ -0,0 +1,16 @@
+from medhealth_sensors import RingBuffer
+
+
+def test_window_over_a_full_buffer():
+    buffer = RingBuffer(4)
+    for i in range(4):
+        buffer.append(float(i), i * 10.0)
+    assert buffer.window(100, now=3.0) == [(0.0, 0.0), (1.0, 10.0), (2.0, 20.0), (3.0, 30.0)]
+
+
+def test_window_over_a_wrapped_buffer():
+    buffer = RingBuffer(4)
+    for i in range(10):
+        buffer.append(float(i), i * 10.0)
+    assert buffer.window(100, now=9.0) == [(6.0, 60.0), (7.0, 70.0), (8.0, 80.0), (9.0, 90.0)]
+    assert buffer.window(1.5, now=9.0) == [(8.0, 80.0), (9.0, 90.0)]
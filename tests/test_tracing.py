@@ -0,0 +1,38 @@
+import time
+
+import pytest
+
+import medhealth_system
+import medhealth_tracing
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert [medhealth_tracing.percentile(values, f) for f in (0.5, 0.95, 0.99, 1.0)] == [50, 95, 99, 100]
+    assert medhealth_tracing.percentile([7.0], 0.99) == 7.0
+
+
+def test_traced_doses_are_persisted_with_their_log_and_reported(device_db):
+    due_at = time.time() - 60
+    for med_id, response in ((1, 2.0), (2, 4.0)):
+        medhealth_system.dose_tracer.start(med_id, due_at, detected_at=due_at + 0.1)
+        medhealth_system.dose_tracer.mark(med_id, due_at, "buzzer_on_at", due_at + 0.2)
+        medhealth_system.dose_tracer.mark(med_id, due_at, "pressed_at", due_at + 0.2 + response)
+        medhealth_system.log_medication(med_id, f"Med {med_id}", due_at, due_at + 0.3 + response, "taken")
+    medhealth_system.log_medication(3, "Untraced", due_at, due_at + 5, "taken")
+    medhealth_system.log_queue.flush()
+
+    conn = medhealth_system.get_connection(device_db)
+    linked = conn.execute("""SELECT l.medication_id FROM dose_traces t
+                             JOIN medication_logs l ON l.id = t.log_id ORDER BY l.medication_id""").fetchall()
+    assert linked == [(1,), (2,)]
+
+    stats = {row.stage: row for row in medhealth_tracing.report(conn)}
+    assert stats["detect"].count == stats["total"].count == 2
+    assert stats["detect"].p50 == pytest.approx(0.1, abs=1e-3)
+    assert stats["alarm"].p50 == pytest.approx(0.1, abs=1e-3)
+    assert stats["response"].p50 == pytest.approx(2.0, abs=1e-3)
+    assert stats["response"].max == pytest.approx(4.0, abs=1e-3)
+    assert stats["button"].max == pytest.approx(0.1, abs=1e-3)
+    assert stats["commit"].p50 >= 0
+    assert medhealth_tracing.report(conn, medication_id=2)[0].count == 1
@@ -0,0 +1,31 @@
+import sqlite3
+
+from medhealth_db import VitalsWriter, close_all_connections
+
+
+def test_batched_writer_keeps_every_reading_and_downsamples_old_ones(device_db):
+    start_at = 1_700_000_000 - 1_700_000_000 % 60  # Minute-aligned so every bucket holds 6 readings
+    readings = [(start_at + i * 10, 36.5 + (i % 7) * 0.1, 70 + i % 15, "abnormal" if i == 100 else "normal")
+                for i in range(2 * 360)]  # 2 h, one reading every 10 s
+    writer = VitalsWriter(flush_interval=60)
+    for at, temperature, heart_rate, status in readings:
+        writer.record(device_db, temperature, heart_rate, status, at=at)
+    now = readings[-1][0]
+    writer.flush(device_db, now=now)
+    close_all_connections()
+
+    conn = sqlite3.connect(device_db)
+    rows, stored, oldest_raw = conn.execute("""SELECT COUNT(*), SUM(COALESCE(samples, 1)),
+                                                      MIN(CASE WHEN samples IS NULL THEN created_epoch END)
+                                               FROM vitals_logs""").fetchone()
+    rollups = conn.execute("""SELECT created_epoch, samples, status FROM vitals_logs
+                              WHERE samples IS NOT NULL""").fetchall()
+    conn.close()
+    assert stored == len(readings)
+    assert writer.commits < len(readings) / 5
+    # Raw readings older than raw_retention are rolled up at the next compaction
+    assert oldest_raw >= now - writer.raw_retention - writer.compact_interval - writer.rollup_seconds
+    assert rollups and all(samples == 6 for _, samples, _ in rollups)
+    assert rows == len(rollups) + sum(1 for at, *_ in readings if at >= oldest_raw)
+    abnormal_bucket = readings[100][0] // 60 * 60
+    assert [status for at, _, status in rollups if at == abnormal_bucket] == ["abnormal"]